@@ -0,0 +1,80 @@
+"""Benchmark document embedding batching: fixed arrival-order batches vs length buckets.
+
+The fixed strategy is what EmbeddingManager.generate_embeddings did before:
+slices of --batch-size texts in arrival order, each padded to its longest
+member. The bucketed strategy is plan_length_batches with the configured
+token budget. Both bypass the embedding cache and embed the same
+paragraphs from the interview corpus; the script reports throughput,
+padded tokens and the largest difference between the two results.
+
+    python -m scripts.benchmarks.embedding_batching --texts 2000
+"""
+import argparse
+import time
+import numpy as np
+from pathlib import Path
+from src.core.config import settings
+from src.services.embedding_manager import EmbeddingManager, plan_length_batches
+from scripts.benchmarks.embedding_engines import DEFAULT_CORPUS, load_texts
+
+
+def padded_tokens(lengths, batches) -> int:
+    return sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+
+
+def run(manager: EmbeddingManager, texts, plan, repeats: int):
+    best, embeddings, batches, lengths = None, None, None, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        input_ids = manager.tokenize(texts)
+        lengths = [len(ids) for ids in input_ids]
+        batches = plan(lengths)
+        embeddings = manager.embed_batches(input_ids, batches)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, embeddings, batches, lengths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed vs length-bucketed embedding batches")
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="Directory of .docx interviews")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL, help="Model name or local directory")
+    parser.add_argument("--texts", type=int, default=2000, help="Number of paragraphs to embed")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size of the fixed strategy")
+    parser.add_argument("--token-budget", type=int, default=settings.EMBEDDING_TOKEN_BUDGET)
+    parser.add_argument("--max-batch-size", type=int, default=settings.EMBEDDING_MAX_BATCH_SIZE)
+    parser.add_argument("--repeats", type=int, default=2, help="Best of N runs per strategy")
+    args = parser.parse_args()
+
+    texts = load_texts(Path(args.corpus), args.texts)
+    if not texts:
+        raise SystemExit(f"No texts found in {args.corpus}")
+    manager = EmbeddingManager(model_name=args.model)
+    # Warm-up so lazy initialisation is not counted
+    manager.embed_texts(texts[:4])
+
+    strategies = {
+        "fixed": lambda lengths: [
+            list(range(i, min(i + args.batch_size, len(lengths))))
+            for i in range(0, len(lengths), args.batch_size)
+        ],
+        "bucketed": lambda lengths: plan_length_batches(lengths, args.token_budget, args.max_batch_size),
+    }
+    results = {name: run(manager, texts, plan, args.repeats) for name, plan in strategies.items()}
+
+    lengths = results["fixed"][3]
+    print(f"{len(texts)} paragraphs, {sum(lengths)} tokens, model {args.model} on {manager.device}")
+    print(f"\n{'strategy':<10} {'batches':>8} {'padded tok':>11} {'padding %':>10} {'seconds':>8} {'texts/s':>9}")
+    for name, (elapsed, _, batches, lengths) in results.items():
+        padded = padded_tokens(lengths, batches)
+        print(
+            f"{name:<10} {len(batches):>8} {padded:>11} {100 * (1 - sum(lengths) / padded):>9.1f}% "
+            f"{elapsed:>8.2f} {len(texts) / elapsed:>9.1f}"
+        )
+    speedup = results["fixed"][0] / results["bucketed"][0]
+    difference = np.abs(results["fixed"][1] - results["bucketed"][1]).max()
+    print(f"\nSpeedup {speedup:.2f}x, max abs embedding difference {difference:.2e}")
+
+
+if __name__ == "__main__":
+    main()
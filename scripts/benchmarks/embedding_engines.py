@@ -0,0 +1,144 @@
+"""Compare the PyTorch and ONNX int8 query embedding engines.
+
+Each engine runs in its own subprocess so peak memory is measured in
+isolation. Every text from the corpus is embedded one at a time, as
+queries are, and the script reports load time, per-query latency and
+peak RSS per engine, plus cosine similarity between the two engines'
+embeddings. It exits non-zero if any cosine falls below --min-cosine.
+
+    python -m scripts.benchmarks.embedding_engines --texts 200
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+import numpy as np
+from src.core.config import settings
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / "notebooks" / "data"
+DEFAULT_MODEL = Path(__file__).resolve().parents[2] / "hugging_face_models"
+
+
+def load_texts(corpus: Path, limit: int) -> List[str]:
+    """Interview paragraphs long enough to look like questions or passages."""
+    from docx import Document
+
+    texts = []
+    for path in sorted(corpus.glob("*.docx")):
+        for paragraph in Document(str(path)).paragraphs:
+            text = paragraph.text.strip()
+            if len(text.split()) >= 4:
+                texts.append(text)
+                if len(texts) >= limit:
+                    return texts
+    return texts
+
+
+def run_worker(args):
+    """Embed the texts with one engine and write embeddings and timings."""
+    settings.EMBEDDING_ENGINE = args.worker
+    from src.services.embedding_service import EmbeddingService
+
+    texts = json.loads(Path(args.texts_file).read_text())
+    start = time.perf_counter()
+    service = EmbeddingService(model_path=args.model_path)
+    load_seconds = time.perf_counter() - start
+
+    async def embed_all():
+        # Warm-up so lazy initialisation is not counted as query latency
+        await service.generate_embedding(texts[0])
+        embeddings, latencies = [], []
+        for text in texts:
+            start = time.perf_counter()
+            embeddings.append(await service.generate_embedding(text))
+            latencies.append((time.perf_counter() - start) * 1000)
+        return np.stack(embeddings), latencies
+
+    embeddings, latencies = asyncio.run(embed_all())
+    np.save(args.output, embeddings.astype(np.float32))
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "latencies_ms": latencies,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def run_engine(engine: str, texts_file: Path, model_path: Path, workdir: Path) -> dict:
+    output = workdir / f"{engine}.npy"
+    completed = subprocess.run(
+        [
+            sys.executable, "-m", "scripts.benchmarks.embedding_engines",
+            "--worker", engine,
+            "--texts-file", str(texts_file),
+            "--model-path", str(model_path),
+            "--output", str(output),
+        ],
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"{engine} worker failed:\n{completed.stderr}")
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    report["embeddings"] = np.load(output)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity and latency of the query embedding engines")
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="Directory of .docx interviews")
+    parser.add_argument("--model-path", default=str(DEFAULT_MODEL), help="Local sbert model directory")
+    parser.add_argument("--texts", type=int, default=200, help="Number of texts to embed")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Required torch/onnx cosine per text")
+    parser.add_argument("--worker", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    parser.add_argument("--texts-file", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    texts = load_texts(Path(args.corpus), args.texts)
+    if not texts:
+        raise SystemExit(f"No texts found in {args.corpus}")
+
+    from src.services.onnx_embedding import INT8_FILENAME, export_onnx_model
+    onnx_path = Path(settings.ONNX_MODEL_PATH or Path(args.model_path) / "onnx" / INT8_FILENAME)
+    if not onnx_path.exists():
+        # Export up front so the ONNX load time does not include the export
+        export_onnx_model(Path(args.model_path), onnx_path.parent)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        texts_file = Path(workdir) / "texts.json"
+        texts_file.write_text(json.dumps(texts))
+        reports = {
+            engine: run_engine(engine, texts_file, Path(args.model_path), Path(workdir))
+            for engine in ("torch", "onnx")
+        }
+
+    cosines = np.sum(reports["torch"]["embeddings"] * reports["onnx"]["embeddings"], axis=1)
+    print(f"{len(texts)} texts, model {args.model_path}")
+    print(f"\n{'engine':<8} {'load s':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'peak RSS MB':>12}")
+    for engine, report in reports.items():
+        latencies = np.asarray(report["latencies_ms"])
+        print(
+            f"{engine:<8} {report['load_seconds']:>8.2f} {np.percentile(latencies, 50):>8.2f} "
+            f"{np.percentile(latencies, 95):>8.2f} {latencies.mean():>8.2f} {report['peak_rss_mb']:>12.0f}"
+        )
+    print(f"\nCosine torch vs onnx: min {cosines.min():.4f}, mean {cosines.mean():.4f}")
+    failing = int((cosines < args.min_cosine).sum())
+    if failing:
+        print(f"FAIL: {failing} texts below cosine {args.min_cosine}")
+        sys.exit(1)
+    print(f"PASS: all texts at or above cosine {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
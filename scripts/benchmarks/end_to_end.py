@@ -0,0 +1,238 @@
+"""End-to-end benchmark of document ingestion and query answering without Puhti access.
+
+Runs the real upload flow (PuhtiJobManager.submit_embedding_job and
+monitor_job_completion) and the real QueryService.process_query against
+the in-process fakes in scripts/benchmarks/fakes.py, using the interviews
+in notebooks/data as the corpus. Reports p50/p95/p99 per stage and query
+throughput for N concurrent clients.
+
+    python -m scripts.benchmarks.end_to_end --clients 8 --queries 200 \
+        --queue-delay 1 --llm-runtime 0.5
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from src.core.config import settings
+from src.api.v1.documents import monitor_job_completion
+from src.services.job_manager import PuhtiJobManager
+from src.services.query_service import QueryService
+from src.services.slurm_poller import SlurmStatusPoller
+from scripts.benchmarks.fakes import (
+    FakeEmbeddingService,
+    FakeNeo4jClient,
+    InMemoryMilvusClient,
+    SimulatedPuhtiTransport,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / "notebooks" / "data"
+
+QUERY_TEMPLATES = [
+    "Missä {name} syntyi?",
+    "Mitä {name} kertoo lapsuudestaan?",
+    "Kuinka vanha {name} on?",
+    "Millainen oli {name}n työura?",
+    "Mitä harrastuksia {name} mainitsee?",
+    "Kertooko {name} sota-ajasta?",
+]
+
+QUERY_STAGES = ["embedding", "retrieval", "submit", "generation", "total"]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples) * 1000
+    return {
+        "n": len(values),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+    }
+
+
+def print_table(title: str, timings: Dict[str, List[float]], stages: List[str]):
+    print(f"\n{title}")
+    print(f"{'stage':<12} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for stage in stages:
+        if timings.get(stage):
+            row = percentiles(timings[stage])
+            print(f"{stage:<12} {row['n']:>6} {row['p50']:>10.1f} {row['p95']:>10.1f} {row['p99']:>10.1f}")
+
+
+async def ingest_corpus(
+    corpus: List[Path],
+    job_manager: PuhtiJobManager,
+    milvus_client: InMemoryMilvusClient,
+    neo4j_client: FakeNeo4jClient
+) -> Dict[str, List[float]]:
+    """Upload every document concurrently and time submission and end-to-end storage."""
+    timings: Dict[str, List[float]] = defaultdict(list)
+
+    async def ingest(path: Path):
+        start = time.perf_counter()
+        job_id, _ = await job_manager.submit_embedding_job(path)
+        submitted = time.perf_counter()
+        await monitor_job_completion(job_id, job_manager, milvus_client, neo4j_client)
+        done = time.perf_counter()
+        if job_manager.jobs[job_id]["status"] != "COMPLETED":
+            logger.error(f"Ingestion of {path.name} ended as {job_manager.jobs[job_id]['status']}")
+            return
+        timings["submit"].append(submitted - start)
+        timings["total"].append(done - start)
+
+    await asyncio.gather(*(ingest(path) for path in corpus))
+    return timings
+
+
+async def run_queries(
+    query_service: QueryService,
+    milvus_client: InMemoryMilvusClient,
+    neo4j_client: FakeNeo4jClient,
+    queries: List[str],
+    clients: int
+) -> Dict[str, List[float]]:
+    """Run the queries from N concurrent clients, each waiting for its answer before the next."""
+    timings: Dict[str, List[float]] = defaultdict(list)
+    pending = iter(queries)
+    job_manager = query_service.puhti_job_manager
+
+    async def client():
+        for query in pending:
+            marks = {"start": time.perf_counter()}
+
+            async def on_stage(stage: str, details: Dict):
+                marks[stage] = time.perf_counter()
+
+            response = await query_service.process_query(
+                query=query,
+                milvus_client=milvus_client,
+                neo4j_client=neo4j_client,
+                on_stage=on_stage
+            )
+            if response.status == "error":
+                timings["errors"].append(0.0)
+                continue
+            if response.status == "processing":
+                await job_manager.wait_for_job(response.job_id)
+            status = await query_service.check_query_status(response.job_id)
+            marks["completed"] = time.perf_counter()
+            if status["status"] != "COMPLETED":
+                timings["errors"].append(0.0)
+                continue
+
+            timings["embedding"].append(marks["embedding_done"] - marks["start"])
+            if "job_queued" in marks:
+                timings["retrieval"].append(marks["retrieval_done"] - marks["embedding_done"])
+                timings["submit"].append(marks["job_queued"] - marks["retrieval_done"])
+                timings["generation"].append(marks["completed"] - marks["job_queued"])
+            timings["total"].append(marks["completed"] - marks["start"])
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return timings
+
+
+async def run_benchmark(args):
+    settings.SLURM_POLL_MIN_INTERVAL = args.poll_interval
+    settings.SLURM_POLL_MAX_INTERVAL = max(args.poll_interval * 4, args.poll_interval)
+    settings.STREAM_POLL_INTERVAL = args.poll_interval
+    settings.SEMANTIC_CACHE_ENABLED = args.semantic_cache
+    settings.HYBRID_SEARCH_ENABLED = not args.vector_only
+    settings.LLM_WORKER_ENABLED = not args.per_query_jobs
+
+    corpus = sorted(Path(args.corpus).glob("*.docx"))
+    if not corpus:
+        raise SystemExit(f"No .docx interviews found in {args.corpus}")
+
+    transport = SimulatedPuhtiTransport(
+        queue_delay=args.queue_delay,
+        embedding_runtime=args.embedding_runtime,
+        llm_runtime=args.llm_runtime,
+        latency=args.ssh_latency
+    )
+    poller = SlurmStatusPoller(transport=transport)
+    job_manager = PuhtiJobManager(transport=transport, poller=poller)
+    milvus_client = InMemoryMilvusClient(latency=args.milvus_latency)
+    neo4j_client = FakeNeo4jClient(latency=args.neo4j_latency)
+
+    with tempfile.TemporaryDirectory() as results_dir:
+        query_service = QueryService(
+            embedding_service=FakeEmbeddingService(latency=args.embedding_latency),
+            transport=transport,
+            job_manager=job_manager,
+            local_results_path=Path(results_dir)
+        )
+        poller.start()
+        try:
+            start = time.perf_counter()
+            ingest_timings = await ingest_corpus(corpus, job_manager, milvus_client, neo4j_client)
+            ingest_elapsed = time.perf_counter() - start
+
+            names = sorted(neo4j_client.persons)
+            queries = [
+                template.format(name=name)
+                for template, name in itertools.islice(
+                    itertools.cycle(itertools.product(QUERY_TEMPLATES, names)), args.queries
+                )
+            ]
+            start = time.perf_counter()
+            query_timings = await run_queries(query_service, milvus_client, neo4j_client, queries, args.clients)
+            query_elapsed = time.perf_counter() - start
+        finally:
+            await poller.stop()
+            transport.close()
+
+    completed = len(query_timings["total"])
+    print(f"Corpus: {len(corpus)} interviews, {milvus_client.collection.num_entities} chunks "
+          f"ingested in {ingest_elapsed:.2f}s")
+    print_table("Ingestion", ingest_timings, ["submit", "total"])
+    print_table(f"Queries ({args.clients} concurrent clients)", query_timings, QUERY_STAGES)
+    print(f"\nThroughput: {completed / query_elapsed:.2f} queries/s "
+          f"({completed} completed, {len(query_timings['errors'])} failed in {query_elapsed:.2f}s)")
+    print(f"Simulated SSH operations: {dict(transport.operations)}")
+
+    if args.json:
+        report = {
+            "config": vars(args),
+            "ingestion": {stage: percentiles(values) for stage, values in ingest_timings.items()},
+            "queries": {stage: percentiles(values) for stage, values in query_timings.items() if stage != "errors"},
+            "throughput_qps": completed / query_elapsed,
+            "failed": len(query_timings["errors"]),
+            "ssh_operations": dict(transport.operations),
+        }
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end RAG benchmark against in-process fakes")
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="Directory of .docx interviews")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent query clients")
+    parser.add_argument("--queries", type=int, default=50, help="Total queries to run")
+    parser.add_argument("--queue-delay", type=float, default=1.0, help="Simulated Slurm queue wait (s)")
+    parser.add_argument("--embedding-runtime", type=float, default=2.0, help="Simulated embedding job run time (s)")
+    parser.add_argument("--llm-runtime", type=float, default=0.5, help="Simulated generation time per answer (s)")
+    parser.add_argument("--ssh-latency", type=float, default=0.03, help="Simulated SSH round-trip (s)")
+    parser.add_argument("--embedding-latency", type=float, default=0.01, help="Simulated query embedding time (s)")
+    parser.add_argument("--milvus-latency", type=float, default=0.002, help="Simulated Milvus search time (s)")
+    parser.add_argument("--neo4j-latency", type=float, default=0.002, help="Simulated Neo4j round-trip (s)")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="Minimum Slurm poll interval (s)")
+    parser.add_argument("--semantic-cache", action="store_true", help="Serve repeated questions from the answer cache")
+    parser.add_argument("--vector-only", action="store_true", help="Disable BM25 fusion")
+    parser.add_argument("--per-query-jobs", action="store_true", help="Submit one Slurm job per query instead of using the worker")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+"""In-process stand-ins for Milvus, Neo4j and Puhti used by the benchmarks.
+
+The fakes subclass or mirror the real clients so the backend's own search,
+job submission, polling and result handling code runs unchanged; only the
+network and the GPU are simulated.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import re
+import shlex
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from src.core.config import settings
+from src.db.milvus import MilvusClient
+from src.db.neo4j import Neo4jClient
+from src.services.bm25_index import tokenize
+from src.services.person_index import get_person_index
+from src.services.slurm_poller import TERMINAL_STATES
+
+MILVUS_FIELDS = ["text", "embedding", "person_name", "person_age", "document_id", "chunk_index"]
+
+
+def fake_embedding(text: str, dim: Optional[int] = None) -> np.ndarray:
+    """Deterministic unit vector from hashed tokens, so lexically similar texts are close."""
+    dim = dim or settings.EMBEDDING_DIM
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text) or [text]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        vector[value % dim] += 1.0 if value & (1 << 63) else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class FakeEmbeddingService:
+    """Stands in for EmbeddingService with a fixed per-query latency."""
+
+    def __init__(self, latency: float = 0.0, dim: Optional[int] = None):
+        self.latency = latency
+        self.dim = dim or settings.EMBEDDING_DIM
+
+    async def generate_embedding(self, text: str) -> np.ndarray:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return fake_embedding(text, self.dim)
+
+
+def _compile_expr(expr: str):
+    # Milvus boolean expressions are close enough to Python for the filters we use
+    python_expr = expr.replace("&&", " and ").replace("||", " or ")
+    return compile(python_expr, "<milvus-expr>", "eval")
+
+
+class _Entity:
+    def __init__(self, row: Dict):
+        self._row = row
+
+    def get(self, field: str):
+        return self._row.get(field)
+
+
+class _Hit:
+    def __init__(self, row: Dict, score: float):
+        self.id = row["id"]
+        self.score = score
+        self.distance = score
+        self.entity = _Entity(row)
+
+
+class _InsertResult:
+    def __init__(self, primary_keys: List[int]):
+        self.primary_keys = primary_keys
+        self.insert_count = len(primary_keys)
+
+
+class _QueryIterator:
+    def __init__(self, rows: List[Dict], batch_size: int):
+        self._rows = rows
+        self._batch_size = batch_size
+        self._offset = 0
+
+    def next(self) -> List[Dict]:
+        batch = self._rows[self._offset:self._offset + self._batch_size]
+        self._offset += len(batch)
+        return batch
+
+    def close(self):
+        pass
+
+
+class InMemoryCollection:
+    """Exact inner-product search over a NumPy matrix with the pymilvus Collection surface."""
+
+    def __init__(self, dim: Optional[int] = None, latency: float = 0.0):
+        self.name = "document_embeddings"
+        self.dim = dim or settings.EMBEDDING_DIM
+        self.latency = latency
+        self._rows: List[Dict] = []
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._pending: List[np.ndarray] = []
+        self._next_id = 1
+        self.operations = Counter()
+
+    @property
+    def num_entities(self) -> int:
+        return len(self._rows)
+
+    def load(self, *args, **kwargs):
+        pass
+
+    def insert(self, data, **kwargs) -> _InsertResult:
+        self.operations["insert"] += 1
+        if data and isinstance(data[0], dict):
+            rows = [dict(row) for row in data]
+        else:
+            # Column-based insert in schema order (auto_id primary key omitted)
+            rows = [dict(zip(MILVUS_FIELDS, values)) for values in zip(*data)]
+        ids = []
+        for row in rows:
+            row["id"] = self._next_id
+            self._next_id += 1
+            self._pending.append(np.asarray(row.pop("embedding"), dtype=np.float32))
+            self._rows.append(row)
+            ids.append(row["id"])
+        return _InsertResult(ids)
+
+    def flush(self, **kwargs):
+        self.operations["flush"] += 1
+        self._materialize()
+
+    def _materialize(self):
+        if self._pending:
+            self._matrix = np.vstack([self._matrix, np.vstack(self._pending)])
+            self._pending = []
+
+    def _filter(self, expr: Optional[str]) -> np.ndarray:
+        if not expr:
+            return np.ones(len(self._rows), dtype=bool)
+        code = _compile_expr(expr)
+        return np.array([bool(eval(code, {}, row)) for row in self._rows], dtype=bool)
+
+    def search(self, data, anns_field, param, limit, expr=None, output_fields=None, **kwargs):
+        self.operations["search"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self._materialize()
+        mask = self._filter(expr)
+        results = []
+        for query in np.asarray(data, dtype=np.float32):
+            scores = np.where(mask, self._matrix @ query, -np.inf) if len(self._rows) else np.array([])
+            top = np.argsort(-scores)[:limit] if len(scores) else []
+            results.append([_Hit(self._rows[i], float(scores[i])) for i in top if np.isfinite(scores[i])])
+        return results
+
+    def query(self, expr: str = None, output_fields=None, limit: int = None, **kwargs) -> List[Dict]:
+        self.operations["query"] += 1
+        mask = self._filter(expr)
+        fields = set(output_fields or []) | {"id"}
+        rows = [
+            {field: value for field, value in row.items() if field in fields}
+            for row, keep in zip(self._rows, mask) if keep
+        ]
+        return rows[:limit] if limit else rows
+
+    def query_iterator(self, batch_size: int = 1000, expr: str = None, output_fields=None, **kwargs):
+        return _QueryIterator(self.query(expr=expr, output_fields=output_fields), batch_size)
+
+    def delete(self, expr: str, **kwargs):
+        self.operations["delete"] += 1
+        self._materialize()
+        keep = ~self._filter(expr)
+        self._rows = [row for row, kept in zip(self._rows, keep) if kept]
+        self._matrix = self._matrix[keep]
+
+
+class InMemoryMilvusClient(MilvusClient):
+    """MilvusClient whose collection lives in process; search and result parsing are the real code."""
+
+    def __init__(self, dim: Optional[int] = None, latency: float = 0.0):
+        self.collection_name = "document_embeddings"
+        self._collection = InMemoryCollection(dim=dim, latency=latency)
+        self._index_type = "FLAT"
+        self._last_reload_time = time.time()
+        self.reload_interval = float("inf")
+
+    @property
+    def collection(self):
+        return self._collection
+
+    def close(self):
+        pass
+
+
+class FakeNeo4jClient(Neo4jClient):
+    """Neo4jClient backed by dictionaries, with a fixed latency per database round-trip."""
+
+    def __init__(self, latency: float = 0.0):
+        self.driver = None
+        self.latency = latency
+        self.persons: Dict[str, Dict] = {}
+        self.chunks: Dict[str, Dict] = {}
+
+    async def _round_trip(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def ensure_schema(self):
+        pass
+
+    def load_person_index(self):
+        get_person_index().load(self.persons)
+
+    async def create_person(self, name: str, age: int = None):
+        await self._round_trip()
+        self.persons.setdefault(name, {"name": name, "age": age, "documents": set()})
+        get_person_index().add(name)
+
+    async def ingest_document(self, document_id: str, person_name: str, person_age: int, texts: list):
+        await self._round_trip()
+        person = self.persons.setdefault(person_name, {"name": person_name, "age": person_age, "documents": set()})
+        for i, text in enumerate(texts):
+            chunk_id = f"{document_id}_{i}"
+            self.chunks[chunk_id] = {"id": chunk_id, "content": text, "chunk_index": i, "document_id": document_id}
+            person["documents"].add(chunk_id)
+        get_person_index().add(person_name)
+
+    async def get_person_context(self, person_name: str):
+        await self._round_trip()
+        person = self.persons.get(person_name)
+        if not person:
+            return None
+        return {
+            "name": person["name"],
+            "age": person["age"],
+            "relationships": ["APPEARS_IN"] if person["documents"] else [],
+            "document_count": len(person["documents"])
+        }
+
+    def close(self):
+        pass
+
+
+class SimulatedPuhtiTransport:
+    """Stands in for PuhtiTransport: an in-memory remote filesystem and a toy Slurm.
+
+    Every operation costs one simulated SSH round-trip and holds one of
+    ``pool_size`` connections. Submitted batch scripts are interpreted just
+    enough to run the embedding script, per-query LLM jobs and the
+    persistent LLM worker after a configurable queue delay.
+    """
+
+    def __init__(
+        self,
+        queue_delay: float = 2.0,
+        embedding_runtime: float = 3.0,
+        llm_runtime: float = 2.0,
+        latency: float = 0.03,
+        pool_size: Optional[int] = None,
+        answer_tokens: int = 40,
+        dim: Optional[int] = None
+    ):
+        self.queue_delay = queue_delay
+        self.embedding_runtime = embedding_runtime
+        self.llm_runtime = llm_runtime
+        self.latency = latency
+        self.pool_size = pool_size or settings.PUHTI_SSH_POOL_SIZE
+        self.answer_tokens = answer_tokens
+        self.dim = dim or settings.EMBEDDING_DIM
+        self.files: Dict[str, bytes] = {}
+        self.slurm_jobs: Dict[str, Dict] = {}
+        self.operations = Counter()
+        self._next_job_id = 1000
+        self._pool: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+
+    async def _round_trip(self, operation: str):
+        self.operations[operation] += 1
+        if self._pool is None:
+            self._pool = asyncio.Semaphore(self.pool_size)
+        async with self._pool:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+
+    @staticmethod
+    def _key(path) -> str:
+        return str(path).rstrip("/")
+
+    # Filesystem operations
+
+    async def connect(self):
+        await self._round_trip("connect")
+
+    async def put(self, local_path: str, remote_path: str, timeout: Optional[float] = None):
+        await self._round_trip("put")
+        self.files[self._key(remote_path)] = Path(local_path).read_bytes()
+
+    async def get(self, remote_path: str, local_path: str, timeout: Optional[float] = None):
+        await self._round_trip("get")
+        data = self._read(remote_path)
+        Path(local_path).write_bytes(data)
+
+    def _read(self, remote_path) -> bytes:
+        try:
+            return self.files[self._key(remote_path)]
+        except KeyError:
+            raise FileNotFoundError(str(remote_path))
+
+    async def read_text(self, remote_path: str, timeout: Optional[float] = None) -> str:
+        await self._round_trip("read_text")
+        return self._read(remote_path).decode("utf-8")
+
+    async def read_from(self, remote_path: str, offset: int = 0, timeout: Optional[float] = None) -> bytes:
+        await self._round_trip("read_from")
+        return self._read(remote_path)[offset:]
+
+    async def write_text(self, remote_path: str, content: str, timeout: Optional[float] = None):
+        await self._round_trip("write_text")
+        self.files[self._key(remote_path)] = content.encode("utf-8")
+
+    async def listdir(self, remote_dir: str, timeout: Optional[float] = None) -> List[str]:
+        await self._round_trip("listdir")
+        return self._listdir(remote_dir)
+
+    def _listdir(self, remote_dir) -> List[str]:
+        prefix = self._key(remote_dir) + "/"
+        return [path[len(prefix):] for path in self.files if path.startswith(prefix) and "/" not in path[len(prefix):]]
+
+    async def exists(self, remote_path: str) -> bool:
+        await self._round_trip("exists")
+        return self._key(remote_path) in self.files
+
+    async def ensure_dirs(self, *remote_dirs):
+        await self._round_trip("ensure_dirs")
+
+    async def rename(self, remote_path: str, new_path: str):
+        await self._round_trip("rename")
+        self.files[self._key(new_path)] = self.files.pop(self._key(remote_path))
+
+    async def remove(self, remote_path: str, missing_ok: bool = True):
+        await self._round_trip("remove")
+        if self.files.pop(self._key(remote_path), None) is None and not missing_ok:
+            raise FileNotFoundError(str(remote_path))
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+
+    # Slurm
+
+    async def exec(self, command: str, timeout: Optional[float] = None):
+        await self._round_trip("exec")
+        if "sbatch" in command:
+            return self._sbatch(command.split()[-1])
+        if command.startswith("squeue"):
+            name = re.search(r"-n (\S+)", command)
+            jobs = [
+                (job_id, job) for job_id, job in self.slurm_jobs.items()
+                if job["state"] not in TERMINAL_STATES and (not name or job["name"] == name.group(1))
+            ]
+            if "wc -l" in command:
+                return str(len(jobs)), "", 0
+            return "\n".join(f"{job_id}|{job['state']}" for job_id, job in jobs), "", 0
+        if command.startswith("sacct "):
+            requested = re.search(r"-j (\S+)", command).group(1).split(",")
+            lines = [f"{job_id}|{self.slurm_jobs[job_id]['state']}" for job_id in requested if job_id in self.slurm_jobs]
+            return "\n".join(lines), "", 0
+        if command.startswith("sacctmgr"):
+            # check_job_slots looks for the project named in the batch scripts
+            return "project_2011638|gpu|10|20", "", 0
+        if command.startswith("scancel"):
+            for job in self.slurm_jobs.values():
+                if job["state"] not in TERMINAL_STATES:
+                    job["task"].cancel()
+                    job["state"] = "CANCELLED"
+            return "", "", 0
+        return "", "", 0
+
+    def _sbatch(self, script_path: str):
+        try:
+            script = self._read(script_path).decode("utf-8")
+        except FileNotFoundError:
+            return "", f"sbatch: error: Unable to open file {script_path}", 1
+        name = re.search(r"--job-name=(\S+)", script).group(1)
+        # Worker scripts continue the command over backslash-newlines
+        command = next(
+            line for line in script.replace("\\\n", " ").splitlines()
+            if re.search(r"python \S+\.py", line)
+        )
+        args = shlex.split(command[command.index("python "):])
+
+        job_id = str(self._next_job_id)
+        self._next_job_id += 1
+        job = {"name": name, "state": "PENDING"}
+        self.slurm_jobs[job_id] = job
+        job["task"] = asyncio.create_task(self._run_job(job, args))
+        self._tasks.add(job["task"])
+        job["task"].add_done_callback(self._tasks.discard)
+        return f"Submitted batch job {job_id}", "", 0
+
+    @staticmethod
+    def _arg(args: List[str], flag: str) -> Optional[str]:
+        return args[args.index(flag) + 1] if flag in args else None
+
+    async def _run_job(self, job: Dict, args: List[str]):
+        try:
+            await asyncio.sleep(self.queue_delay)
+            job["state"] = "RUNNING"
+            if "--worker" in args:
+                await self._run_llm_worker(args)
+            elif "--output-dir" in args:
+                await asyncio.sleep(self.llm_runtime)
+                input_path = Path(self._arg(args, "--input"))
+                self._answer(input_path, Path(self._arg(args, "--output-dir")), input_path.stem)
+            else:
+                await asyncio.sleep(self.embedding_runtime)
+                self._embed(Path(self._arg(args, "--input")))
+            job["state"] = "COMPLETED"
+        except asyncio.CancelledError:
+            job["state"] = "CANCELLED"
+        except Exception:
+            job["state"] = "FAILED"
+            raise
+
+    def _embed(self, input_path: Path):
+        import torch
+        from docx import Document
+
+        document = Document(io.BytesIO(self._read(input_path)))
+        texts = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+        embeddings = torch.from_numpy(np.vstack([fake_embedding(text, self.dim) for text in texts]))
+        buffer = io.BytesIO()
+        torch.save(embeddings, buffer)
+        self.files[self._key(input_path.parent / f"embeddings_{input_path.stem}.pt")] = buffer.getvalue()
+        self.files[self._key(input_path.parent / f"texts_{input_path.stem}.json")] = json.dumps(
+            {"texts": texts}, ensure_ascii=False
+        ).encode("utf-8")
+
+    async def _run_llm_worker(self, args: List[str]):
+        queue_dir = Path(self._arg(args, "--queue-dir"))
+        output_dir = Path(self._arg(args, "--output-dir"))
+        idle_timeout = float(self._arg(args, "--idle-timeout") or settings.LLM_WORKER_IDLE_TIMEOUT)
+        idle_since = time.monotonic()
+        while time.monotonic() - idle_since < idle_timeout:
+            pending = sorted(name for name in self._listdir(queue_dir) if re.fullmatch(r"query_.*\.json", name))
+            if not pending:
+                await asyncio.sleep(0.1)
+                continue
+            claimed = queue_dir / f"{pending[0]}.claimed"
+            self.files[self._key(claimed)] = self.files.pop(self._key(queue_dir / pending[0]))
+            await self._generate(claimed, output_dir, Path(pending[0]).stem)
+            idle_since = time.monotonic()
+
+    async def _generate(self, input_path: Path, output_dir: Path, stem: str):
+        # Tokens appear in the stream file at a steady rate over the run time
+        stream_key = self._key(output_dir / f"stream_{stem}.txt")
+        self.files[stream_key] = b""
+        for i in range(self.answer_tokens):
+            await asyncio.sleep(self.llm_runtime / self.answer_tokens)
+            self.files[stream_key] += f"sana{i} ".encode("utf-8")
+        self._answer(input_path, output_dir, stem)
+
+    def _answer(self, input_path: Path, output_dir: Path, stem: str):
+        data = json.loads(self._read(input_path))
+        result = {
+            "query": data["query"],
+            "response": " ".join(f"sana{i}" for i in range(self.answer_tokens)),
+            "sources": data.get("sources", []),
+            "person_contexts": data.get("person_contexts", []),
+            "status": "completed"
+        }
+        self.files[self._key(output_dir / f"response_{stem}.json")] = json.dumps(
+            result, ensure_ascii=False
+        ).encode("utf-8")
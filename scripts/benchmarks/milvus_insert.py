@@ -0,0 +1,113 @@
+"""Benchmark Milvus embedding ingestion: row-wise dicts vs the columnar insert path.
+
+The row-wise path is the one monitor_job_completion used before: one dict
+and one tolist() per chunk, then a flush per document. The columnar path is
+MilvusClient.insert_columns with the deferred flush policy and a single
+flush at the end.
+
+Runs against a throwaway collection on the Milvus configured in the
+environment, or with --in-memory against the benchmark fake to measure the
+client-side cost alone.
+
+    python -m scripts.benchmarks.milvus_insert --documents 20 --chunks 100
+"""
+import argparse
+import logging
+import time
+import numpy as np
+from src.core.config import settings
+from src.db.milvus import MilvusClient
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+BENCH_COLLECTION = "bench_document_embeddings"
+
+
+def make_documents(n_documents: int, n_chunks: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    documents = []
+    for d in range(n_documents):
+        embeddings = rng.standard_normal((n_chunks, settings.EMBEDDING_DIM)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        texts = [f"Haastattelu {d}, kappale {i}. " + "Tämä on esimerkkiteksti. " * 16 for i in range(n_chunks)]
+        metadata = {"person_name": f"Henkilö{d}", "person_age": 70 + d % 20, "document_id": f"BENCH-{d}"}
+        documents.append((embeddings, texts, metadata))
+    return documents
+
+
+def insert_rows(client: MilvusClient, documents):
+    for embeddings, texts, metadata in documents:
+        entities = []
+        for i, (embedding, text) in enumerate(zip(embeddings, texts)):
+            entities.append({
+                "text": text,
+                "embedding": embedding.tolist(),
+                "person_name": metadata["person_name"],
+                "person_age": metadata["person_age"],
+                "document_id": metadata["document_id"],
+                "chunk_index": i
+            })
+        client.collection.insert(entities)
+        client.collection.flush()
+
+
+def insert_columns(client: MilvusClient, documents):
+    for embeddings, texts, metadata in documents:
+        client.insert_columns(
+            embeddings=embeddings,
+            texts=texts,
+            person_name=metadata["person_name"],
+            person_age=metadata["person_age"],
+            document_id=metadata["document_id"]
+        )
+    client.flush()
+
+
+def make_client(in_memory: bool) -> MilvusClient:
+    if in_memory:
+        from scripts.benchmarks.fakes import InMemoryMilvusClient
+        return InMemoryMilvusClient()
+    return MilvusClient(collection_name=BENCH_COLLECTION)
+
+
+def reset(client: MilvusClient, in_memory: bool):
+    if in_memory:
+        client.collection.delete("id >= 0")
+    else:
+        client.collection.delete('document_id like "BENCH-%"')
+        client.collection.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Milvus embedding inserts")
+    parser.add_argument("--documents", type=int, default=20, help="Documents per run")
+    parser.add_argument("--chunks", type=int, default=100, help="Chunks per document")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per method; the fastest is reported")
+    parser.add_argument("--in-memory", action="store_true", help="Use the in-process fake instead of Milvus")
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents, args.chunks)
+    rows = args.documents * args.chunks
+    client = make_client(args.in_memory)
+
+    print(f"{args.documents} documents x {args.chunks} chunks ({rows} rows)")
+    print(f"{'method':<10} {'seconds':>9} {'rows/s':>12}")
+    try:
+        for name, insert in (("rows", insert_rows), ("columnar", insert_columns)):
+            timings = []
+            for _ in range(args.repeats):
+                reset(client, args.in_memory)
+                start = time.perf_counter()
+                insert(client, documents)
+                timings.append(time.perf_counter() - start)
+            seconds = min(timings)
+            print(f"{name:<10} {seconds:>9.3f} {rows / seconds:>12.0f}")
+    finally:
+        if not args.in_memory:
+            from pymilvus import utility
+            utility.drop_collection(BENCH_COLLECTION)
+
+
+if __name__ == "__main__":
+    main()
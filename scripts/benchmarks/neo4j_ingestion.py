@@ -0,0 +1,106 @@
+"""Benchmark Neo4j document ingestion throughput.
+
+Compares the per-chunk path (create_person + create_document_chunk per
+chunk) with the bulk UNWIND path (ingest_document) for documents of
+different sizes, against the Neo4j configured in the environment.
+
+    python -m scripts.benchmarks.neo4j_ingestion --sizes 10 100 1000
+"""
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from src.db.neo4j import Neo4jClient
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+PERSON_NAME = "Benchmark Henkilö"
+
+
+def make_texts(n_chunks: int):
+    return [f"Tämä on testikappale numero {i}. " * 20 for i in range(n_chunks)]
+
+
+async def ingest_per_chunk(client: Neo4jClient, document_id: str, texts):
+    await client.create_person(name=PERSON_NAME, age=80)
+    for i, text in enumerate(texts):
+        await client.create_document_chunk(
+            document_id=f"{document_id}_{i}",
+            text=text,
+            person_name=PERSON_NAME,
+            chunk_index=i
+        )
+
+
+async def ingest_bulk(client: Neo4jClient, document_id: str, texts):
+    await client.ingest_document(
+        document_id=document_id,
+        person_name=PERSON_NAME,
+        person_age=80,
+        texts=texts
+    )
+
+
+async def cleanup(client: Neo4jClient, document_id: str):
+    # Drops the catalog entry ingest_document adds along with the chunks
+    await client.delete_document(document_id)
+
+
+def count_next_chunk_edges(client: Neo4jClient, document_id: str) -> int:
+    with client.driver.session() as session:
+        return session.run("""
+            MATCH (a:Document)-[r:NEXT_CHUNK]->(:Document)
+            WHERE a.id STARTS WITH $prefix
+            RETURN count(r) as edges
+        """, prefix=f"{document_id}_").single()["edges"]
+
+
+async def run_benchmark(sizes, repeats: int, legacy_max: int):
+    client = Neo4jClient()
+    client.ensure_schema()
+    methods = {"per_chunk": ingest_per_chunk, "bulk": ingest_bulk}
+
+    print(f"{'method':<10} {'chunks':>7} {'seconds':>9} {'chunks/s':>10} {'edges':>8}")
+    try:
+        for n_chunks in sizes:
+            texts = make_texts(n_chunks)
+            for name, ingest in methods.items():
+                if name == "per_chunk" and n_chunks > legacy_max:
+                    print(f"{name:<10} {n_chunks:>7} {'skipped':>9}")
+                    continue
+                timings = []
+                edges = 0
+                for _ in range(repeats):
+                    # Fresh ID per run so the per-chunk prefix match only sees this document
+                    document_id = f"bench{uuid.uuid4().hex[:12]}"
+                    start = time.perf_counter()
+                    await ingest(client, document_id, texts)
+                    timings.append(time.perf_counter() - start)
+                    edges = count_next_chunk_edges(client, document_id)
+                    await cleanup(client, document_id)
+                seconds = min(timings)
+                print(f"{name:<10} {n_chunks:>7} {seconds:>9.3f} {n_chunks / seconds:>10.1f} {edges:>8}")
+    finally:
+        with client.driver.session() as session:
+            # Catalog entries of runs interrupted before their cleanup
+            session.run("MATCH (s:SourceDocument {person_name: $name}) DETACH DELETE s", name=PERSON_NAME)
+            session.run("MATCH (p:Person {name: $name}) DETACH DELETE p", name=PERSON_NAME)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Neo4j document ingestion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Chunks per document")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Runs per size; the fastest is reported")
+    parser.add_argument("--legacy-max", type=int, default=100,
+                        help="Largest document to run through the quadratic per-chunk path")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.sizes, args.repeats, args.legacy_max))
+
+
+if __name__ == "__main__":
+    main()
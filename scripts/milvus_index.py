@@ -0,0 +1,310 @@
+"""Tune the Milvus vector index and migrate the embeddings collection to it.
+
+tune     Copies the collection into scratch collections, one per candidate
+         index, and measures recall@k against exact inner-product search
+         together with p50/p95 search latency over a sweep of search params
+         (nprobe for IVF, ef for HNSW). Prints the fastest configuration
+         that meets the target recall as settings to put in .env.
+
+migrate  Builds a new collection with the requested index, copies every row
+         into it and then points the collection name at it through a Milvus
+         alias, so the backend keeps serving searches throughout. Chunks
+         ingested while the copy runs are picked up by a catch-up pass.
+
+    python -m scripts.milvus_index tune --k 5 --target-recall 0.95
+    python -m scripts.milvus_index migrate --index-type HNSW --index-params '{"M": 16, "efConstruction": 200}'
+"""
+import argparse
+import json
+import logging
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from pymilvus import connections, utility, Collection
+from src.core.config import settings
+from src.db.milvus import MilvusClient, index_params, search_params
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COPY_FIELDS = ["text", "embedding", "person_name", "person_age", "document_id", "chunk_index"]
+IVF_NPROBES = [1, 2, 4, 8, 16, 32, 64, 128]
+HNSW_EFS = [16, 32, 64, 128, 256]
+
+
+def connect():
+    connections.connect(
+        alias="default",
+        host=settings.MILVUS_HOST,
+        port=settings.MILVUS_PORT,
+        timeout=settings.MILVUS_CONNECT_TIMEOUT
+    )
+
+
+def read_rows(collection: Collection, expr: str = "id >= 0", batch_size: int = 1000) -> Iterable[List[Dict]]:
+    """Yield batches of full rows, embeddings included."""
+    iterator = collection.query_iterator(batch_size=batch_size, expr=expr, output_fields=COPY_FIELDS)
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            yield batch
+    finally:
+        iterator.close()
+
+
+def insert_rows(client: MilvusClient, rows: List[Dict]):
+    client.insert_columns(
+        embeddings=np.asarray([row["embedding"] for row in rows], dtype=np.float32),
+        texts=[row["text"] for row in rows],
+        person_name=[row["person_name"] for row in rows],
+        person_age=[row["person_age"] for row in rows],
+        document_id=[row["document_id"] for row in rows],
+        chunk_index=[row["chunk_index"] for row in rows],
+        flush=False
+    )
+
+
+def build_collection(name: str, index: Dict, batches: Iterable[List[Dict]]) -> Tuple[MilvusClient, int]:
+    """Create a collection with the index, fill it, and wait until the index covers the data."""
+    MilvusClient.create_collection(name, index)
+    client = MilvusClient(collection_name=name)
+    copied = 0
+    for batch in batches:
+        insert_rows(client, batch)
+        copied += len(batch)
+    client.flush()
+    utility.wait_for_index_building_complete(name)
+    client.collection.load()
+    return client, copied
+
+
+def ground_truth(embeddings: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Exact top-k row positions by inner product."""
+    scores = queries @ embeddings.T
+    top = np.argpartition(-scores, kth=min(k, scores.shape[1] - 1), axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def measure(
+    collection: Collection,
+    index_type: str,
+    params: Dict,
+    queries: np.ndarray,
+    truth: List[set],
+    k: int
+) -> Dict:
+    """Recall@k and latency percentiles for one index and search parameter setting."""
+    param = search_params(index_type, k, params)
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = collection.search(
+            data=[query.tolist()],
+            anns_field="embedding",
+            param=param,
+            limit=k,
+            output_fields=["document_id", "chunk_index"]
+        )[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {(hit.entity.get("document_id"), hit.entity.get("chunk_index")) for hit in hits}
+        recalls.append(len(found & expected) / k)
+    return {
+        "index_type": index_type,
+        "search_params": param["params"],
+        "recall": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def candidate_indexes(n_rows: int, index_types: List[str]) -> List[Dict]:
+    # Rule of thumb for IVF: about 4 * sqrt(n) clusters, at least 39 rows per cluster
+    nlist = 2 ** round(math.log2(max(16, min(4 * math.sqrt(n_rows), n_rows / 39, 65536))))
+    candidates = []
+    for index_type in index_types:
+        if index_type in ("IVF_FLAT", "IVF_SQ8"):
+            candidates.append(index_params(index_type, {"nlist": nlist}))
+        else:
+            candidates.append(index_params(index_type, {}))
+    return candidates
+
+
+def search_sweep(index: Dict, k: int) -> List[Dict]:
+    if index["index_type"] in ("IVF_FLAT", "IVF_SQ8"):
+        return [{"nprobe": nprobe} for nprobe in IVF_NPROBES if nprobe <= index["params"]["nlist"]]
+    if index["index_type"] == "HNSW":
+        return [{"ef": ef} for ef in HNSW_EFS if ef >= k]
+    return [{}]
+
+
+def tune(args):
+    source = Collection(args.collection)
+    rows = [row for batch in read_rows(source) for row in batch]
+    if len(rows) < args.k:
+        raise SystemExit(f"Collection {args.collection} has only {len(rows)} rows")
+    embeddings = np.asarray([row["embedding"] for row in rows], dtype=np.float32)
+    keys = [(row["document_id"], row["chunk_index"]) for row in rows]
+
+    rng = np.random.default_rng(args.seed)
+    sample = rng.choice(len(rows), size=min(args.queries, len(rows)), replace=False)
+    queries = embeddings[sample]
+    truth = [{keys[i] for i in top} for top in ground_truth(embeddings, queries, args.k)]
+    logger.info(f"Tuning on {len(rows)} rows with {len(queries)} queries, k={args.k}")
+
+    results = []
+    for index in candidate_indexes(len(rows), args.index_types):
+        name = f"{args.collection}_tune_{index['index_type'].lower()}"
+        if utility.has_collection(name):
+            utility.drop_collection(name)
+        try:
+            client, _ = build_collection(name, index, [rows[i:i + 1000] for i in range(0, len(rows), 1000)])
+            for params in search_sweep(index, args.k):
+                result = measure(client.collection, index["index_type"], params, queries, truth, args.k)
+                result["index_params"] = index["params"]
+                results.append(result)
+                logger.info(
+                    f"{index['index_type']} {index['params']} {result['search_params']}: "
+                    f"recall@{args.k}={result['recall']:.3f} p95={result['p95_ms']:.2f}ms"
+                )
+        finally:
+            utility.drop_collection(name)
+
+    print(f"\n{'index':<10} {'build params':<32} {'search params':<16} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for result in results:
+        print(
+            f"{result['index_type']:<10} {json.dumps(result['index_params']):<32} "
+            f"{json.dumps(result['search_params']):<16} {result['recall']:>7.3f} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}"
+        )
+
+    eligible = [result for result in results if result["recall"] >= args.target_recall]
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"k": args.k, "rows": len(rows), "results": results}, f, indent=2)
+    if not eligible:
+        print(f"\nNo configuration reached recall@{args.k} >= {args.target_recall}")
+        return
+    best = min(eligible, key=lambda result: result["p95_ms"])
+    print(f"\nFastest configuration with recall@{args.k} >= {args.target_recall}:")
+    print(f"MILVUS_INDEX_TYPE={best['index_type']}")
+    print(f"MILVUS_INDEX_PARAMS='{json.dumps(best['index_params'])}'")
+    print(f"MILVUS_SEARCH_PARAMS='{json.dumps(best['search_params'])}'")
+    print(
+        f"\nApply with: python -m scripts.milvus_index migrate --index-type {best['index_type']} "
+        f"--index-params '{json.dumps(best['index_params'])}'"
+    )
+
+
+def document_ids(collection: Collection) -> set:
+    ids = set()
+    iterator = collection.query_iterator(batch_size=1000, expr="id >= 0", output_fields=["document_id"])
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            ids.update(row["document_id"] for row in batch)
+    finally:
+        iterator.close()
+    return ids
+
+
+def copy_missing_documents(source: Collection, client: MilvusClient) -> int:
+    """Copy documents present in the source but not yet in the target collection."""
+    missing = document_ids(source) - document_ids(client.collection)
+    copied = 0
+    for document_id in sorted(missing):
+        for batch in read_rows(source, expr=f'document_id == "{document_id}"'):
+            insert_rows(client, batch)
+            copied += len(batch)
+    if copied:
+        client.flush()
+    return copied
+
+
+def resolve_collection(name: str) -> Tuple[str, bool]:
+    """Return the physical collection behind a name and whether the name is an alias."""
+    if name in utility.list_collections():
+        return name, False
+    for collection_name in utility.list_collections():
+        if name in utility.list_aliases(collection_name):
+            return collection_name, True
+    raise SystemExit(f"No collection or alias named {name}")
+
+
+def migrate(args):
+    index = index_params(args.index_type, json.loads(args.index_params) if args.index_params else None)
+    physical, is_alias = resolve_collection(args.collection)
+    source = Collection(physical)
+    target = f"{args.collection}_{index['index_type'].lower()}_{time.strftime('%Y%m%d%H%M%S')}"
+
+    logger.info(f"Copying {physical} into {target} with {index}")
+    client, copied = build_collection(target, index, read_rows(source))
+    copied += copy_missing_documents(source, client)
+    utility.wait_for_index_building_complete(target)
+    logger.info(f"Copied {copied} rows")
+
+    if is_alias:
+        # Atomic: searches resolve to the new collection from the next request on
+        utility.alter_alias(target, args.collection)
+    else:
+        # A name cannot be both a collection and an alias, so the original
+        # collection is renamed first; the name is unresolvable only between
+        # these two calls and the backend reloads the collection on failure
+        renamed = f"{physical}_legacy_{time.strftime('%Y%m%d%H%M%S')}"
+        utility.rename_collection(physical, renamed)
+        utility.create_alias(target, args.collection)
+        source = Collection(renamed)
+        physical = renamed
+    logger.info(f"{args.collection} now points at {target}")
+
+    # Chunks ingested into the old collection while the alias was switching
+    late = copy_missing_documents(source, client)
+    if late:
+        logger.info(f"Copied {late} rows ingested during the switch")
+
+    if args.drop_old:
+        utility.drop_collection(physical)
+        logger.info(f"Dropped {physical}")
+    else:
+        source.release()
+        logger.info(f"Released {physical}; drop it with --drop-old once the new index is verified")
+    print(f"Set MILVUS_INDEX_TYPE={index['index_type']} and MILVUS_INDEX_PARAMS='{json.dumps(index['params'])}' in .env")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune and migrate the Milvus embedding index")
+    parser.add_argument("--collection", default="document_embeddings", help="Collection name or alias")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    tune_parser = subparsers.add_parser("tune", help="Measure recall and latency of candidate indexes")
+    tune_parser.add_argument("--k", type=int, default=5, help="Results per query (recall@k)")
+    tune_parser.add_argument("--target-recall", type=float, default=0.95)
+    tune_parser.add_argument("--queries", type=int, default=200, help="Stored embeddings sampled as queries")
+    tune_parser.add_argument(
+        "--index-types", nargs="+", default=["FLAT", "IVF_FLAT", "IVF_SQ8", "HNSW"],
+        type=str.upper, help="Candidate index types"
+    )
+    tune_parser.add_argument("--seed", type=int, default=0)
+    tune_parser.add_argument("--json", help="Also write the results to this JSON file")
+
+    migrate_parser = subparsers.add_parser("migrate", help="Rebuild the collection with a new index and switch to it")
+    migrate_parser.add_argument("--index-type", type=str.upper, default=None, help="Defaults to MILVUS_INDEX_TYPE")
+    migrate_parser.add_argument("--index-params", help="JSON build params, e.g. '{\"nlist\": 128}'")
+    migrate_parser.add_argument("--drop-old", action="store_true", help="Drop the previous collection afterwards")
+
+    args = parser.parse_args()
+    connect()
+    if args.command == "tune":
+        tune(args)
+    else:
+        migrate(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ logger = logging.getLogger(__name__)
 # Constants
 MODEL_NAME = "TurkuNLP/sbert-cased-finnish-paraphrase"
 CACHE_DIR = "/scratch/project_2011638/safdarih/huggingface_cache"
+TOKEN_BUDGET = 16384  # padded tokens per forward pass in manifest mode
 
 def read_docx(file_path: str) -> List[str]:
     """Read text from a .docx file."""
@@ -95,6 +96,81 @@ def generate_embeddings(texts: List[str], tokenizer: AutoTokenizer, model: AutoM
         logger.error(f"Error generating embeddings: {str(e)}")
         raise
 
+def generate_embeddings_batched(
+    texts: List[str],
+    tokenizer: AutoTokenizer,
+    model: AutoModel,
+    device: torch.device,
+    token_budget: int = TOKEN_BUDGET
+) -> torch.Tensor:
+    """CLS embeddings in length-sorted batches of at most token_budget padded tokens."""
+    input_ids = tokenizer(texts, truncation=True, max_length=512)["input_ids"]
+    order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]), reverse=True)
+    embeddings = [None] * len(texts)
+    start = 0
+    with torch.no_grad():
+        while start < len(order):
+            # Longest first, so the first text of a batch sets its padded length
+            longest = len(input_ids[order[start]])
+            end = min(len(order), start + max(1, token_budget // longest))
+            batch = order[start:end]
+            encoded_input = tokenizer.pad(
+                {"input_ids": [input_ids[i] for i in batch]},
+                padding=True,
+                return_tensors='pt'
+            ).to(device)
+            outputs = model(**encoded_input)
+            for i, embedding in zip(batch, outputs.last_hidden_state[:, 0, :].cpu()):
+                embeddings[i] = embedding
+            start = end
+    return torch.stack(embeddings)
+
+def write_outputs(output_dir: Path, name: str, embeddings: torch.Tensor, texts: List[str]):
+    """Write a document's outputs, then its done marker, so readers never see partial files."""
+    torch.save(embeddings, output_dir / f"embeddings_{name}.pt")
+    with open(output_dir / f"texts_{name}.json", 'w', encoding='utf-8') as f:
+        json.dump({'texts': texts}, f, ensure_ascii=False, indent=2)
+    marker = output_dir / f"{name}.done"
+    marker.with_suffix(".tmp").write_text(json.dumps({"chunks": len(texts)}))
+    os.replace(marker.with_suffix(".tmp"), marker)
+
+def run_manifest(manifest_path: str, task_index: int, task_count: int):
+    """Embed this task's share of a staged batch with a single model load.
+
+    Each document gets its own outputs and a done marker as soon as it is
+    finished, so the backend can ingest it while the rest are still running.
+    A document that fails gets a .failed marker and does not stop the batch.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    output_dir = Path(manifest["output_dir"])
+    output_dir.mkdir(parents=True, exist_ok=True)
+    documents = manifest["documents"][task_index::task_count]
+    logger.info(f"Task {task_index + 1}/{task_count}: {len(documents)} documents")
+    if not documents:
+        return
+
+    device = setup_gpu()
+    tokenizer, model = load_model_and_tokenizer(CACHE_DIR)
+    model = model.to(device)
+    model.eval()
+
+    for document in documents:
+        name = document["name"]
+        if (output_dir / f"{name}.done").exists():
+            # Already embedded by an earlier attempt of this task
+            continue
+        try:
+            texts = read_docx(document["input"])
+            if not texts:
+                raise ValueError("No texts found in input file")
+            embeddings = generate_embeddings_batched(texts, tokenizer, model, device)
+            write_outputs(output_dir, name, embeddings, texts)
+            logger.info(f"Embedded {name}: {tuple(embeddings.shape)}")
+        except Exception as e:
+            logger.error(f"Error embedding {name}: {str(e)}")
+            (output_dir / f"{name}.failed").write_text(json.dumps({"error": str(e)}))
+
 def main(input_path: str):
     try:
         # Setup device
@@ -146,6 +222,13 @@ def main(input_path: str):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate embeddings for input texts")
-    parser.add_argument("--input", type=str, required=True, help="Path to input file (.docx or .json)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", type=str, help="Path to input file (.docx or .json)")
+    source.add_argument("--manifest", type=str, help="Path to a batch manifest of .docx files")
+    parser.add_argument("--task-index", type=int, default=int(os.environ.get("SLURM_ARRAY_TASK_ID", 0)))
+    parser.add_argument("--task-count", type=int, default=int(os.environ.get("SLURM_ARRAY_TASK_COUNT", 1)))
     args = parser.parse_args()
-    main(args.input)
\ No newline at end of file
+    if args.manifest:
+        run_manifest(args.manifest, args.task_index, args.task_count)
+    else:
+        main(args.input)
\ No newline at end of file
@@ -1,8 +1,13 @@
 import argparse
 import json
 import logging
+import os
+import signal
+import time
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from threading import Thread
+from typing import Optional
+from transformers import AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer
 from pathlib import Path
 
 # Configure logging
@@ -29,8 +34,12 @@ class LLMProcessor:
             logger.error(f"Error loading model: {str(e)}")
             raise
 
-    def generate_response(self, query: str, context: str, params: dict) -> str:
-        """Generate response using the model."""
+    def generate_response(self, query: str, context: str, params: dict, stream_path: Optional[Path] = None) -> str:
+        """Generate response using the model.
+
+        When ``stream_path`` is given, generated text is appended to it as it is
+        produced so the backend can tail the file and forward tokens to clients.
+        """
         try:
             # Format prompt
             prompt = f"""Tehtävä: Käytä annettua kontekstia vastataksesi kysymykseen mahdollisimman tarkasti.
@@ -54,7 +63,7 @@ Vastaus:"""
 
             # Generate response
             inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-            outputs = self.model.generate(
+            generation_kwargs = dict(
                 **inputs,
                 max_new_tokens=params.get("max_tokens", 300),
                 temperature=params.get("temperature", 0.1),
@@ -63,41 +72,147 @@ Vastaus:"""
                 pad_token_id=self.tokenizer.eos_token_id
             )
 
-            response = self.tokenizer.decode(
-                outputs[0], skip_special_tokens=True
-            ).split("Vastaus:")[1].strip()
+            if stream_path is None:
+                outputs = self.model.generate(**generation_kwargs)
+                return self.tokenizer.decode(
+                    outputs[0], skip_special_tokens=True
+                ).split("Vastaus:")[1].strip()
+
+            # Stream only the newly generated text, appending each piece as it arrives
+            streamer = TextIteratorStreamer(
+                self.tokenizer, skip_prompt=True, skip_special_tokens=True
+            )
+            errors = []
+
+            def generate():
+                try:
+                    self.model.generate(**generation_kwargs, streamer=streamer)
+                except BaseException as e:
+                    errors.append(e)
+                finally:
+                    # Without this a failed generate (e.g. CUDA OOM) leaves the loop below waiting forever
+                    streamer.end()
 
-            return response
+            thread = Thread(target=generate)
+            thread.start()
+
+            pieces = []
+            with open(stream_path, "a", encoding="utf-8") as stream_file:
+                for text in streamer:
+                    if not text:
+                        continue
+                    pieces.append(text)
+                    stream_file.write(text)
+                    stream_file.flush()
+            thread.join()
+            if errors:
+                raise errors[0]
+
+            return "".join(pieces).strip()
 
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             raise
 
-def main(input_path: str):
+def process_query_file(processor: LLMProcessor, input_path: Path, output_dir: Path, stem: Optional[str] = None):
+    """Answer one query JSON file, streaming tokens and writing the response file."""
+    stem = stem or input_path.stem
+    stream_path = output_dir / f"stream_{stem}.txt"
+    output_path = output_dir / f"response_{stem}.json"
+
+    # Load input data
+    with open(input_path, 'r') as f:
+        data = json.load(f)
+
     try:
-        # Load input data
-        with open(input_path, 'r') as f:
-            data = json.load(f)
-        
-        # Initialize processor
-        processor = LLMProcessor()
-        
         # Generate response
         response = processor.generate_response(
             query=data["query"],
             context=data["context"],
-            params=data.get("params", {})
+            params=data.get("params", {}),
+            stream_path=stream_path
         )
+        result = {
+            "query": data["query"],
+            "response": response,
+            "sources": data.get("sources", []),
+            "person_contexts": data.get("person_contexts", []),
+            "status": "completed"
+        }
+    except Exception as e:
+        result = {"query": data.get("query"), "status": "failed", "error": str(e)}
+
+    # Save output, written to a temp name first so readers never see a partial file
+    tmp_path = output_path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    tmp_path.rename(output_path)
+
+    logger.info(f"Response saved to {output_path}")
+    if result["status"] == "failed":
+        raise RuntimeError(result["error"])
+
+def claim_next_query(queue_dir: Path, worker_id: str) -> Optional[Path]:
+    """Atomically claim the oldest waiting query file by renaming it."""
+    pending = sorted(queue_dir.glob("query_*.json"), key=lambda path: path.stat().st_mtime)
+    for path in pending:
+        claimed = path.with_name(f"{path.name}.claimed-{worker_id}")
+        try:
+            path.rename(claimed)
+            return claimed
+        except FileNotFoundError:
+            continue  # Another worker got it first
+    return None
+
+def run_worker(queue_dir: str, output_dir: str, idle_timeout: float, poll_interval: float):
+    """Load the model once and answer queries from the queue directory until idle or told to drain."""
+    queue_dir = Path(queue_dir)
+    output_dir = Path(output_dir)
+    worker_id = os.environ.get("SLURM_JOB_ID", str(os.getpid()))
+    draining = False
+
+    def drain(signum, frame):
+        nonlocal draining
+        logger.info(f"Received signal {signum}, draining after the current query")
+        draining = True
+
+    # SIGUSR1 is sent by Slurm ahead of the time limit (--signal), SIGTERM on scancel
+    signal.signal(signal.SIGUSR1, drain)
+    signal.signal(signal.SIGTERM, drain)
+
+    processor = LLMProcessor()
+    logger.info(f"Worker {worker_id} ready, watching {queue_dir}")
+    last_work = time.time()
+
+    while not draining:
+        claimed = claim_next_query(queue_dir, worker_id)
+        if claimed is None:
+            if time.time() - last_work > idle_timeout:
+                logger.info(f"Worker idle for {idle_timeout}s, exiting")
+                break
+            time.sleep(poll_interval)
+            continue
+
+        stem = claimed.name.split(".json")[0]
+        logger.info(f"Processing {stem}")
+        try:
+            process_query_file(processor, claimed, output_dir, stem=stem)
+        except Exception as e:
+            logger.error(f"Error processing {stem}: {str(e)}")
+        finally:
+            claimed.unlink(missing_ok=True)
+            last_work = time.time()
+
+    logger.info(f"Worker {worker_id} stopped")
+
+def main(input_path: str, output_dir: Optional[str] = None):
+    try:
+        input_file = Path(input_path)
+        output_dir = Path(output_dir) if output_dir else input_file.parent
         
-        # Save output
-        output_path = Path(input_path).parent / f"response_{Path(input_path).stem}.json"
-        with open(output_path, 'w') as f:
-            json.dump({
-                "response": response,
-                "status": "completed"
-            }, f, ensure_ascii=False, indent=2)
-            
-        logger.info(f"Response saved to {output_path}")
+        # Initialize processor
+        processor = LLMProcessor()
+        process_query_file(processor, input_file, output_dir)
         
     except Exception as e:
         logger.error(f"Error in main: {str(e)}")
@@ -105,6 +220,19 @@ def main(input_path: str):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input", type=str, required=True, help="Path to input JSON file")
+    parser.add_argument("--input", type=str, help="Path to input JSON file")
+    parser.add_argument("--output-dir", type=str, default=None, help="Directory for response and token stream files")
+    parser.add_argument("--worker", action="store_true", help="Run as a persistent worker consuming a queue directory")
+    parser.add_argument("--queue-dir", type=str, help="Directory of query_*.json files to consume in worker mode")
+    parser.add_argument("--idle-timeout", type=float, default=900, help="Seconds without work before the worker exits")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between queue scans when idle")
     args = parser.parse_args()
-    main(args.input)
\ No newline at end of file
+
+    if args.worker:
+        if not args.queue_dir or not args.output_dir:
+            parser.error("--worker requires --queue-dir and --output-dir")
+        run_worker(args.queue_dir, args.output_dir, args.idle_timeout, args.poll_interval)
+    else:
+        if not args.input:
+            parser.error("--input is required unless --worker is given")
+        main(args.input, args.output_dir)
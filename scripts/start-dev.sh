@@ -18,8 +18,17 @@ STREAMLIT_PORT=${STREAMLIT_PORT:-8501}
 
 echo "Starting MultimodalRAG in development mode..."
 
+# Worker processes for FastAPI; --reload only works with a single worker.
+# Workers share jobs and Slurm states through the job registry and elect
+# one leader among themselves (src/core/workers.py).
+WORKERS=${WORKERS:-1}
+
 # Start FastAPI in the background
-uvicorn --reload --proxy-headers --host $HOST --port $FASTAPI_PORT "$APP_MODULE" &
+if [ "$WORKERS" -gt 1 ]; then
+    uvicorn --workers $WORKERS --proxy-headers --host $HOST --port $FASTAPI_PORT "$APP_MODULE" &
+else
+    uvicorn --reload --proxy-headers --host $HOST --port $FASTAPI_PORT "$APP_MODULE" &
+fi
 FASTAPI_PID=$!
 
 # Start Streamlit
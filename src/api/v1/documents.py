@@ -2,7 +2,8 @@ from src.models.document import DocumentResponse, ProcessedChunk
 from src.services.document_processor import DocumentProcessor
 from src.services.embedding_manager import EmbeddingManager as EnhancedEmbeddingManager
 from src.db.milvus import MilvusClient
-from src.db.neo4j import Neo4jClient
+from src.db.neo4j import Neo4jClient, CATALOG_SORT_FIELDS
+from src.db import pool
 from typing import List
 import logging
 import torch
@@ -12,9 +13,15 @@ import numpy as np
 from pathlib import Path
 from subprocess import run, CalledProcessError
 import os
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
-from typing import Dict
-from src.services.job_manager import PuhtiJobManager
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Query, Request
+from typing import Dict, Optional
+from src.services.job_manager import PuhtiJobManager, get_job_manager as get_shared_job_manager
+from src.services.bulk_ingest import BulkStaging
+from src.services.embedding_router import RouteDecision, get_embedding_router
+from src.services.upload_spool import SpooledUpload, UploadTooLargeError, iter_upload, spool_upload
+from src.services.semantic_cache import get_semantic_cache
+from src.services.bm25_index import get_bm25_index
+from src.services.corpus_sync import get_corpus_sync
 from src.core.config import settings
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -24,6 +31,7 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+
 async def get_document_processor():
     return DocumentProcessor()
 
@@ -33,93 +41,300 @@ async def get_embedding_manager():
 
 
 async def get_milvus_client():
-    return MilvusClient()
+    # Shared client created at startup; no connection work per request
+    try:
+        return pool.get_milvus_client()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Milvus unavailable: {str(e)}")
 
 
 async def get_neo4j_client():
-    return Neo4jClient()
+    try:
+        return pool.get_neo4j_client()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Neo4j unavailable: {str(e)}")
 
 
 async def get_job_manager():
-    return PuhtiJobManager()
+    # One manager per process; its jobs live in the shared job registry
+    return get_shared_job_manager()
+
+
+async def ingest_embedded_document(
+    label: str,
+    metadata: Dict,
+    embeddings,
+    texts: List[str],
+    milvus_client: MilvusClient,
+    neo4j_client: Neo4jClient,
+    replace: bool = False
+):
+    """Store one embedded document in Milvus, the BM25 index and Neo4j.
+
+    With replace, rows left by an earlier, interrupted ingestion of the
+    same document are deleted first. Neo4j ingestion merges and needs no
+    cleanup.
+    """
+    if isinstance(embeddings, np.ndarray):
+        embedding_dim = embeddings.shape[1]
+    else:
+        embedding_dim = embeddings[0].shape[0]
+    
+    logger.info(f"Received embeddings with dimension: {embedding_dim}")
+    
+    if embedding_dim != settings.EMBEDDING_DIM:
+        logger.error(f"Dimension mismatch: expected {settings.EMBEDDING_DIM}, got {embedding_dim}")
+        raise ValueError(f"Embedding dimension mismatch")
+    
+    if replace:
+        milvus_client.collection.delete(f'document_id == "{metadata["document_id"]}"')
+        get_bm25_index().remove_document(metadata["document_id"])
+    
+    # 1. Store in Milvus, column-wise; flushing is deferred to the flush policy
+    if isinstance(embeddings, torch.Tensor):
+        embeddings = embeddings.numpy()
+    chunk_ids = milvus_client.insert_columns(
+        embeddings=np.asarray(embeddings, dtype=np.float32),
+        texts=texts,
+        person_name=metadata["person_name"],
+        person_age=metadata["person_age"],
+        document_id=metadata["document_id"]
+    )
+    logger.info(f"Stored {len(chunk_ids)} embeddings in Milvus for {label}")
+    
+    # Keep the keyword index in step with Milvus
+    get_bm25_index().add_chunks(metadata["document_id"], [
+        {
+            "id": chunk_id,
+            "text": text,
+            "chunk_index": i,
+            "person_name": metadata["person_name"],
+            "person_age": metadata["person_age"]
+        }
+        for i, (chunk_id, text) in enumerate(zip(chunk_ids, texts))
+    ])
+    
+    # New content can change retrieval for any cached answer
+    get_semantic_cache().invalidate()
+    
+    # Let the other workers update their own index and cache
+    if replace:
+        get_corpus_sync().publish(metadata["document_id"], "remove")
+    get_corpus_sync().publish(metadata["document_id"], "add")
+
+    # 2. Store in Neo4j
+    try:
+        # Person, chunks and NEXT_CHUNK chain in one transaction
+        await neo4j_client.ingest_document(
+            document_id=metadata["document_id"],
+            person_name=metadata["person_name"],
+            person_age=metadata["person_age"],
+            texts=texts
+        )
+        
+        logger.info(f"Stored document in Neo4j for {label}")
+    except Exception as e:
+        logger.error(f"Error storing in Neo4j: {str(e)}")
 
 
 async def monitor_job_completion(
     job_id: str, 
     job_manager: PuhtiJobManager, 
     milvus_client: MilvusClient,
-    neo4j_client: Neo4jClient
+    neo4j_client: Neo4jClient,
+    decision: Optional[RouteDecision] = None
 ):
     """Monitor job completion and store results in both Milvus and Neo4j."""
     try:
         while True:
+            # The shared Slurm poller wakes us when the job leaves the queue
+            await job_manager.wait_for_job(job_id)
             job_info = await job_manager.check_embedding_job(job_id)
             
             if job_info["status"] == "COMPLETED":
-                embeddings = job_info["embeddings"]
-                texts = job_info["texts"]
-                metadata = job_info["metadata"]
-                if isinstance(embeddings, np.ndarray):
-                    embedding_dim = embeddings.shape[1]
-                else:
-                    embedding_dim = embeddings[0].shape[0]
-                
-                logger.info(f"Received embeddings with dimension: {embedding_dim}")
-                
-                if embedding_dim != settings.EMBEDDING_DIM:
-                    logger.error(f"Dimension mismatch: expected {settings.EMBEDDING_DIM}, got {embedding_dim}")
-                    raise ValueError(f"Embedding dimension mismatch")
-                
-                # 1. Store in Milvus
-                entities = []
-                for i, (embedding, text) in enumerate(zip(embeddings, texts)):
-                    if isinstance(embedding, torch.Tensor):
-                        embedding = embedding.numpy()
-                    entities.append({
-                        "text": text,
-                        "embedding": embedding.tolist() if isinstance(embedding, np.ndarray) else embedding,
-                        "person_name": metadata["person_name"],
-                        "person_age": metadata["person_age"],
-                        "document_id": metadata["document_id"],
-                        "chunk_index": i
-                    })
-                
-                milvus_client.collection.insert(entities)
-                milvus_client.collection.flush()
-                logger.info(f"Stored {len(entities)} embeddings in Milvus for job {job_id}")
-
-                # 2. Store in Neo4j
-                try:
-                    # Create person node
-                    await neo4j_client.create_person(
-                        name=metadata["person_name"],
-                        age=metadata["person_age"]
-                    )
-
-                    # Create document nodes and relationships
-                    for i, text in enumerate(texts):
-                        await neo4j_client.create_document_chunk(
-                            document_id=f"{metadata['document_id']}_{i}",
-                            text=text,
-                            person_name=metadata["person_name"],
-                            chunk_index=i
-                        )
-                    
-                    logger.info(f"Stored document in Neo4j for job {job_id}")
-                except Exception as e:
-                    logger.error(f"Error storing in Neo4j: {str(e)}")
-                
+                await ingest_embedded_document(
+                    f"job {job_id}",
+                    job_info["metadata"],
+                    job_info["embeddings"],
+                    job_info["texts"],
+                    milvus_client,
+                    neo4j_client,
+                    replace=job_info.get("resumed", False)
+                )
+                job_info["ingested"] = True
+                # The registry keeps the job; the results are no longer needed
+                job_info.pop("embeddings", None)
+                job_info.pop("texts", None)
+                if decision is not None:
+                    get_embedding_router().record(decision, f"job {job_id}")
                 break
                 
             elif job_info["status"] == "FAILED":
                 logger.error(f"Job {job_id} failed")
                 break
-                
-            await asyncio.sleep(30)
             
     except Exception as e:
         logger.error(f"Error monitoring job {job_id}: {str(e)}")
 
+
+async def monitor_batch_completion(
+    job_id: str,
+    job_manager: PuhtiJobManager,
+    milvus_client: MilvusClient,
+    neo4j_client: Neo4jClient
+):
+    """Ingest each document of a batch job as soon as its outputs are on Puhti."""
+    try:
+        while True:
+            job_info, ready = await job_manager.check_embedding_batch(job_id)
+            for document in ready:
+                label = f"{document['metadata']['document_id']} in batch {job_id}"
+                progress = job_info["documents"][document["name"]]
+                try:
+                    await ingest_embedded_document(
+                        label,
+                        document["metadata"],
+                        document["embeddings"],
+                        document["texts"],
+                        milvus_client,
+                        neo4j_client,
+                        replace=job_info.get("resumed", False)
+                    )
+                    progress["ingested"] = True
+                except Exception as e:
+                    logger.error(f"Error ingesting {label}: {str(e)}")
+                    progress.update({"status": "FAILED", "error": f"Ingestion failed: {str(e)}"})
+            if ready:
+                job_info.save()
+            
+            if job_info["status"] in ("COMPLETED", "FAILED"):
+                failed = [name for name, d in job_info["documents"].items() if d["status"] == "FAILED"]
+                if failed:
+                    logger.error(f"Batch {job_id}: {len(failed)} documents failed: {failed}")
+                logger.info(f"Batch {job_id} finished with status {job_info['status']}")
+                break
+            
+            # Documents finish while the job is still running, so poll the batch directory
+            await asyncio.sleep(job_manager.poller.next_interval())
+            
+    except Exception as e:
+        logger.error(f"Error monitoring batch {job_id}: {str(e)}")
+
+async def run_local_embedding(
+    job_id: str,
+    texts: List[str],
+    decision: RouteDecision,
+    job_manager: PuhtiJobManager,
+    milvus_client: MilvusClient,
+    neo4j_client: Neo4jClient
+):
+    """Embed a routed document on this machine and store it like a Puhti result."""
+    job_info = job_manager.jobs[job_id]
+    router = get_embedding_router()
+    try:
+        embeddings = await router.embed_locally(texts, decision)
+        await ingest_embedded_document(
+            f"job {job_id}",
+            job_info["metadata"],
+            embeddings,
+            texts,
+            milvus_client,
+            neo4j_client
+        )
+        job_info["status"] = "COMPLETED"
+        router.record(decision, f"job {job_id}")
+    except Exception as e:
+        logger.error(f"Local embedding of job {job_id} failed: {str(e)}")
+        job_info.update({"status": "FAILED", "error": str(e)})
+    finally:
+        # The upload was already streamed to Puhti; that copy is not needed
+        try:
+            await job_manager.transport.remove(job_info["input_file"])
+        except Exception as e:
+            logger.warning(f"Could not remove {job_info['input_file']} from Puhti: {str(e)}")
+
+
+async def resume_job_monitors(
+    job_manager: PuhtiJobManager,
+    milvus_client: MilvusClient,
+    neo4j_client: Neo4jClient
+) -> List[asyncio.Task]:
+    """Recover jobs left unfinished by a previous run and monitor them again."""
+    tasks = []
+    for job_info in await job_manager.recover_jobs():
+        monitor = monitor_batch_completion if job_info.get("batch") else monitor_job_completion
+        tasks.append(asyncio.create_task(monitor(
+            job_id=job_info.job_id,
+            job_manager=job_manager,
+            milvus_client=milvus_client,
+            neo4j_client=neo4j_client
+        )))
+    return tasks
+
+
+async def route_uploaded_document(
+    chunks,
+    filename: str,
+    background_tasks: BackgroundTasks,
+    job_manager: PuhtiJobManager,
+    milvus_client: MilvusClient,
+    neo4j_client: Neo4jClient
+) -> Dict:
+    """Spool an upload while streaming it to Puhti, then embed it wherever it finishes first."""
+    metadata = job_manager.metadata_extractor.extract_from_filename(Path(filename).name)
+    remote_path = job_manager.remote_document_path(metadata, filename)
+    await job_manager.transport.ensure_dirs(job_manager.work_dir)
+    upload = await spool_upload(chunks, filename, transport=job_manager.transport, remote_path=remote_path)
+    router = get_embedding_router()
+    try:
+        try:
+            texts, tokens = await router.measure(upload.path)
+            decision = await router.decide(tokens)
+        except Exception as e:
+            logger.warning(f"Could not read {filename} locally, sending it to Puhti: {str(e)}")
+            decision = RouteDecision("puhti", 0, 0.0, None, "document unreadable locally")
+        
+        if decision.target == "local":
+            job_id = job_manager.register_local_job(metadata, remote_path, sha256=upload.sha256)
+            background_tasks.add_task(
+                run_local_embedding,
+                job_id=job_id,
+                texts=texts,
+                decision=decision,
+                job_manager=job_manager,
+                milvus_client=milvus_client,
+                neo4j_client=neo4j_client
+            )
+        else:
+            job_id, metadata = await job_manager.submit_embedding_job(
+                upload.path,
+                metadata=metadata,
+                remote_file_path=remote_path,
+                sha256=upload.sha256
+            )
+            # Add background task with both Milvus and Neo4j clients
+            background_tasks.add_task(
+                monitor_job_completion,
+                job_id=job_id,
+                job_manager=job_manager,
+                milvus_client=milvus_client,
+                neo4j_client=neo4j_client,
+                decision=decision
+            )
+    finally:
+        upload.cleanup()
+    
+    logger.info(f"Routing {filename} ({decision.tokens} tokens) to {decision.target}: {decision.as_dict()}")
+    return {
+        "message": "Document processing started",
+        "job_id": job_id,
+        "metadata": metadata,
+        "size": upload.size,
+        "sha256": upload.sha256,
+        "routing": decision.as_dict()
+    }
+
+
 @router.post("/upload")
 async def upload_and_process_document(
     background_tasks: BackgroundTasks,
@@ -130,20 +345,60 @@ async def upload_and_process_document(
 ):
     """Upload document and process it on Puhti, then store in both Milvus and Neo4j."""
     try:
-        temp_path = Path(f"/tmp/{file.filename}")
-        with temp_path.open("wb") as f:
-            content = await file.read()
-            f.write(content)
-        
-        # Submit embedding job to Puhti
-        job_id, metadata = await job_manager.submit_embedding_job(temp_path)
+        # Read in fixed-size chunks; the upload is never held in memory whole
+        return await route_uploaded_document(
+            iter_upload(file), file.filename, background_tasks, job_manager, milvus_client, neo4j_client
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing document: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/upload/stream")
+async def stream_and_process_document(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    filename: str = Query(..., description='Original file name, e.g. "Matti 75v M7-54.docx"'),
+    job_manager: PuhtiJobManager = Depends(get_job_manager),
+    milvus_client: MilvusClient = Depends(get_milvus_client),
+    neo4j_client: Neo4jClient = Depends(get_neo4j_client)
+):
+    """Upload a document as the raw request body.
+
+    Unlike multipart uploads, which are parsed in full before the handler
+    runs, the body is forwarded to Puhti while it is still arriving.
+    """
+    try:
+        return await route_uploaded_document(
+            request.stream(), filename, background_tasks, job_manager, milvus_client, neo4j_client
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing document: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/upload/batch")
+async def upload_document_batch(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    job_manager: PuhtiJobManager = Depends(get_job_manager),
+    milvus_client: MilvusClient = Depends(get_milvus_client),
+    neo4j_client: Neo4jClient = Depends(get_neo4j_client)
+):
+    """Upload several documents and embed them in one Puhti job with a single model load."""
+    uploads: List[SpooledUpload] = []
+    try:
+        for file in files:
+            uploads.append(await spool_upload(iter_upload(file), file.filename))
         
-        # Clean up temporary file
-        temp_path.unlink()
+        job_id, documents = await job_manager.submit_embedding_batch([upload.path for upload in uploads])
         
-        # Add background task with both Milvus and Neo4j clients
         background_tasks.add_task(
-            monitor_job_completion,
+            monitor_batch_completion,
             job_id=job_id,
             job_manager=job_manager,
             milvus_client=milvus_client,
@@ -151,13 +406,110 @@ async def upload_and_process_document(
         )
         
         return {
-            "message": "Document processing started",
+            "message": f"Processing of {len(documents)} documents started",
             "job_id": job_id,
-            "metadata": metadata
+            "documents": [
+                {**metadata, "size": upload.size, "sha256": upload.sha256}
+                for metadata, upload in zip(documents, uploads)
+            ]
         }
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        logger.error(f"Error processing document: {str(e)}")
+        logger.error(f"Error processing document batch: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for upload in uploads:
+            upload.cleanup()
+
+
+def summarize_batch(job_info: Dict) -> Dict:
+    """Counts and per-document progress of a batch embedding job."""
+    documents = [
+        {
+            **d["metadata"],
+            "status": "INGESTED" if d.get("ingested") else d["status"],
+            "error": d.get("error")
+        }
+        for d in job_info["documents"].values()
+    ]
+    counts = {}
+    for document in documents:
+        counts[document["status"]] = counts.get(document["status"], 0) + 1
+    return {
+        "status": job_info["status"],
+        "total": len(documents),
+        "counts": counts,
+        "documents": documents
+    }
+
+
+@router.post("/bulk")
+async def bulk_upload_documents(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(..., description=".docx files and/or .zip/.tar archives of them"),
+    job_manager: PuhtiJobManager = Depends(get_job_manager),
+    milvus_client: MilvusClient = Depends(get_milvus_client),
+    neo4j_client: Neo4jClient = Depends(get_neo4j_client)
+):
+    """Ingest a whole collection as one consolidated embedding workload.
+
+    Archives are extracted entry by entry, all documents are staged on
+    Puhti in one transfer and embedded by a single batch job, and one
+    background task ingests each document as it finishes. Progress is
+    available from /documents/bulk/{batch_id}.
+    """
+    staging = BulkStaging()
+    try:
+        for file in files:
+            await staging.add_upload(iter_upload(file), file.filename)
+        if not staging.documents:
+            raise HTTPException(status_code=400, detail={"message": "No .docx documents found", "skipped": staging.skipped})
+        
+        batch_id, documents = await job_manager.submit_embedding_batch(staging.paths())
+        job_manager.jobs[batch_id]["skipped"] = staging.skipped
+        
+        background_tasks.add_task(
+            monitor_batch_completion,
+            job_id=batch_id,
+            job_manager=job_manager,
+            milvus_client=milvus_client,
+            neo4j_client=neo4j_client
+        )
+        
+        logger.info(f"Bulk batch {batch_id}: {len(documents)} documents, {len(staging.skipped)} skipped")
+        return {
+            "message": f"Processing of {len(documents)} documents started",
+            "batch_id": batch_id,
+            "documents": len(documents),
+            "skipped": staging.skipped
+        }
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing bulk upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        staging.cleanup()
+
+
+@router.get("/bulk/{batch_id}")
+async def get_bulk_status(
+    batch_id: str,
+    job_manager: PuhtiJobManager = Depends(get_job_manager)
+):
+    """Per-document progress of a bulk upload, as last recorded by its background task."""
+    job_info = job_manager.jobs.get(batch_id)
+    if job_info is None or not job_info.get("batch"):
+        raise HTTPException(status_code=404, detail=f"No bulk batch {batch_id}")
+    return {
+        "batch_id": batch_id,
+        "submitted_at": job_info["submitted_at"],
+        "skipped": job_info.get("skipped", []),
+        **summarize_batch(job_info)
+    }
 
 
 @router.get("/status/{job_id}")
@@ -166,10 +518,19 @@ async def get_document_status(
     job_manager: PuhtiJobManager = Depends(get_job_manager)
 ):
     """Get the status of a document processing job."""
+    job_info = job_manager.jobs.get(job_id)
+    if job_info is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
     try:
-        job_info = await job_manager.check_embedding_job(job_id)
+        # Report only; collecting results is the job of the monitor in the worker that owns the job
+        if job_info.get("batch"):
+            return summarize_batch(job_info)
+        status = job_info["status"]
+        if status not in ("COMPLETED", "FAILED") and job_info.get("slurm_job_id"):
+            if await job_manager.get_slurm_state(job_info["slurm_job_id"]) == "RUNNING":
+                status = "RUNNING"
         return {
-            "status": job_info["status"],
+            "status": status,
             "error": job_info.get("error", None)
         }
     except Exception as e:
@@ -178,42 +539,30 @@ async def get_document_status(
 
 @router.get("/list")
 async def list_documents(
-    milvus_client: MilvusClient = Depends(get_milvus_client),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    person_name: Optional[str] = None,
+    search: Optional[str] = Query(None, description="Substring of the document ID or person name"),
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    sort_by: str = Query("created_at", description=f"One of {sorted(CATALOG_SORT_FIELDS)}"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
     neo4j_client: Neo4jClient = Depends(get_neo4j_client)
 ):
-    """Get list of all processed documents with their metadata."""
+    """Get one page of processed documents from the catalog, with totals for the whole filter."""
+    if sort_by not in CATALOG_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of {sorted(CATALOG_SORT_FIELDS)}")
     try:
-        # Get unique document IDs from Milvus
-        expr = "chunk_index == 0"  # Get only first chunks to avoid duplicates
-        results = milvus_client.collection.query(
-            expr=expr,
-            output_fields=["document_id", "person_name", "person_age"]
+        return await neo4j_client.list_documents(
+            offset=offset,
+            limit=limit,
+            person_name=person_name,
+            search=search,
+            min_age=min_age,
+            max_age=max_age,
+            sort_by=sort_by,
+            descending=order == "desc"
         )
-        
-        documents = []
-        for result in results:
-            # Get document stats from Milvus
-            stats = milvus_client.get_document_stats(result["document_id"])
-            
-            # Get additional context from Neo4j
-            with neo4j_client.driver.session() as session:
-                context = session.run("""
-                    MATCH (d:Document {id: $doc_id})
-                    RETURN d.created_at as created_at
-                """, doc_id=result["document_id"]).single()
-                
-                created_at = context["created_at"] if context else None
-            
-            documents.append({
-                "document_id": result["document_id"],
-                "person_name": result["person_name"],
-                "person_age": result["person_age"],
-                "chunk_count": stats["chunk_count"],
-                "created_at": created_at
-            })
-        
-        return {"documents": documents}
-        
     except Exception as e:
         logger.error(f"Error listing documents: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -230,13 +579,14 @@ async def delete_document(
         expr = f'document_id == "{document_id}"'
         milvus_client.collection.delete(expr)
         
-        # Delete from Neo4j
-        with neo4j_client.driver.session() as session:
-            session.run("""
-                MATCH (d:Document)
-                WHERE d.id STARTS WITH $doc_id
-                DETACH DELETE d
-            """, doc_id=document_id)
+        # Delete chunks and the catalog entry from Neo4j
+        await neo4j_client.delete_document(document_id)
+        
+        get_bm25_index().remove_document(document_id)
+        
+        # Drop cached answers that were grounded in this document
+        get_semantic_cache().evict_documents([document_id])
+        get_corpus_sync().publish(document_id, "remove")
         
         return {"message": f"Document {document_id} deleted successfully"}
         
@@ -1,16 +1,20 @@
 ## src/api/v1/queries.py
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from typing import Dict, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import AsyncGenerator, Dict, Optional
+import json
 from src.models.query import QueryRequest, QueryResponse, ErrorResponse, QueryStatusResponse, CompletedQueryResponse
 from src.services.query_service import QueryService
 from src.db.milvus import MilvusClient
 from src.db.neo4j import Neo4jClient
+from src.db import pool
 import logging
 import asyncio
 import sys
 import os
 from datetime import datetime
-from src.services.job_manager import PuhtiJobManager
+from src.services.job_manager import get_job_manager
 from src.services.service_factory import ServiceFactory
 
 # Ensure the src directory is in the Python path
@@ -23,20 +27,18 @@ async def get_query_service():
     return await ServiceFactory.get_query_service()
 
 async def get_milvus_client():
-    """Get Milvus client instance."""
-    client = MilvusClient()
+    """Get the shared Milvus client; it stays connected between requests."""
     try:
-        yield client
-    finally:
-        client.close()
+        return pool.get_milvus_client()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Milvus unavailable: {str(e)}")
 
 async def get_neo4j_client():
-    """Get Neo4j client instance."""
-    client = Neo4jClient()
+    """Get the shared Neo4j client; its driver pools connections between requests."""
     try:
-        yield client
-    finally:
-        client.close()
+        return pool.get_neo4j_client()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Neo4j unavailable: {str(e)}")
 
 @router.post("/", response_model=QueryResponse)
 async def process_query(
@@ -52,7 +54,8 @@ async def process_query(
             query=query.text,
             milvus_client=milvus_client,
             neo4j_client=neo4j_client,
-            max_tokens=query.max_tokens
+            max_tokens=query.max_tokens,
+            filters=query.filters
         )
         return result
     except Exception as e:
@@ -62,6 +65,48 @@ async def process_query(
             detail=str(e)
         )
 
+async def _sse(events: AsyncGenerator[Dict, None]) -> AsyncGenerator[str, None]:
+    """Encode query events as server-sent events."""
+    try:
+        async for event in events:
+            payload = json.dumps(jsonable_encoder(event), ensure_ascii=False)
+            yield f"event: {event['event']}\ndata: {payload}\n\n"
+    except Exception as e:
+        logger.error(f"Error streaming query events: {str(e)}")
+        payload = json.dumps({"event": "error", "message": "Streaming failed", "error": str(e)})
+        yield f"event: error\ndata: {payload}\n\n"
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@router.post("/stream")
+async def stream_query(
+    query: QueryRequest,
+    query_service: QueryService = Depends(get_query_service),
+    milvus_client: MilvusClient = Depends(get_milvus_client),
+    neo4j_client: Neo4jClient = Depends(get_neo4j_client)
+):
+    """Submit a query and stream stage events and generated tokens as server-sent events."""
+    events = query_service.stream_query(
+        query=query.text,
+        milvus_client=milvus_client,
+        neo4j_client=neo4j_client,
+        max_tokens=query.max_tokens,
+        filters=query.filters
+    )
+    return StreamingResponse(_sse(events), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/{job_id}/stream")
+async def stream_query_job(
+    job_id: str,
+    query_service: QueryService = Depends(get_query_service)
+):
+    """Attach to an already submitted query and stream its progress and tokens."""
+    return StreamingResponse(
+        _sse(query_service.stream_job(job_id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @router.get("/{job_id}/", response_model=QueryStatusResponse)
 async def get_query_status(
     job_id: str,
@@ -117,18 +162,14 @@ async def get_query_status(
 async def monitor_query_completion(job_id: str, query_service: QueryService):
     """Monitor LLM job completion."""
     try:
-        while True:
-            result = await query_service.check_query_status(job_id)
-            
-            if result["status"] == "COMPLETED":
-                logger.info(f"Query {job_id} completed successfully")
-                break
-                
-            elif result["status"] == "FAILED":
-                logger.error(f"Query {job_id} failed")
-                break
-                
-            await asyncio.sleep(10)  # Check every 10 seconds
+        # Block on the shared Slurm poller instead of polling Puhti ourselves
+        await query_service.puhti_job_manager.wait_for_job(job_id)
+        result = await query_service.check_query_status(job_id)
+        
+        if result["status"] == "COMPLETED":
+            logger.info(f"Query {job_id} completed successfully")
+        else:
+            logger.error(f"Query {job_id} failed")
             
     except Exception as e:
         logger.error(f"Error monitoring query {job_id}: {str(e)}")
@@ -141,9 +182,21 @@ async def healthcheck():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@router.get("/cache/stats")
+async def get_cache_stats(query_service: QueryService = Depends(get_query_service)):
+    """Get hit/miss metrics of the semantic answer cache."""
+    return query_service.answer_cache.stats()
+
+@router.get("/embedding/stats")
+async def get_embedding_stats(query_service: QueryService = Depends(get_query_service)):
+    """Get queue depth, batch size and wait-time metrics of the query embedding batcher."""
+    batch_stats = getattr(query_service.embedding_service, "batch_stats", None)
+    stats = batch_stats() if batch_stats else None
+    return {"batching": stats is not None, **(stats or {})}
+
 @router.get("/test")
 async def test_llm():
-    job_manager = PuhtiJobManager()
+    job_manager = get_job_manager()
     test_result = await job_manager.test_llm_job_with_context()
     return {
         "success": test_result,
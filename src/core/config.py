@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # API Settings
@@ -18,16 +18,37 @@ class Settings(BaseSettings):
     # Milvus Settings
     MILVUS_HOST: str
     MILVUS_PORT: int
+    MILVUS_INSERT_BATCH_BYTES: int = 16 * 1024 * 1024
+    MILVUS_FLUSH_ROWS: int = 10000
+    MILVUS_FLUSH_INTERVAL: float = 60.0
+    MILVUS_CONNECT_TIMEOUT: float = 10.0
+    MILVUS_RELOAD_INTERVAL: int = 300
+    MILVUS_METRIC_TYPE: str = "IP"
+    MILVUS_INDEX_TYPE: str = "IVF_FLAT"  # IVF_FLAT, IVF_SQ8, HNSW or FLAT
+    MILVUS_INDEX_PARAMS: Dict = {}
+    MILVUS_SEARCH_PARAMS: Dict = {}
     
     # Neo4j Settings
     NEO4J_HOST: str
     NEO4J_PORT: int
     NEO4J_AUTH: str
     NEO4J_URI: str
+    NEO4J_MAX_CONNECTION_POOL_SIZE: int = 50
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = 60.0
+    NEO4J_MAX_CONNECTION_LIFETIME: float = 3600.0
+    NEO4J_LIVENESS_CHECK_TIMEOUT: float = 30.0
     # Model Settings
     MODEL_ID: str = "Finnish-NLP/llama-7b-finnish-instruct-v0.2"
     EMBEDDING_MODEL: str = "TurkuNLP/sbert-cased-finnish-paraphrase"
     EMBEDDING_DIM: int = 768
+    EMBEDDING_ENGINE: str = "torch"  # "torch" or "onnx" (int8-quantized, CPU)
+    ONNX_MODEL_PATH: str = ""  # defaults to hugging_face_models/onnx/model.int8.onnx
+    EMBEDDING_THREADS: int = 0  # ONNX Runtime intra-op threads; 0 lets it decide
+    EMBEDDING_BATCHING_ENABLED: bool = True  # coalesce concurrent query embeddings
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0  # how long the first request waits for company
+    EMBEDDING_TOKEN_BUDGET: int = 8192  # padded tokens per document embedding batch
+    EMBEDDING_MAX_BATCH_SIZE: int = 64
     MAX_TOKENS: int = 2048
     
     # GPU Settings
@@ -36,10 +57,79 @@ class Settings(BaseSettings):
     
     # Cache Settings
     CACHE_DIR: str = "/src/cache"
+    EMBEDDING_CACHE_DIR: str = "/src/cache/embeddings"
+    EMBEDDING_CACHE_SIZE: int = 20000
+    
+    # Persistent LLM Worker Settings
+    LLM_WORKER_ENABLED: bool = True
+    LLM_WORKER_JOB_NAME: str = "rag_llm_worker"
+    LLM_WORKER_TIME_LIMIT: str = "04:00:00"
+    LLM_WORKER_IDLE_TIMEOUT: int = 900
+    
+    # Batch Embedding Job Settings
+    EMBEDDING_BATCH_DOCUMENTS_PER_TASK: int = 12  # documents sharing one model load; more become an array
+    EMBEDDING_BATCH_STARTUP_SECONDS: int = 180  # environment and model load per array task
+    EMBEDDING_BATCH_SECONDS_PER_DOCUMENT: int = 45  # conversion and embedding, with headroom
+    EMBEDDING_BATCH_TEST_MAX_ARRAY_TASKS: int = 4  # gputest; larger batches go to gpu
+    EMBEDDING_BATCH_TEST_TIME_LIMIT: int = 15 * 60  # gputest maximum
+    EMBEDDING_BATCH_MAX_ARRAY_TASKS: int = 32  # gpu partition
+    
+    # Upload Settings
+    UPLOAD_SPOOL_DIR: str = "/tmp/ragion_uploads"
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_BYTES: int = 200 * 1024 * 1024
+    UPLOAD_PIPELINE_DEPTH: int = 8  # chunks buffered between the spool and the Puhti transfer
+    BULK_MAX_BYTES: int = 4 * 1024 * 1024 * 1024  # archives and extracted documents per bulk upload
+    
+    # Ingestion Routing Settings
+    EMBEDDING_ROUTING: str = "auto"  # "auto", "local" or "puhti"
+    LOCAL_EMBEDDING_SECONDS_PER_1K_TOKENS: float = 0.3  # initial CPU cost, refined from actual runs
+    LOCAL_EMBEDDING_LOAD_SECONDS: float = 15.0
+    LOCAL_EMBEDDING_MAX_TOKENS: int = 200000
+    REMOTE_EMBEDDING_OVERHEAD_SECONDS: float = 90.0  # staging, job start-up, model load, download
+    REMOTE_EMBEDDING_SECONDS_PER_1K_TOKENS: float = 0.01
+    REMOTE_EMBEDDING_DEFAULT_WAIT: float = 120.0  # queue wait when there is no history
+    REMOTE_WAIT_CACHE_SECONDS: int = 60
+    REMOTE_WAIT_HISTORY_HOURS: int = 48
+    REMOTE_WAIT_SAMPLES: int = 20
+    EMBEDDING_ROUTING_LEARNING_RATE: float = 0.2
+    
+    # Job Registry Settings
+    JOB_REGISTRY_PATH: str = "/src/cache/jobs.sqlite3"
+    JOB_REGISTRY_BUSY_TIMEOUT: float = 5.0
+    JOB_REGISTRY_RETENTION_DAYS: float = 7.0
+    JOB_REGISTRY_LIVE_RECORDS: int = 1000  # job records kept in memory per process
+    
+    # Worker Settings (several uvicorn workers on one host)
+    WORKER_STATE_DIR: str = "/src/cache/workers"
+    WORKER_LEADER_INTERVAL: float = 5.0  # how often followers try to take over leadership
+    WORKER_RECOVERY_INTERVAL: float = 30.0  # how often the leader adopts jobs of dead workers
+    CORPUS_SYNC_INTERVAL: float = 2.0  # how often workers apply other workers' ingestions
+    
+    # Answer Streaming Settings
+    STREAM_POLL_INTERVAL: float = 1.0
+    
+    # Semantic Answer Cache Settings
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_SIZE: int = 1024
+    SEMANTIC_CACHE_TTL: float = 86400.0
+    
+    # Hybrid Retrieval Settings
+    HYBRID_SEARCH_ENABLED: bool = True
+    HYBRID_CANDIDATES: int = 20
+    RRF_K: int = 60
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    BM25_STEM_LENGTH: int = 5
+    PERSON_SCOPED_SEARCH: bool = True
     
     # Service Health Check Settings
     MILVUS_HEALTH_CHECK_INTERVAL: int = 30
     NEO4J_HEALTH_CHECK_INTERVAL: int = 30
+    PUHTI_HEALTH_CHECK_INTERVAL: int = 300
+    HEALTH_PROBE_TIMEOUT: float = 5.0
+    HEALTH_RESET_AFTER_FAILURES: int = 3  # consecutive failed probes before a shared client is reconnected
 
     # Other Settings
     MINIO_ACCESS_KEY: str
@@ -58,6 +148,18 @@ class Settings(BaseSettings):
     PUHTI_USERNAME: str = "safdarih"
     PUHTI_PROJECT: str = "project_2011638"
     SSH_KEY_PATH: str = "/root/.ssh/id_rsa"
+
+    # Puhti SSH Transport Settings
+    PUHTI_SSH_POOL_SIZE: int = 4
+    PUHTI_SSH_KEEPALIVE: int = 30
+    PUHTI_SSH_CONNECT_TIMEOUT: float = 15.0
+    PUHTI_SSH_CONNECT_RETRIES: int = 3
+    PUHTI_SSH_OPERATION_TIMEOUT: float = 30.0
+    PUHTI_SSH_TRANSFER_TIMEOUT: float = 300.0
+
+    # Slurm Poller Settings
+    SLURM_POLL_MIN_INTERVAL: float = 5.0
+    SLURM_POLL_MAX_INTERVAL: float = 60.0
     @property
     def NEO4J_USER(self):
         return self.NEO4J_AUTH.split("/")[0]
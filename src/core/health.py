@@ -1,37 +1,189 @@
-from src.db.milvus import MilvusClient
-from src.db.neo4j import Neo4jClient
+from src.db.pool import get_milvus_client, get_neo4j_client, reset_milvus_client, reset_neo4j_client
 from src.core.config import settings
+from src.services.puhti_transport import get_puhti_transport
+from pymilvus import utility
+from typing import Dict, List, Optional
+import asyncio
+import bisect
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-async def check_milvus_health() -> bool:
-    """Check if Milvus is healthy."""
-    try:
-        client = MilvusClient()
-        # Perform a simple operation
-        client.collection.flush()
-        return True
-    except Exception as e:
-        logger.error(f"Milvus health check failed: {str(e)}")
-        return False
+# Upper bounds of the probe latency buckets, in milliseconds
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
 
-async def check_neo4j_health() -> bool:
-    """Check if Neo4j is healthy."""
-    try:
-        client = Neo4jClient()
-        with client.driver.session() as session:
-            result = session.run("RETURN 1 as test")
-            return result.single()["test"] == 1
-    except Exception as e:
-        logger.error(f"Neo4j health check failed: {str(e)}")
-        return False
 
-async def check_gpu_availability() -> bool:
+class LatencyHistogram:
+    """Cumulative probe latency histogram with fixed millisecond buckets."""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, latency_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, latency_ms)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+
+    def to_dict(self) -> Dict:
+        labels = [f"le_{bound}ms" for bound in self.buckets] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+def check_milvus_health(client) -> bool:
+    """Read-only Milvus probe: the shared connection answers and the collection is loaded."""
+    state = utility.load_state(client.collection_name)
+    return getattr(state, "name", str(state)) == "Loaded"
+
+
+def check_neo4j_health(client) -> bool:
+    """Read-only Neo4j probe over a pooled connection of the shared driver."""
+    with client.driver.session() as session:
+        result = session.run("RETURN 1 as test")
+        return result.single()["test"] == 1
+
+
+def check_gpu_availability() -> bool:
     """Check if GPU is available and working."""
     try:
         import torch
         return torch.cuda.is_available()
     except Exception as e:
         logger.error(f"GPU check failed: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+
+async def check_puhti_health() -> Dict[str, bool]:
+    """Probe SSH reachability and the Slurm controller with one read-only squeue."""
+    try:
+        _, stderr, exit_status = await get_puhti_transport().exec('squeue -u $USER -h -o "%i"')
+    except Exception as e:
+        logger.error(f"Puhti SSH health check failed: {str(e) or type(e).__name__}")
+        return {"ssh": False, "slurm": False}
+    if exit_status != 0:
+        logger.error(f"Slurm health check failed: {stderr}")
+    return {"ssh": True, "slurm": exit_status == 0}
+
+
+class HealthMonitor:
+    """Probes backing services in the background and serves the last snapshot.
+
+    Probes reuse the shared database clients and only issue read-only calls.
+    ``/health`` returns the cached snapshot without touching any service.
+    Only the probe call itself is bounded by the probe timeout; getting the
+    shared client (which connects it after a reset) is not. A shared
+    client is reset only after HEALTH_RESET_AFTER_FAILURES consecutive
+    failed probes, since resetting disconnects it under live requests.
+    """
+
+    def __init__(self, probe_timeout: Optional[float] = None):
+        self.probe_timeout = probe_timeout or settings.HEALTH_PROBE_TIMEOUT
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.results: Dict[str, Dict] = {}
+        self.failures: Dict[str, int] = {}
+        self.checked_at: Optional[float] = None
+        self._puhti_checked_at = 0.0
+        self._snapshot: Dict = {"status": "starting", "services": {}}
+
+    async def _probe(self, name: str, check, get_client=None, reset_client=None) -> bool:
+        start = time.perf_counter()
+        error = None
+        try:
+            args = ()
+            if get_client is not None:
+                args = (await asyncio.to_thread(get_client),)
+                start = time.perf_counter()
+            healthy = await asyncio.wait_for(asyncio.to_thread(check, *args), timeout=self.probe_timeout)
+        except Exception as e:
+            healthy = False
+            error = str(e) or type(e).__name__
+            logger.error(f"{name} health check failed: {error}")
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.histograms.setdefault(name, LatencyHistogram()).observe(latency_ms)
+        self.results[name] = {"healthy": healthy, "latency_ms": round(latency_ms, 2), "error": error}
+        self.failures[name] = 0 if healthy else self.failures.get(name, 0) + 1
+        if reset_client and self.failures[name] >= settings.HEALTH_RESET_AFTER_FAILURES:
+            logger.warning(f"{name} failed {self.failures[name]} probes in a row, reconnecting")
+            self.failures[name] = 0
+            await asyncio.to_thread(reset_client)
+        return healthy
+
+    async def _probe_puhti(self):
+        start = time.perf_counter()
+        try:
+            reachable = await asyncio.wait_for(
+                check_puhti_health(),
+                timeout=self.probe_timeout + settings.PUHTI_SSH_OPERATION_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            reachable = {"ssh": False, "slurm": False}
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.histograms.setdefault("puhti", LatencyHistogram()).observe(latency_ms)
+        for name, healthy in reachable.items():
+            self.results[name] = {"healthy": healthy, "latency_ms": round(latency_ms, 2), "error": None}
+        self._puhti_checked_at = time.time()
+
+    async def refresh(self) -> Dict:
+        """Run all due probes concurrently and publish a new snapshot."""
+        probes = [
+            self._probe("milvus", check_milvus_health, get_milvus_client, reset_milvus_client),
+            self._probe("neo4j", check_neo4j_health, get_neo4j_client, reset_neo4j_client),
+        ]
+        if "gpu" not in self.results or self.results["gpu"]["error"]:
+            # Device availability does not change while the process runs
+            probes.append(self._probe("gpu", check_gpu_availability))
+        if time.time() - self._puhti_checked_at >= settings.PUHTI_HEALTH_CHECK_INTERVAL:
+            probes.append(self._probe_puhti())
+        await asyncio.gather(*probes)
+
+        self.checked_at = time.time()
+        self._snapshot = self._build_snapshot()
+        return self._snapshot
+
+    def _build_snapshot(self) -> Dict:
+        def state(name: str, up: str = "healthy", down: str = "unhealthy") -> str:
+            if name not in self.results:
+                return "unknown"
+            return up if self.results[name]["healthy"] else down
+
+        core_healthy = all(self.results.get(name, {}).get("healthy") for name in ("milvus", "neo4j"))
+        return {
+            "status": "healthy" if core_healthy else "degraded",
+            "checked_at": self.checked_at,
+            "services": {
+                "milvus": state("milvus"),
+                "neo4j": state("neo4j"),
+                "gpu": state("gpu", "available", "unavailable"),
+                "puhti_ssh": state("ssh", "reachable", "unreachable"),
+                "slurm": state("slurm", "reachable", "unreachable"),
+            },
+            "probes": dict(self.results),
+            "latency_histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+        }
+
+    def snapshot(self) -> Dict:
+        """Return the last snapshot; it is marked stale if probing has stopped."""
+        if self.checked_at is None:
+            return self._snapshot
+        age = time.time() - self.checked_at
+        if age > 3 * settings.MILVUS_HEALTH_CHECK_INTERVAL:
+            return {**self._snapshot, "status": "stale", "age_seconds": round(age, 1)}
+        return {**self._snapshot, "age_seconds": round(age, 1)}
+
+
+_health_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Get the process-wide health monitor."""
+    global _health_monitor
+    if _health_monitor is None:
+        _health_monitor = HealthMonitor()
+    return _health_monitor
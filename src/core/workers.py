@@ -0,0 +1,111 @@
+import asyncio
+import fcntl
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCoordinator:
+    """Identity and leader election for one of several uvicorn worker processes on a host.
+
+    Every worker holds an exclusive ``flock`` on its own lock file for as
+    long as it lives, so any process can tell whether a job's owner is
+    still alive. At most one worker also holds ``leader.lock`` and runs the
+    host-wide duties: polling Slurm, recovering jobs of dead workers and
+    pruning the job registry. The kernel drops both locks when a process
+    exits, however it exits, so another worker takes over on its next try.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.WORKER_STATE_DIR)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.worker_id = uuid.uuid4().hex
+        self._worker_file = open(self._worker_path(self.worker_id), "w")
+        fcntl.flock(self._worker_file, fcntl.LOCK_EX)
+        self._leader_file = None
+        logger.info(f"Worker {self.worker_id} (pid {os.getpid()})")
+
+    def _worker_path(self, worker_id: str) -> Path:
+        return self.directory / f"worker-{worker_id}.lock"
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_file is not None
+
+    def try_lead(self) -> bool:
+        """Become the leader if no other worker is; returns whether this worker leads."""
+        if self._leader_file is not None:
+            return True
+        leader_file = open(self.directory / "leader.lock", "a+")
+        try:
+            fcntl.flock(leader_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            leader_file.close()
+            return False
+        leader_file.seek(0)
+        leader_file.truncate()
+        leader_file.write(f"{self.worker_id} {os.getpid()}\n")
+        leader_file.flush()
+        self._leader_file = leader_file
+        logger.info(f"Worker {self.worker_id} is now the leader")
+        return True
+
+    def is_alive(self, worker_id: Optional[str]) -> bool:
+        """Whether the worker with this ID is still running; unknown IDs count as dead."""
+        if not worker_id:
+            return False
+        if worker_id == self.worker_id:
+            return True
+        path = self._worker_path(worker_id)
+        try:
+            with open(path, "r") as f:
+                fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            # Locked: its owner is still running
+            return True
+        path.unlink(missing_ok=True)
+        return False
+
+    @asynccontextmanager
+    async def exclusive(self, name: str):
+        """Hold a host-wide lock named ``name`` for the block, excluding every other worker."""
+        lock_file = open(self.directory / f"{name}.lock", "a")
+        try:
+            # flock blocks, so wait for it off the event loop; closing the file releases it
+            await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+            yield
+        finally:
+            lock_file.close()
+
+    def close(self):
+        for f in (self._leader_file, self._worker_file):
+            if f is not None:
+                f.close()
+        self._leader_file = None
+        self._worker_path(self.worker_id).unlink(missing_ok=True)
+
+
+_coordinator: Optional[WorkerCoordinator] = None
+
+
+def get_worker_coordinator() -> WorkerCoordinator:
+    """Get this process's worker coordinator."""
+    global _coordinator
+    if _coordinator is None:
+        _coordinator = WorkerCoordinator()
+    return _coordinator
+
+
+def close_worker_coordinator():
+    global _coordinator
+    if _coordinator is not None:
+        _coordinator.close()
+        _coordinator = None
@@ -0,0 +1,344 @@
+import base64
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+from src.core.config import settings
+from src.core.workers import get_worker_coordinator
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("COMPLETED", "FAILED")
+
+# Large per-process results (downloaded document embeddings and their
+# texts) stay in memory; they can be fetched from Puhti again if lost
+TRANSIENT_FIELDS = {"embeddings", "texts"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    namespace TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    kind TEXT,
+    status TEXT,
+    slurm_job_id TEXT,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, job_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_slurm_job_id ON jobs (slurm_job_id);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (namespace, status);
+CREATE TABLE IF NOT EXISTS slurm_jobs (
+    slurm_job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    terminal INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS slurm_jobs_active ON slurm_jobs (terminal);
+CREATE TABLE IF NOT EXISTS corpus_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id TEXT NOT NULL,
+    action TEXT NOT NULL,
+    worker_id TEXT,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _encode(value):
+    if isinstance(value, np.ndarray):
+        return {
+            "__ndarray__": base64.b64encode(np.ascontiguousarray(value).tobytes()).decode("ascii"),
+            "dtype": str(value.dtype),
+            "shape": list(value.shape),
+        }
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    # Anything else would come back as a string that no longer validates
+    raise TypeError(f"Cannot store {type(value).__name__} in the job registry")
+
+
+def _decode(obj: Dict):
+    if "__ndarray__" in obj:
+        data = base64.b64decode(obj["__ndarray__"])
+        return np.frombuffer(data, dtype=obj["dtype"]).reshape(obj["shape"]).copy()
+    return obj
+
+
+class JobRecord(dict):
+    """A job's fields; assigning or updating top-level keys writes the job through to SQLite.
+
+    Changes inside nested values (e.g. one document of a batch) are not
+    seen automatically; call save() after making them.
+    """
+
+    def __init__(self, registry: "JobRegistry", namespace: str, job_id: str, data: Dict, version: int):
+        super().__init__(data)
+        self._registry = registry
+        self._namespace = namespace
+        self.job_id = job_id
+        self._version = version
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if key not in TRANSIENT_FIELDS:
+            self.save()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.save()
+
+    def save(self):
+        self._registry._write(self)
+
+
+class JobNamespace:
+    """Dict-like view of one namespace of the registry (job ID -> JobRecord)."""
+
+    def __init__(self, registry: "JobRegistry", namespace: str):
+        self.registry = registry
+        self.namespace = namespace
+
+    def get(self, job_id: str, default=None):
+        record = self.registry.load(self.namespace, job_id)
+        return default if record is None else record
+
+    def __getitem__(self, job_id: str) -> JobRecord:
+        record = self.registry.load(self.namespace, job_id)
+        if record is None:
+            raise KeyError(job_id)
+        return record
+
+    def __setitem__(self, job_id: str, data: Dict):
+        self.registry.create(self.namespace, job_id, data)
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.registry.load(self.namespace, job_id) is not None
+
+    def find(self, slurm_job_id: Optional[str] = None, status: Optional[str] = None) -> List[JobRecord]:
+        return self.registry.find(self.namespace, slurm_job_id=slurm_job_id, status=status)
+
+    def unfinished(self) -> List[JobRecord]:
+        return self.registry.unfinished(self.namespace)
+
+
+class JobRegistry:
+    """Durable job table in SQLite (WAL mode), shared by every worker process on the host.
+
+    Jobs are keyed by (namespace, job_id) and indexed by Slurm job ID and
+    status. Each process keeps one live JobRecord per job it has touched,
+    so in-memory fields survive between calls; loads refresh it from disk
+    whenever another process has written a newer version. New jobs are
+    stamped with ``owner``, the worker whose tasks follow them.
+
+    The same database holds the Slurm states published by the leader's
+    poller and the log of corpus changes the workers replay.
+    """
+
+    def __init__(self, path: Optional[str] = None, owner: Optional[str] = None):
+        self.path = Path(path or settings.JOB_REGISTRY_PATH)
+        self.owner = owner
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={int(settings.JOB_REGISTRY_BUSY_TIMEOUT * 1000)}")
+        self._conn.executescript(SCHEMA)
+        self._live: Dict[tuple, JobRecord] = {}
+        logger.info(f"Job registry at {self.path}")
+
+    def namespace(self, name: str) -> JobNamespace:
+        return JobNamespace(self, name)
+
+    @staticmethod
+    def _dump(record: Dict) -> str:
+        data = {key: value for key, value in record.items() if key not in TRANSIENT_FIELDS}
+        return json.dumps(data, default=_encode, ensure_ascii=False)
+
+    def create(self, namespace: str, job_id: str, data: Dict) -> JobRecord:
+        now = time.time()
+        if self.owner is not None:
+            data = {**data, "owner": data.get("owner", self.owner)}
+        with self._lock:
+            record = JobRecord(self, namespace, job_id, data, 1)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (namespace, job_id, kind, status, slurm_job_id, data, version, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)",
+                (namespace, job_id, data.get("kind"), data.get("status"), data.get("slurm_job_id"),
+                 self._dump(record), now, now)
+            )
+            self._live[(namespace, job_id)] = record
+            self._evict()
+            return record
+
+    def _evict(self):
+        """Forget the oldest finished live records beyond JOB_REGISTRY_LIVE_RECORDS; they stay on disk."""
+        excess = len(self._live) - settings.JOB_REGISTRY_LIVE_RECORDS
+        if excess <= 0:
+            return
+        finished = [key for key, record in self._live.items() if record.get("status") in FINISHED_STATUSES]
+        for key in finished[:excess]:
+            del self._live[key]
+
+    def _write(self, record: JobRecord):
+        with self._lock:
+            # Versions are bumped in the database so writers in different processes never collide
+            row = self._conn.execute(
+                "UPDATE jobs SET kind = ?, status = ?, slurm_job_id = ?, data = ?, version = version + 1, updated_at = ? "
+                "WHERE namespace = ? AND job_id = ? RETURNING version",
+                (record.get("kind"), record.get("status"), record.get("slurm_job_id"), self._dump(record),
+                 time.time(), record._namespace, record.job_id)
+            ).fetchone()
+            if row is not None:
+                record._version = row[0]
+
+    def _materialize(self, namespace: str, job_id: str, data: str, version: int) -> JobRecord:
+        key = (namespace, job_id)
+        record = self._live.get(key)
+        if record is None:
+            record = JobRecord(self, namespace, job_id, json.loads(data, object_hook=_decode), version)
+            self._live[key] = record
+        elif record._version != version:
+            # Written by another process since we last looked; keep our transient fields
+            dict.update(record, json.loads(data, object_hook=_decode))
+            record._version = version
+        return record
+
+    def load(self, namespace: str, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, version FROM jobs WHERE namespace = ? AND job_id = ?",
+                (namespace, job_id)
+            ).fetchone()
+            if row is None:
+                self._live.pop((namespace, job_id), None)
+                return None
+            return self._materialize(namespace, job_id, *row)
+
+    def _select(self, where: str, params: tuple) -> List[JobRecord]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT namespace, job_id, data, version FROM jobs WHERE {where} ORDER BY created_at",
+                params
+            ).fetchall()
+            return [self._materialize(*row) for row in rows]
+
+    def find(self, namespace: str, slurm_job_id: Optional[str] = None, status: Optional[str] = None) -> List[JobRecord]:
+        clauses, params = ["namespace = ?"], [namespace]
+        if slurm_job_id is not None:
+            clauses.append("slurm_job_id = ?")
+            params.append(slurm_job_id)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        return self._select(" AND ".join(clauses), tuple(params))
+
+    def unfinished(self, namespace: str) -> List[JobRecord]:
+        return self._select(
+            f"namespace = ? AND (status IS NULL OR status NOT IN ({','.join('?' * len(FINISHED_STATUSES))}))",
+            (namespace, *FINISHED_STATUSES)
+        )
+
+    def prune(self, older_than_days: Optional[float] = None) -> int:
+        """Delete finished jobs last updated more than the retention period ago."""
+        days = settings.JOB_REGISTRY_RETENTION_DAYS if older_than_days is None else older_than_days
+        cutoff = time.time() - days * 86400
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE updated_at < ? AND status IN ({','.join('?' * len(FINISHED_STATUSES))})",
+                (cutoff, *FINISHED_STATUSES)
+            )
+            self._live = {key: record for key, record in self._live.items() if record.get("status") not in FINISHED_STATUSES}
+            self._conn.execute("DELETE FROM slurm_jobs WHERE terminal = 1 AND updated_at < ?", (cutoff,))
+            self._conn.execute("DELETE FROM corpus_changes WHERE created_at < ?", (cutoff,))
+            return cursor.rowcount
+
+    def track_slurm_jobs(self, slurm_job_ids: Iterable[str], status: str = "PENDING"):
+        """Ask the leader's poller to follow these Slurm jobs; known states are kept."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO slurm_jobs (slurm_job_id, status, updated_at) VALUES (?, ?, ?)",
+                [(str(job_id), status, now) for job_id in slurm_job_ids]
+            )
+
+    def publish_slurm_states(self, states: Dict[str, str], terminal_states: Iterable[str]):
+        terminal_states = set(terminal_states)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO slurm_jobs (slurm_job_id, status, terminal, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (slurm_job_id) DO UPDATE SET status = excluded.status, "
+                "terminal = excluded.terminal, updated_at = excluded.updated_at",
+                [(job_id, status, int(status in terminal_states), now) for job_id, status in states.items()]
+            )
+
+    def slurm_states(self, slurm_job_ids: Iterable[str]) -> Dict[str, str]:
+        job_ids = [str(job_id) for job_id in slurm_job_ids]
+        if not job_ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT slurm_job_id, status FROM slurm_jobs WHERE slurm_job_id IN ({','.join('?' * len(job_ids))})",
+                job_ids
+            ).fetchall()
+        return dict(rows)
+
+    def active_slurm_jobs(self) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT slurm_job_id FROM slurm_jobs WHERE terminal = 0").fetchall()
+        return {row[0] for row in rows}
+
+    def publish_corpus_change(self, document_id: str, action: str) -> int:
+        """Append an "add" or "remove" of a document to the corpus log; returns its sequence number."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO corpus_changes (document_id, action, worker_id, created_at) VALUES (?, ?, ?, ?)",
+                (document_id, action, self.owner, time.time())
+            )
+            return cursor.lastrowid
+
+    def corpus_changes(self, after_seq: int) -> List[tuple]:
+        """(seq, document_id, action, worker_id) of every corpus change after after_seq, in order."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, document_id, action, worker_id FROM corpus_changes WHERE seq > ? ORDER BY seq",
+                (after_seq,)
+            ).fetchall()
+
+    def last_corpus_change(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM corpus_changes").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_registry: Optional[JobRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_job_registry() -> JobRegistry:
+    """Get the process-wide job registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = JobRegistry(owner=get_worker_coordinator().worker_id)
+        return _registry
+
+
+def close_job_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+            _registry = None
@@ -1,16 +1,95 @@
 ## src/db/milvus.py
-from pymilvus import connections, Collection, utility, CollectionSchema, FieldSchema, DataType
+from pymilvus import connections, Collection, utility, CollectionSchema, FieldSchema, DataType, MilvusException
 from src.core.config import settings
+import asyncio
 import logging
 import time
+import json
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from src.models.query import SearchFilters
 
 logger = logging.getLogger(__name__)
 
+# Default build and search parameters per supported vector index type.
+# MILVUS_INDEX_PARAMS and MILVUS_SEARCH_PARAMS override them, typically with
+# values picked by `python -m scripts.milvus_index tune`.
+INDEX_BUILD_DEFAULTS = {
+    "FLAT": {},
+    "IVF_FLAT": {"nlist": 128},
+    "IVF_SQ8": {"nlist": 128},
+    "HNSW": {"M": 16, "efConstruction": 200},
+}
+SEARCH_DEFAULTS = {
+    "FLAT": {},
+    "IVF_FLAT": {"nprobe": 16},
+    "IVF_SQ8": {"nprobe": 16},
+    "HNSW": {"ef": 64},
+}
+
+
+def index_params(index_type: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+    """Build parameters for the embedding index, defaulting to the configured index."""
+    configured = index_type is None
+    index_type = (index_type or settings.MILVUS_INDEX_TYPE).upper()
+    if index_type not in INDEX_BUILD_DEFAULTS:
+        raise ValueError(f"Unsupported Milvus index type: {index_type}")
+    overrides = params if params is not None else (settings.MILVUS_INDEX_PARAMS if configured else {})
+    return {
+        "index_type": index_type,
+        "metric_type": settings.MILVUS_METRIC_TYPE,
+        "params": {**INDEX_BUILD_DEFAULTS[index_type], **overrides},
+    }
+
+
+def search_params(index_type: str, limit: int, params: Optional[Dict] = None) -> Dict:
+    """Search parameters for an index type; HNSW needs ef of at least the result limit."""
+    index_type = index_type.upper()
+    defaults = SEARCH_DEFAULTS.get(index_type, {})
+    overrides = params if params is not None else settings.MILVUS_SEARCH_PARAMS
+    # Drop overrides meant for another index type, e.g. nprobe after moving to HNSW
+    merged = {**defaults, **{key: value for key, value in overrides.items() if key in defaults}}
+    if index_type == "HNSW":
+        merged["ef"] = max(int(merged["ef"]), limit)
+    return {"metric_type": settings.MILVUS_METRIC_TYPE, "params": merged}
+
+
+# Scalar fields that searches filter on, each with an inverted index
+SCALAR_INDEX_FIELDS = ["person_name", "person_age", "document_id", "chunk_index"]
+
+
+def filter_expression(filters: Optional[SearchFilters]) -> Optional[str]:
+    """Compile search filters into a Milvus boolean expression (None when unfiltered)."""
+    if filters is None:
+        return None
+    clauses = []
+    # json.dumps gives double-quoted, escaped string literals that Milvus accepts
+    if filters.person_names is not None:
+        clauses.append(f"person_name in {json.dumps(list(filters.person_names), ensure_ascii=False)}")
+    if filters.document_ids is not None:
+        clauses.append(f"document_id in {json.dumps(list(filters.document_ids), ensure_ascii=False)}")
+    if filters.min_age is not None:
+        clauses.append(f"person_age >= {int(filters.min_age)}")
+    if filters.max_age is not None:
+        clauses.append(f"person_age <= {int(filters.max_age)}")
+    if filters.min_chunk_index is not None:
+        clauses.append(f"chunk_index >= {int(filters.min_chunk_index)}")
+    if filters.max_chunk_index is not None:
+        clauses.append(f"chunk_index <= {int(filters.max_chunk_index)}")
+    return " and ".join(clauses) or None
+
+
 class MilvusClient:
-    def __init__(self):
+    # Rows inserted since the last flush, shared by every client in the process
+    _unflushed_rows = 0
+    _last_flush_time = time.time()
+
+    def __init__(self, collection_name: str = "document_embeddings"):
+        self.collection_name = collection_name
         self._collection = None
+        self._index_type = settings.MILVUS_INDEX_TYPE
         self._last_reload_time = 0
-        self.reload_interval = 300  # 5 minutes
+        self.reload_interval = settings.MILVUS_RELOAD_INTERVAL
         self.connect()
         self.ensure_collection_exists()
 
@@ -20,7 +99,8 @@ class MilvusClient:
             connections.connect(
                 alias="default",
                 host=settings.MILVUS_HOST,
-                port=settings.MILVUS_PORT
+                port=settings.MILVUS_PORT,
+                timeout=settings.MILVUS_CONNECT_TIMEOUT
             )
             logger.info(f"Connected to Milvus at {settings.MILVUS_HOST}:{settings.MILVUS_PORT}")
         except Exception as e:
@@ -30,39 +110,70 @@ class MilvusClient:
     def ensure_collection_exists(self):
         """Ensure the collection exists, creating it if necessary and loading it."""
         try:
-            if not utility.has_collection("document_embeddings"):
-                logger.info("Collection 'document_embeddings' does not exist. Creating it now.")
-                fields = [
-                    FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-                    FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
-                    FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=settings.EMBEDDING_DIM ),
-                    FieldSchema(name="person_name", dtype=DataType.VARCHAR, max_length=100),
-                    FieldSchema(name="person_age", dtype=DataType.INT64),
-                    FieldSchema(name="document_id", dtype=DataType.VARCHAR, max_length=100),
-                    FieldSchema(name="chunk_index", dtype=DataType.INT64),
-                ]
-                schema = CollectionSchema(fields=fields, description="Document embeddings collection")
-                collection = Collection(name="document_embeddings", schema=schema)
-                
-                # Create an index for the embedding field
-                index_params = {
-                    "index_type": "IVF_FLAT",
-                    "metric_type": "IP",
-                    "params": {"nlist": 1024}
-                }
-                collection.create_index(field_name="embedding", index_params=index_params)
+            if not utility.has_collection(self.collection_name):
+                logger.info(f"Collection '{self.collection_name}' does not exist. Creating it now.")
+                self.create_collection(self.collection_name)
                 logger.info("Collection and index created successfully.")
             else:
-                logger.info("Collection 'document_embeddings' already exists.")
+                logger.info(f"Collection '{self.collection_name}' already exists.")
+
+            # Collections created before filtered search lack scalar indexes
+            collection = Collection(self.collection_name)
+            self.ensure_scalar_indexes(collection)
 
             # Load the collection into memory
-            self._collection = Collection("document_embeddings")
-            self._collection.load()
-            logger.info("Collection 'document_embeddings' loaded into memory and ready for data insertion.")
+            self._set_collection(collection)
+            logger.info(f"Collection '{self.collection_name}' loaded into memory and ready for data insertion.")
         except Exception as e:
             logger.error(f"Error ensuring collection exists: {str(e)}")
             raise
 
+    @staticmethod
+    def create_collection(name: str, index: Optional[Dict] = None) -> Collection:
+        """Create an empty embeddings collection with the given (or configured) vector index."""
+        fields = [
+            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
+            FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
+            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=settings.EMBEDDING_DIM ),
+            FieldSchema(name="person_name", dtype=DataType.VARCHAR, max_length=100),
+            FieldSchema(name="person_age", dtype=DataType.INT64),
+            FieldSchema(name="document_id", dtype=DataType.VARCHAR, max_length=100),
+            FieldSchema(name="chunk_index", dtype=DataType.INT64),
+        ]
+        schema = CollectionSchema(fields=fields, description="Document embeddings collection")
+        collection = Collection(name=name, schema=schema)
+        
+        # Create an index for the embedding field
+        collection.create_index(field_name="embedding", index_params=index or index_params())
+        MilvusClient.ensure_scalar_indexes(collection)
+        return collection
+
+    @staticmethod
+    def ensure_scalar_indexes(collection: Collection):
+        """Add inverted indexes on the filterable fields, releasing the collection if needed."""
+        indexed = {index.field_name for index in collection.indexes}
+        missing = [field for field in SCALAR_INDEX_FIELDS if field not in indexed]
+        if not missing:
+            return
+        if utility.load_state(collection.name).name == "Loaded":
+            collection.release()
+        for field in missing:
+            collection.create_index(
+                field_name=field,
+                index_name=f"{field}_idx",
+                index_params={"index_type": "INVERTED"}
+            )
+        logger.info(f"Created scalar indexes on {missing} for '{collection.name}'")
+
+    def _set_collection(self, collection: Collection):
+        collection.load()
+        self._collection = collection
+        # Search params follow the index actually built, which a migration may have changed
+        self._index_type = next(
+            (index.params.get("index_type") for index in collection.indexes if index.field_name == "embedding"),
+            settings.MILVUS_INDEX_TYPE
+        )
+        self._last_reload_time = time.time()
 
     @property
     def collection(self):
@@ -78,46 +189,53 @@ class MilvusClient:
     def _reload_collection(self):
         """Reload the collection."""
         try:
-            if not utility.has_collection("document_embeddings"):
+            if not utility.has_collection(self.collection_name):
                 raise Exception("Collection does not exist")
             
-            self._collection = Collection("document_embeddings")
-            self._collection.load()
-            self._last_reload_time = time.time()
+            self._set_collection(Collection(self.collection_name))
             logger.info("Successfully reloaded Milvus collection")
         except Exception as e:
             logger.error(f"Error reloading collection: {str(e)}")
             raise
 
-    async def search(self, query_embedding, limit: int = 5):
-        """Search for similar vectors."""
+    async def search(self, query_embedding, limit: int = 5, filters: Optional[SearchFilters] = None):
+        """Search for similar vectors, restricted to chunks matching ``filters``."""
+        expr = filter_expression(filters)
         try:
-            search_params = {
-                "metric_type": "IP",
-                "params": {"nprobe": 10}
-            }
-            
-            results = self.collection.search(
-                data=[query_embedding],
-                anns_field="embedding",
-                param=search_params,
-                limit=limit,
-                output_fields=["text", "document_id"]
-            )
+            try:
+                # pymilvus blocks, so search off the event loop to overlap with other work
+                results = await asyncio.to_thread(self._search, query_embedding, limit, expr)
+            except MilvusException as e:
+                # The name may now point at a migrated collection with another index
+                logger.warning(f"Search failed, reloading collection and retrying: {str(e)}")
+                await asyncio.to_thread(self._reload_collection)
+                results = await asyncio.to_thread(self._search, query_embedding, limit, expr)
             
             return self._process_results(results)
         except Exception as e:
             logger.error(f"Search error: {str(e)}")
             raise
 
+    def _search(self, query_embedding, limit: int, expr: Optional[str] = None):
+        return self.collection.search(
+            data=[query_embedding],
+            anns_field="embedding",
+            param=search_params(self._index_type, limit),
+            limit=limit,
+            expr=expr,
+            output_fields=["text", "document_id", "chunk_index"]
+        )
+
     def _process_results(self, results):
         """Process search results into a standardized format."""
         processed_results = []
         for hits in results:
             for hit in hits:
                 processed_results.append({
+                    "id": hit.id,
                     "text": hit.entity.get("text"),
                     "document_id": hit.entity.get("document_id"),
+                    "chunk_index": hit.entity.get("chunk_index"),
                     "score": hit.score
                 })
         return processed_results
@@ -130,30 +248,119 @@ class MilvusClient:
         except Exception as e:
             logger.error(f"Error closing Milvus connection: {str(e)}")
 
+    def insert_columns(
+        self,
+        embeddings: np.ndarray,
+        texts: Sequence[str],
+        person_name,
+        person_age,
+        document_id,
+        chunk_index=None,
+        flush: Optional[bool] = None
+    ) -> List[int]:
+        """Insert chunks column-wise and return their primary keys.
+
+        ``embeddings`` is an (n, dim) matrix; scalar fields take either one
+        value for every row or one value per row, and ``chunk_index``
+        defaults to 0..n-1. Rows are sent in batches of at most
+        MILVUS_INSERT_BATCH_BYTES, and flushing follows the deferred flush
+        policy unless ``flush`` forces it either way.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        n_rows = len(texts)
+        if embeddings.ndim != 2 or embeddings.shape[0] != n_rows:
+            raise ValueError(f"Expected {n_rows} embeddings, got array of shape {embeddings.shape}")
+        if embeddings.shape[1] != settings.EMBEDDING_DIM:
+            raise ValueError(f"Embedding dimension mismatch: expected {settings.EMBEDDING_DIM}, got {embeddings.shape[1]}")
+
+        columns = [
+            list(texts),
+            None,  # embedding batches are sliced from the matrix below
+            self._column(person_name, n_rows),
+            self._column(person_age, n_rows),
+            self._column(document_id, n_rows),
+            self._column(range(n_rows) if chunk_index is None else chunk_index, n_rows),
+        ]
+
+        primary_keys = []
+        for start, end in self._batch_bounds(texts, embeddings.shape[1]):
+            # One C-level conversion per batch instead of per-row tolist()
+            batch = [
+                embeddings[start:end].tolist() if column is None else column[start:end]
+                for column in columns
+            ]
+            result = self.collection.insert(batch)
+            primary_keys.extend(result.primary_keys)
+
+        MilvusClient._unflushed_rows += n_rows
+        if flush or (flush is None and self._flush_due()):
+            self.flush()
+        return primary_keys
+
+    @staticmethod
+    def _column(value, n_rows: int) -> list:
+        if isinstance(value, (str, bytes, int, float, np.generic)) or value is None:
+            return [value] * n_rows
+        values = value.tolist() if isinstance(value, np.ndarray) else list(value)
+        if len(values) != n_rows:
+            raise ValueError(f"Column has {len(values)} values for {n_rows} rows")
+        return values
+
+    @staticmethod
+    def _batch_bounds(texts: Sequence[str], dim: int) -> List[tuple]:
+        """Split rows into consecutive batches that stay under the insert size budget."""
+        row_bytes = np.fromiter(
+            (dim * 4 + len(text.encode("utf-8")) for text in texts),
+            dtype=np.int64,
+            count=len(texts)
+        )
+        budget = settings.MILVUS_INSERT_BATCH_BYTES
+        bounds = []
+        start = 0
+        cumulative = np.cumsum(row_bytes)
+        while start < len(texts):
+            offset = cumulative[start - 1] if start else 0
+            end = int(np.searchsorted(cumulative, offset + budget, side="right"))
+            end = max(end, start + 1)
+            bounds.append((start, end))
+            start = end
+        return bounds
+
+    def _flush_due(self) -> bool:
+        if not MilvusClient._unflushed_rows:
+            return False
+        return (
+            MilvusClient._unflushed_rows >= settings.MILVUS_FLUSH_ROWS
+            or time.time() - MilvusClient._last_flush_time >= settings.MILVUS_FLUSH_INTERVAL
+        )
+
+    def flush(self):
+        """Seal the growing segments; inserted rows are searchable before this."""
+        self.collection.flush()
+        logger.info(f"Flushed {MilvusClient._unflushed_rows} rows to Milvus")
+        MilvusClient._unflushed_rows = 0
+        MilvusClient._last_flush_time = time.time()
+
+    def flush_if_due(self):
+        """Flush when the deferred flush policy says so (called periodically)."""
+        if self._flush_due():
+            self.flush()
+
     async def insert_embeddings_from_puhti(self, embeddings, texts: list, metadata: dict):
         """Insert embeddings and metadata from Puhti processing."""
         try:
-            # Prepare entities for insertion
-            entities = []
-            for i, (embedding, text) in enumerate(zip(embeddings, texts)):
-                entities.append({
-                    "text": text,
-                    "embedding": embedding.tolist(), # Convert numpy array to list
-                    "person_name": metadata["person_name"],
-                    "person_age": metadata["person_age"],
-                    "document_id": metadata["document_id"],
-                    "chunk_index": i
-                })
-
-            # Insert into collection
-            self.collection.insert(entities)
-            # Force flush to ensure data is written
-            self.collection.flush()
+            primary_keys = self.insert_columns(
+                embeddings=embeddings,
+                texts=texts,
+                person_name=metadata["person_name"],
+                person_age=metadata["person_age"],
+                document_id=metadata["document_id"]
+            )
             
             logger.info(
-                f"Successfully inserted {len(entities)} chunks for document {metadata['document_id']}"
+                f"Successfully inserted {len(primary_keys)} chunks for document {metadata['document_id']}"
             )
-            return True
+            return primary_keys
 
         except Exception as e:
             logger.error(f"Failed to insert embeddings into Milvus: {str(e)}")
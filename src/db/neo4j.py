@@ -1,12 +1,30 @@
 ## src/db/neo4j.py
 from neo4j import GraphDatabase
 from src.core.config import settings
+from src.services.person_index import get_person_index
 import logging
 import re
+from datetime import datetime, timezone
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# Catalog fields that document listings can be sorted by
+CATALOG_SORT_FIELDS = {"created_at", "document_id", "person_name", "person_age", "chunk_count"}
+
+
+def legacy_document_id(chunk_id: str, chunk_index: Optional[int]) -> str:
+    """Recover the document ID from a chunk ID of the form ``<document_id>_<chunk_index>``."""
+    suffix = f"_{chunk_index}"
+    if chunk_index is not None and chunk_id.endswith(suffix):
+        return chunk_id[:-len(suffix)]
+    return chunk_id.rsplit("_", 1)[0]
+
+
 class Neo4jClient:
+    # Schema setup is idempotent but not free, so it runs once per process
+    _schema_ready = False
+
     def __init__(self):
         self.driver = None
         self.connect()
@@ -16,36 +34,99 @@ class Neo4jClient:
         try:
             self.driver = GraphDatabase.driver(
                 settings.NEO4J_URI,
-                auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+                auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+                max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+                connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+                max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+                # Pooled connections idle longer than this are pinged before reuse
+                liveness_check_timeout=settings.NEO4J_LIVENESS_CHECK_TIMEOUT
             )
-            # Verify connection
-            with self.driver.session() as session:
-                session.run("RETURN 1")
+            # Verify connection once; the shared client is reused for the process lifetime
+            self.driver.verify_connectivity()
             logger.info("Connected to Neo4j successfully")
         except Exception as e:
             logger.error(f"Failed to connect to Neo4j: {str(e)}")
             raise
 
+    def ensure_schema(self):
+        """Create the constraints and indexes that the MERGE-based ingestion relies on."""
+        if Neo4jClient._schema_ready:
+            return
+        with self.driver.session() as session:
+            session.run("""
+                CREATE CONSTRAINT person_name IF NOT EXISTS
+                FOR (p:Person) REQUIRE p.name IS UNIQUE
+            """)
+            session.run("""
+                CREATE CONSTRAINT document_chunk_id IF NOT EXISTS
+                FOR (d:Document) REQUIRE d.id IS UNIQUE
+            """)
+            session.run("""
+                CREATE INDEX document_chunk_document_id IF NOT EXISTS
+                FOR (d:Document) ON (d.document_id)
+            """)
+            session.run("""
+                CREATE CONSTRAINT source_document_id IF NOT EXISTS
+                FOR (s:SourceDocument) REQUIRE s.document_id IS UNIQUE
+            """)
+            for field in ("created_at", "person_name"):
+                session.run(f"""
+                    CREATE INDEX source_document_{field} IF NOT EXISTS
+                    FOR (s:SourceDocument) ON (s.{field})
+                """)
+            # Chunks from before ingest_document only carry their own "<document_id>_<i>" ID
+            legacy_chunks = [
+                {"id": record["id"], "document_id": legacy_document_id(record["id"], record["chunk_index"])}
+                for record in session.run("""
+                    MATCH (d:Document)
+                    WHERE d.document_id IS NULL
+                    RETURN d.id AS id, d.chunk_index AS chunk_index
+                """)
+            ]
+            if legacy_chunks:
+                session.run("""
+                    UNWIND $chunks AS chunk
+                    MATCH (d:Document {id: chunk.id})
+                    SET d.document_id = chunk.document_id
+                """, chunks=legacy_chunks)
+                logger.info(f"Added document IDs to {len(legacy_chunks)} existing chunks")
+            # Catalog documents ingested before the catalog existed
+            backfilled = session.run("""
+                MATCH (p:Person)-[:APPEARS_IN]->(d:Document)
+                WHERE d.document_id IS NOT NULL
+                  AND NOT EXISTS { MATCH (:SourceDocument {document_id: d.document_id}) }
+                WITH d.document_id AS document_id, p, count(d) AS chunk_count, min(d.created_at) AS created_at
+                MERGE (s:SourceDocument {document_id: document_id})
+                SET s.person_name = p.name,
+                    s.person_age = p.age,
+                    s.chunk_count = chunk_count,
+                    s.created_at = coalesce(created_at, $now)
+                RETURN count(s) AS backfilled
+            """, now=datetime.now(timezone.utc).isoformat()).single()["backfilled"]
+            if backfilled:
+                logger.info(f"Added {backfilled} existing documents to the catalog")
+        Neo4jClient._schema_ready = True
+        logger.info("Ensured Neo4j constraints and indexes")
+
+    def load_person_index(self):
+        """(Re)build the in-memory person name index from all Person nodes."""
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (p:Person)
+                RETURN p.name as name
+            """)
+            get_person_index().load(record["name"] for record in result)
+
     async def find_mentioned_persons(self, text: str) -> list:
         """Find persons mentioned in the text that exist in the database."""
         try:
-            with self.driver.session() as session:
-                # First, get all person names from the database
-                result = session.run("""
-                    MATCH (p:Person)
-                    RETURN p.name as name
-                """)
-                names = [record["name"] for record in result]
+            person_index = get_person_index()
+            if not person_index.is_loaded:
+                self.load_person_index()
 
-                # Look for these names in the query text
-                mentioned = []
-                text_lower = text.lower()
-                for name in names:
-                    if name.lower() in text_lower:
-                        mentioned.append(name)
-
-                logger.info(f"Found mentioned persons: {mentioned}")
-                return mentioned
+            mentioned = person_index.find(text)
+            logger.info(f"Found mentioned persons: {mentioned}")
+            return mentioned
 
         except Exception as e:
             logger.error(f"Error finding mentioned persons: {str(e)}")
@@ -82,6 +163,140 @@ class Neo4jClient:
             logger.error(f"Error creating document chunk: {str(e)}")
             raise
 
+    @staticmethod
+    def _ingest_document_tx(tx, document_id: str, person_name: str, person_age, chunks: list):
+        tx.run("""
+            MERGE (p:Person {name: $person_name})
+            ON CREATE SET p.age = $person_age
+            WITH p
+            UNWIND $chunks AS chunk
+            MERGE (d:Document {id: chunk.id})
+            SET d.content = chunk.text,
+                d.chunk_index = chunk.chunk_index,
+                d.document_id = $document_id,
+                d.created_at = $created_at
+            MERGE (p)-[:APPEARS_IN]->(d)
+            WITH count(d) AS chunk_count
+            MERGE (s:SourceDocument {document_id: $document_id})
+            SET s.person_name = $person_name,
+                s.person_age = $person_age,
+                s.chunk_count = chunk_count,
+                s.created_at = coalesce(s.created_at, $created_at)
+        """, {
+            "person_name": person_name,
+            "person_age": person_age,
+            "document_id": document_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "chunks": chunks
+        })
+        # Chain consecutive chunks only: n - 1 edges instead of n²
+        tx.run("""
+            UNWIND $pairs AS pair
+            MATCH (a:Document {id: pair[0]})
+            MATCH (b:Document {id: pair[1]})
+            MERGE (a)-[:NEXT_CHUNK]->(b)
+        """, {
+            "pairs": [[chunks[i]["id"], chunks[i + 1]["id"]] for i in range(len(chunks) - 1)]
+        })
+
+    async def ingest_document(self, document_id: str, person_name: str, person_age: int, texts: list):
+        """Store a document's person, chunks and reading order in a single transaction."""
+        try:
+            self.ensure_schema()
+            chunks = [
+                {"id": f"{document_id}_{i}", "text": text, "chunk_index": i}
+                for i, text in enumerate(texts)
+            ]
+            with self.driver.session() as session:
+                session.execute_write(
+                    self._ingest_document_tx, document_id, person_name, person_age, chunks
+                )
+            get_person_index().add(person_name)
+            logger.info(f"Ingested {len(chunks)} chunks of document {document_id} for person: {person_name}")
+
+        except Exception as e:
+            logger.error(f"Error ingesting document: {str(e)}")
+            raise
+
+    async def list_documents(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        person_name: Optional[str] = None,
+        search: Optional[str] = None,
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+        sort_by: str = "created_at",
+        descending: bool = True
+    ) -> Dict:
+        """Return one page of the document catalog plus totals over all matching documents."""
+        if sort_by not in CATALOG_SORT_FIELDS:
+            raise ValueError(f"Cannot sort documents by {sort_by}; use one of {sorted(CATALOG_SORT_FIELDS)}")
+
+        conditions = []
+        params = {"offset": offset, "limit": limit}
+        if person_name:
+            conditions.append("s.person_name = $person_name")
+            params["person_name"] = person_name
+        if search:
+            conditions.append("(toLower(s.document_id) CONTAINS $search OR toLower(s.person_name) CONTAINS $search)")
+            params["search"] = search.lower()
+        if min_age is not None:
+            conditions.append("s.person_age >= $min_age")
+            params["min_age"] = min_age
+        if max_age is not None:
+            conditions.append("s.person_age <= $max_age")
+            params["max_age"] = max_age
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if descending else "ASC"
+
+        try:
+            with self.driver.session() as session:
+                record = session.run(f"""
+                    MATCH (s:SourceDocument) {where}
+                    WITH count(s) AS total,
+                         coalesce(sum(s.chunk_count), 0) AS total_chunks,
+                         count(DISTINCT s.person_name) AS person_count
+                    CALL {{
+                        MATCH (s:SourceDocument) {where}
+                        WITH s ORDER BY s.{sort_by} {direction}, s.document_id
+                        SKIP $offset LIMIT $limit
+                        RETURN collect(s {{
+                            .document_id, .person_name, .person_age, .chunk_count, .created_at
+                        }}) AS documents
+                    }}
+                    RETURN total, total_chunks, person_count, documents
+                """, params).single()
+            return {
+                "documents": record["documents"],
+                "total": record["total"],
+                "total_chunks": record["total_chunks"],
+                "person_count": record["person_count"],
+                "offset": offset,
+                "limit": limit
+            }
+        except Exception as e:
+            logger.error(f"Error listing documents: {str(e)}")
+            raise
+
+    @staticmethod
+    def _delete_document_tx(tx, document_id: str):
+        tx.run("""
+            MATCH (d:Document)
+            WHERE d.document_id = $doc_id OR d.id STARTS WITH $doc_id + "_"
+            DETACH DELETE d
+        """, doc_id=document_id)
+        tx.run("""
+            MATCH (s:SourceDocument {document_id: $doc_id})
+            DETACH DELETE s
+        """, doc_id=document_id)
+
+    async def delete_document(self, document_id: str):
+        """Delete a document's chunks and its catalog entry together."""
+        with self.driver.session() as session:
+            session.execute_write(self._delete_document_tx, document_id)
+        logger.info(f"Deleted document {document_id} from Neo4j")
+
     async def get_person_context(self, person_name: str):
         """Get comprehensive context for a person."""
         try:
@@ -119,6 +334,7 @@ class Neo4jClient:
                     MERGE (p:Person {name: $name})
                     ON CREATE SET p.age = $age
                 """, name=name, age=age)
+                get_person_index().add(name)
                 logger.info(f"Created or updated person: {name}")
         except Exception as e:
             logger.error(f"Error creating person: {str(e)}")
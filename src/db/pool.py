@@ -0,0 +1,71 @@
+import logging
+import threading
+from typing import Optional
+from src.db.milvus import MilvusClient
+from src.db.neo4j import Neo4jClient
+
+logger = logging.getLogger(__name__)
+
+# Process-wide database clients. Milvus multiplexes every call over one gRPC
+# channel and the Neo4j driver keeps its own connection pool, so a single
+# instance of each serves all routes and background tasks concurrently.
+_milvus_client: Optional[MilvusClient] = None
+_neo4j_client: Optional[Neo4jClient] = None
+_clients_lock = threading.Lock()
+
+
+def get_milvus_client() -> MilvusClient:
+    """Get the shared Milvus client, connecting on first use or after a reset."""
+    global _milvus_client
+    with _clients_lock:
+        if _milvus_client is None:
+            _milvus_client = MilvusClient()
+        return _milvus_client
+
+
+def get_neo4j_client() -> Neo4jClient:
+    """Get the shared Neo4j client, connecting on first use or after a reset."""
+    global _neo4j_client
+    with _clients_lock:
+        if _neo4j_client is None:
+            _neo4j_client = Neo4jClient()
+        return _neo4j_client
+
+
+def reset_milvus_client():
+    """Drop the shared Milvus client after a failed health check so the next use reconnects."""
+    global _milvus_client
+    with _clients_lock:
+        client, _milvus_client = _milvus_client, None
+    if client is not None:
+        client.close()
+        logger.warning("Milvus client reset; reconnecting on next use")
+
+
+def reset_neo4j_client():
+    """Drop the shared Neo4j client after a failed health check so the next use reconnects."""
+    global _neo4j_client
+    with _clients_lock:
+        client, _neo4j_client = _neo4j_client, None
+    if client is not None:
+        client.close()
+        logger.warning("Neo4j client reset; reconnecting on next use")
+
+
+def init_database_clients():
+    """Connect both shared clients at startup; a failure is retried on first use."""
+    for name, getter in (("Milvus", get_milvus_client), ("Neo4j", get_neo4j_client)):
+        try:
+            getter()
+        except Exception as e:
+            logger.warning(f"{name} unavailable at startup, will retry on first use: {str(e)}")
+
+
+def close_database_clients():
+    global _milvus_client, _neo4j_client
+    with _clients_lock:
+        clients = [_milvus_client, _neo4j_client]
+        _milvus_client = _neo4j_client = None
+    for client in clients:
+        if client is not None:
+            client.close()
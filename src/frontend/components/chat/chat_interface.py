@@ -23,6 +23,13 @@ logger = logging.getLogger("frontend.chat")
 logger.setLevel(logging.DEBUG)
 
 class ChatInterface:
+    STAGE_MESSAGES = {
+        "embedding_done": "Searching the documents...",
+        "retrieval_done": "Preparing context for the language model...",
+        "job_queued": "Waiting for a GPU on Puhti...",
+        "job_running": "Generating the answer...",
+    }
+
     def __init__(self):
         self.initialize_session_state()
         self.timeout = 300
@@ -62,66 +69,73 @@ class ChatInterface:
                     with message_placeholder:
                         st.markdown("```\nProcessing query...\n```")
                     
-                    response = await client.submit_query(query)
-                    
-                    if response and response.get("status") == "processing":
-                        job_id = response.get("job_id")
-                        if not job_id:
-                            raise Exception("No job ID received from backend")
+                    # Render stages and tokens as the backend pushes them
+                    streamed_answer = ""
+                    async for event in client.stream_query(query):
+                        event_type = event.get("event")
+                        
+                        if event_type == "stage":
+                            if not streamed_answer:
+                                stage_message = self.STAGE_MESSAGES.get(event.get("stage"), "Processing query...")
+                                message_placeholder.markdown(f"```\n{stage_message}\n```")
                         
-                        while True:
-                            status_response = await client.check_query_status(job_id)
-                            
-                            if status_response.get("status") == "completed":
-                                logger.info("-" * 80)
-                                logger.info("RESPONSE RECEIVED")
-                                
-                                # Clear placeholder
-                                message_placeholder.empty()
-                                
-                                # Process and render response
-                                formatted_response = self._format_response(status_response)
-                                logger.debug(f"Original answer before cleaning: {formatted_response['answer']}")
-                                
-                                cleaned_answer = self._clean_answer(formatted_response["answer"])
-                                logger.debug(f"Cleaned answer: {cleaned_answer}")
-                                
-                                # Render the cleaned answer
-                                message_placeholder.markdown(cleaned_answer)
-                                
-                                # Render sources
-                                if formatted_response["sources"]:
-                                    with st.expander("📚 Sources", expanded=False):
-                                        for idx, source in enumerate(formatted_response["sources"], 1):
-                                            st.markdown(f"""
-                                            **Source {idx}** (Document {source['document_id']}) - Relevance: {source['score']}
-                                            ```
-                                            {source['text'][:self.max_source_length]}...
-                                            ```
-                                            """)
-                                
-                                # Update session state
-                                st.session_state.messages.append({
-                                    "role": "assistant",
-                                    "content": cleaned_answer,
-                                    "sources": formatted_response["sources"],
-                                    "timestamp": datetime.now().strftime("%H:%M:%S")
-                                })
-                                logger.debug(f"Updated session state: {st.session_state.messages}")
-                                break
-                            
-                            elif status_response.get("status") == "failed":
-                                error_msg = status_response.get("error", "Unknown error")
-                                raise Exception(error_msg)
-                            
-                            await asyncio.sleep(1)
+                        elif event_type == "token":
+                            streamed_answer += event.get("text", "")
+                            message_placeholder.markdown(streamed_answer + "▌")
+                        
+                        elif event_type == "completed":
+                            logger.info("-" * 80)
+                            logger.info("RESPONSE RECEIVED")
+                            self._render_completed(
+                                {"status": "completed", "result": event.get("result", {})},
+                                message_placeholder
+                            )
+                            break
+                        
+                        elif event_type == "error":
+                            raise Exception(event.get("error") or event.get("message", "Unknown error"))
                     else:
-                        raise Exception(f"Unexpected response status: {response.get('status')}")
+                        raise Exception("Answer stream ended before the query completed")
                         
             except Exception as e:
                 logger.error(f"Error processing query: {str(e)}", exc_info=True)
                 message_placeholder.error(f"❌ Error: {str(e)}")
 
+    def _render_completed(self, status_response: dict, message_placeholder) -> None:
+        """Render a completed answer with its sources and store it in the chat history."""
+        # Clear placeholder
+        message_placeholder.empty()
+        
+        # Process and render response
+        formatted_response = self._format_response(status_response)
+        logger.debug(f"Original answer before cleaning: {formatted_response['answer']}")
+        
+        cleaned_answer = self._clean_answer(formatted_response["answer"])
+        logger.debug(f"Cleaned answer: {cleaned_answer}")
+        
+        # Render the cleaned answer
+        message_placeholder.markdown(cleaned_answer)
+        
+        # Render sources
+        if formatted_response["sources"]:
+            with st.expander("📚 Sources", expanded=False):
+                for idx, source in enumerate(formatted_response["sources"], 1):
+                    st.markdown(f"""
+                    **Source {idx}** (Document {source['document_id']}) - Relevance: {source['score']}
+                    ```
+                    {source['text'][:self.max_source_length]}...
+                    ```
+                    """)
+        
+        # Update session state
+        st.session_state.messages.append({
+            "role": "assistant",
+            "content": cleaned_answer,
+            "sources": formatted_response["sources"],
+            "timestamp": datetime.now().strftime("%H:%M:%S")
+        })
+        logger.debug(f"Updated session state: {st.session_state.messages}")
+
 
     def _format_response(self, response_data: dict) -> dict:
         """Format the response data into a structured format."""
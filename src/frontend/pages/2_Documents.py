@@ -5,18 +5,39 @@ from src.frontend.utils.document_api import DocumentAPIClient
 import asyncio
 from datetime import datetime
 
+PAGE_SIZE = 25
+SORT_OPTIONS = {
+    "Newest first": ("created_at", "desc"),
+    "Oldest first": ("created_at", "asc"),
+    "Person name": ("person_name", "asc"),
+    "Person age": ("person_age", "asc"),
+    "Most chunks": ("chunk_count", "desc"),
+}
+
 class DocumentsPage:
     def __init__(self):
         self.doc_upload = DocumentUpload()
         self.api_client = DocumentAPIClient()
         if "existing_documents" not in st.session_state:
             st.session_state.existing_documents = []
+        if "document_catalog" not in st.session_state:
+            st.session_state.document_catalog = {}
+        if "document_page" not in st.session_state:
+            st.session_state.document_page = 0
         
     async def fetch_existing_documents(self):
-        """Fetch existing documents from the backend"""
+        """Fetch the current page of existing documents from the backend"""
         try:
-            result = await self.api_client.get_document_list()
+            sort_by, order = SORT_OPTIONS[st.session_state.get("document_sort", "Newest first")]
+            result = await self.api_client.get_document_list(
+                offset=st.session_state.document_page * PAGE_SIZE,
+                limit=PAGE_SIZE,
+                search=st.session_state.get("document_search"),
+                sort_by=sort_by,
+                order=order
+            )
             st.session_state.existing_documents = result.get("documents", [])
+            st.session_state.document_catalog = result
         except Exception as e:
             st.error(f"Error fetching existing documents: {str(e)}")
 
@@ -50,10 +71,34 @@ class DocumentsPage:
         with existing_tab:
             st.subheader("📚 Existing Documents")
             
+            search_col, sort_col = st.columns([2, 1])
+            with search_col:
+                st.text_input("Search by document ID or person", key="document_search")
+            with sort_col:
+                st.selectbox("Sort by", list(SORT_OPTIONS), key="document_sort")
+
             # Button to refresh document list
             if st.button("🔄 Refresh Document List"):
+                st.session_state.document_page = 0
                 asyncio.run(self.fetch_existing_documents())
 
+            total = st.session_state.document_catalog.get("total", 0)
+            if total > PAGE_SIZE:
+                page_count = (total + PAGE_SIZE - 1) // PAGE_SIZE
+                prev_col, info_col, next_col = st.columns([1, 2, 1])
+                with prev_col:
+                    if st.button("⬅️ Previous", disabled=st.session_state.document_page == 0):
+                        st.session_state.document_page -= 1
+                        asyncio.run(self.fetch_existing_documents())
+                        st.rerun()
+                with info_col:
+                    st.write(f"Page {st.session_state.document_page + 1} of {page_count}")
+                with next_col:
+                    if st.button("Next ➡️", disabled=st.session_state.document_page >= page_count - 1):
+                        st.session_state.document_page += 1
+                        asyncio.run(self.fetch_existing_documents())
+                        st.rerun()
+
             # Display existing documents
             if st.session_state.existing_documents:
                 for doc in st.session_state.existing_documents:
@@ -83,9 +128,11 @@ class DocumentsPage:
             # Statistics section
             if st.session_state.existing_documents:
                 st.subheader("📊 Document Statistics")
-                total_docs = len(st.session_state.existing_documents)
-                total_chunks = sum(doc['chunk_count'] for doc in st.session_state.existing_documents)
-                unique_persons = len(set(doc['person_name'] for doc in st.session_state.existing_documents))
+                # Totals cover every matching document, not just this page
+                catalog = st.session_state.document_catalog
+                total_docs = catalog.get("total", 0)
+                total_chunks = catalog.get("total_chunks", 0)
+                unique_persons = catalog.get("person_count", 0)
                 
                 col1, col2, col3 = st.columns(3)
                 with col1:
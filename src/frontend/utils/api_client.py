@@ -102,6 +102,30 @@ class RAGApiClient:
             logger.error(f"Error checking status: {str(e)}")
             raise Exception(f"Failed to check query status: {str(e)}")
 
+    async def stream_query(self, query: str, max_tokens: int = 300) -> AsyncGenerator[Dict, None]:
+        """Submit a query and yield server-sent events (stages, tokens, final result) as they arrive."""
+        event_name = None
+        data_lines = []
+        async with self.client.stream(
+            "POST",
+            f"{self.base_url}/query/stream",
+            json={"text": query, "max_tokens": max_tokens},
+            headers={"Accept": "text/event-stream"}
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event_name = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data_lines.append(line[len("data:"):].strip())
+                elif not line and data_lines:
+                    event = json.loads("\n".join(data_lines))
+                    event.setdefault("event", event_name)
+                    logger.debug(f"Stream event: {event.get('event')}")
+                    yield event
+                    event_name = None
+                    data_lines = []
+
     async def stream_response(self, job_id: str, poll_interval: float = 2.0) -> AsyncGenerator[str, None]:
         """Stream the response with improved logging and error handling."""
         retries = 0
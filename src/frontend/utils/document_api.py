@@ -52,11 +52,12 @@ class DocumentAPIClient:
             logger.error(f"Error checking document status: {str(e)}")
             raise
 
-    async def get_document_list(self) -> Dict:
-        """Get list of processed documents."""
+    async def get_document_list(self, **params) -> Dict:
+        """Get a page of processed documents; params are the /documents/list filters."""
         try:
             response = await self.client.get(
-                f"{self.base_url}/documents/list"
+                f"{self.base_url}/documents/list",
+                params={key: value for key, value in params.items() if value not in (None, "")}
             )
             response.raise_for_status()
             return response.json()
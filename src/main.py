@@ -4,10 +4,23 @@ app = FastAPI()
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from src.core.config import settings
-from src.core.health import check_milvus_health, check_neo4j_health, check_gpu_availability
+from src.core.health import get_health_monitor
 from src.api.v1 import api_router
+from src.services.puhti_transport import close_puhti_transport
+from src.services.slurm_poller import get_slurm_poller
+from src.services.job_manager import get_job_manager
+from src.db.job_registry import get_job_registry, close_job_registry
+from src.core.workers import get_worker_coordinator, close_worker_coordinator
+from src.services.corpus_sync import get_corpus_sync
+from src.db.milvus import MilvusClient
+from src.db.pool import init_database_clients, get_milvus_client, get_neo4j_client, close_database_clients
+from src.services.bm25_index import get_bm25_index
+from src.services.embedding_cache import close_embedding_caches
+from src.services.service_factory import ServiceFactory
+from src.api.v1.documents import resume_job_monitors
 import logging
 import asyncio
+import time
 from typing import Dict
 
 # Configure logging
@@ -42,14 +55,11 @@ background_tasks = set()
 
 async def periodic_health_check():
     """Perform periodic health checks of services."""
+    monitor = get_health_monitor()
     while True:
         try:
-            milvus_healthy = await check_milvus_health()
-            neo4j_healthy = await check_neo4j_health()
-            gpu_available = await check_gpu_availability()
-            
-            logger.info(f"Health Check - Milvus: {milvus_healthy}, "
-                       f"Neo4j: {neo4j_healthy}, GPU: {gpu_available}")
+            snapshot = await monitor.refresh()
+            logger.info(f"Health Check - {snapshot['services']}")
             
             await asyncio.sleep(settings.MILVUS_HEALTH_CHECK_INTERVAL)
         except asyncio.CancelledError:
@@ -58,15 +68,104 @@ async def periodic_health_check():
             logger.error(f"Health check error: {str(e)}")
             await asyncio.sleep(5)
 
+async def periodic_milvus_flush():
+    """Flush inserted rows that the deferred flush policy has left pending too long."""
+    while True:
+        try:
+            await asyncio.sleep(settings.MILVUS_FLUSH_INTERVAL)
+            if MilvusClient._unflushed_rows:
+                await asyncio.to_thread(get_milvus_client().flush_if_due)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Milvus flush error: {str(e)}")
+
+async def periodic_corpus_sync():
+    """Apply documents other workers ingested or deleted to this worker's BM25 index and answer cache."""
+    while True:
+        try:
+            await asyncio.sleep(settings.CORPUS_SYNC_INTERVAL)
+            await asyncio.to_thread(get_corpus_sync().apply, get_milvus_client().collection)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Corpus sync error: {str(e)}")
+
+def track_background_task(task: asyncio.Task):
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def leader_duties():
+    """Take over as leader worker when there is none; the leader adopts the jobs of dead workers.
+
+    Slurm polling follows leadership on its own (see SlurmStatusPoller).
+    Recovery on election covers a restart of the whole backend; repeating
+    it every WORKER_RECOVERY_INTERVAL picks up jobs of workers that crashed.
+    """
+    coordinator = get_worker_coordinator()
+    last_recovery = None
+    while True:
+        try:
+            if coordinator.try_lead():
+                if last_recovery is None:
+                    pruned = await asyncio.to_thread(get_job_registry().prune)
+                    logger.info(f"Pruned {pruned} finished jobs from the job registry")
+                if last_recovery is None or time.monotonic() - last_recovery >= settings.WORKER_RECOVERY_INTERVAL:
+                    last_recovery = time.monotonic()
+                    for task in await resume_job_monitors(get_job_manager(), get_milvus_client(), get_neo4j_client()):
+                        track_background_task(task)
+            await asyncio.sleep(settings.WORKER_LEADER_INTERVAL)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Leader duties error: {str(e)}")
+            await asyncio.sleep(settings.WORKER_LEADER_INTERVAL)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services and start background tasks."""
     logger.info("Starting up RAG backend...")
     
+    # Register this worker before anything can create jobs
+    get_worker_coordinator()
+    
     # Start health check task
-    task = asyncio.create_task(periodic_health_check())
-    background_tasks.add(task)
-    task.add_done_callback(background_tasks.discard)
+    track_background_task(asyncio.create_task(periodic_health_check()))
+    
+    # Start deferred Milvus flushing
+    track_background_task(asyncio.create_task(periodic_milvus_flush()))
+    
+    # Start the shared Slurm status poller
+    get_slurm_poller().start()
+    
+    # Connect the shared database clients that every request reuses
+    await asyncio.to_thread(init_database_clients)
+    
+    # Create Neo4j constraints and catalog documents from before the catalog existed
+    try:
+        await asyncio.to_thread(get_neo4j_client().ensure_schema)
+    except Exception as e:
+        logger.warning(f"Neo4j schema will be ensured on first ingestion: {str(e)}")
+    
+    # Build the person name index once so queries don't scan Neo4j
+    try:
+        await asyncio.to_thread(get_neo4j_client().load_person_index)
+    except Exception as e:
+        logger.warning(f"Person name index will be built on first query: {str(e)}")
+    
+    # Build the BM25 keyword index from the chunks already in Milvus; changes
+    # other workers make from here on are replayed by the corpus sync
+    get_corpus_sync()
+    try:
+        milvus_client = get_milvus_client()
+        await asyncio.to_thread(get_bm25_index().ensure_loaded, milvus_client.collection)
+    except Exception as e:
+        logger.warning(f"BM25 index will be built on first query: {str(e)}")
+    track_background_task(asyncio.create_task(periodic_corpus_sync()))
+    
+    
+    # Elect a leader among the workers; it resumes jobs left unfinished, reconciled against sacct
+    track_background_task(asyncio.create_task(leader_duties()))
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -80,30 +179,42 @@ async def shutdown_event():
     # Wait for all tasks to complete
     if background_tasks:
         await asyncio.gather(*background_tasks, return_exceptions=True)
+    
+    # Seal any rows still waiting for a deferred flush
+    if MilvusClient._unflushed_rows:
+        try:
+            get_milvus_client().flush()
+        except Exception as e:
+            logger.error(f"Final Milvus flush failed: {str(e)}")
+    
+    # Stop the query embedding batcher thread
+    if ServiceFactory._query_service is not None:
+        close_embedding = getattr(ServiceFactory._query_service.embedding_service, "close", None)
+        if close_embedding:
+            close_embedding()
+    
+    # Close the shared database clients
+    close_database_clients()
+    
+    # Stop the Slurm poller before closing the SSH pool it uses
+    await get_slurm_poller().stop()
+    
+    # Close the shared Puhti SSH pool
+    close_puhti_transport()
+    
+    # Flush the embedding caches and release their file locks
+    close_embedding_caches()
+    
+    # Close the job registry; unfinished jobs are recovered on the next startup
+    close_job_registry()
+    
+    # Give up leadership last so another worker can take over
+    close_worker_coordinator()
 
 @app.get("/health")
 async def health_check() -> Dict:
-    """Endpoint to check service health."""
-    try:
-        milvus_healthy = await check_milvus_health()
-        neo4j_healthy = await check_neo4j_health()
-        gpu_available = await check_gpu_availability()
-        
-        status = "healthy" if all([milvus_healthy, neo4j_healthy]) else "degraded"
-        
-        return {
-            "status": status,
-            "services": {
-                "milvus": "healthy" if milvus_healthy else "unhealthy",
-                "neo4j": "healthy" if neo4j_healthy else "unhealthy",
-                "gpu": "available" if gpu_available else "unavailable"
-            }
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=503,
-            detail=f"Health check failed: {str(e)}"
-        )
+    """Endpoint to check service health, served from the last background probe."""
+    return get_health_monitor().snapshot()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,11 +1,37 @@
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any, Union
 
+class SearchFilters(BaseModel):
+    """Restricts retrieval to chunks whose metadata matches every given condition."""
+    person_names: Optional[List[str]] = None
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+    document_ids: Optional[List[str]] = None
+    min_chunk_index: Optional[int] = None
+    max_chunk_index: Optional[int] = None
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in self.model_dump().values())
+
+    def matches(self, chunk: Dict[str, Any]) -> bool:
+        """Evaluate the filters in Python, for indexes outside Milvus."""
+        age = chunk.get("person_age")
+        chunk_index = chunk.get("chunk_index")
+        return (
+            (self.person_names is None or chunk.get("person_name") in self.person_names)
+            and (self.document_ids is None or chunk.get("document_id") in self.document_ids)
+            and (self.min_age is None or (age is not None and age >= self.min_age))
+            and (self.max_age is None or (age is not None and age <= self.max_age))
+            and (self.min_chunk_index is None or (chunk_index is not None and chunk_index >= self.min_chunk_index))
+            and (self.max_chunk_index is None or (chunk_index is not None and chunk_index <= self.max_chunk_index))
+        )
+
 class QueryRequest(BaseModel):
     text: str
     max_tokens: Optional[int] = 300
     temperature: Optional[float] = 0.1
     top_k: Optional[int] = 5
+    filters: Optional[SearchFilters] = None
 
 class QuerySource(BaseModel):
     text: str
@@ -0,0 +1,230 @@
+import logging
+import math
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from src.core.config import settings
+from src.models.query import SearchFilters
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[0-9a-zåäöéü]+(?:[-:][0-9a-zåäöéü]+)*")
+
+# Common Finnish function words that carry no retrieval signal
+FINNISH_STOPWORDS = frozenset("""
+ja on ei se että oli olla ole en et hän he me te minä sinä mutta tai kun jos
+niin kuin myös vain sitten nyt siellä täällä mikä mitä mitään joka jotka jonka
+sen sitä siitä siinä sille hänen hänet heidän meidän teidän tämä tätä tässä
+tästä nämä noin kanssa mukaan ovat olivat olen oletko olisi ollut ole kaikki
+vielä jo siis sekä eli vai kyllä joo no niin ni ku et ett mä sä se ne
+""".split())
+
+
+def tokenize(text: str, stem_length: Optional[int] = None) -> List[str]:
+    """Lowercase, split and stem Finnish text for BM25.
+
+    Finnish piles case endings and clitics onto the stem, so tokens are cut
+    to a fixed-length prefix (Annikille, Annikin -> annik). Numbers such as
+    years are kept whole.
+    """
+    stem_length = stem_length or settings.BM25_STEM_LENGTH
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in FINNISH_STOPWORDS:
+            continue
+        if not token.isdigit():
+            token = token[:stem_length]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """In-memory BM25 index over chunk texts.
+
+    Each term's posting list is a pair of compact ``array`` buffers (chunk
+    slots and term frequencies) that are scored with NumPy without copying.
+    Deleted chunks are tombstoned and the index is compacted once enough of
+    it is dead.
+    """
+
+    def __init__(self, k1: Optional[float] = None, b: Optional[float] = None):
+        self.k1 = k1 if k1 is not None else settings.BM25_K1
+        self.b = b if b is not None else settings.BM25_B
+        self.is_loaded = False
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_lengths = array("i")
+        self._alive = bytearray()
+        self._chunks: List[Optional[Dict]] = []
+        self._slots_by_document: Dict[str, List[int]] = {}
+        self._slot_by_chunk_id: Dict[int, int] = {}
+        self._total_length = 0
+        self._live_count = 0
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def add_chunks(self, document_id: str, chunks: Iterable[Dict]):
+        """Index chunks of a document; each chunk has ``id``, ``text`` and ``chunk_index``.
+
+        ``person_name`` and ``person_age`` are kept when present so searches can be filtered.
+        """
+        with self._lock:
+            for chunk in chunks:
+                chunk_id = chunk["id"]
+                if chunk_id in self._slot_by_chunk_id:
+                    continue
+                tokens = tokenize(chunk["text"])
+                slot = len(self._chunks)
+                self._chunks.append({
+                    "id": chunk_id,
+                    "text": chunk["text"],
+                    "document_id": document_id,
+                    "chunk_index": chunk.get("chunk_index"),
+                    "person_name": chunk.get("person_name"),
+                    "person_age": chunk.get("person_age")
+                })
+                self._doc_lengths.append(len(tokens))
+                self._alive.append(1)
+                self._slots_by_document.setdefault(document_id, []).append(slot)
+                self._slot_by_chunk_id[chunk_id] = slot
+                self._total_length += len(tokens)
+                self._live_count += 1
+
+                frequencies: Dict[str, int] = {}
+                for token in tokens:
+                    frequencies[token] = frequencies.get(token, 0) + 1
+                for token, frequency in frequencies.items():
+                    slots, tfs = self._postings.setdefault(token, (array("i"), array("i")))
+                    slots.append(slot)
+                    tfs.append(frequency)
+
+    def remove_document(self, document_id: str):
+        """Tombstone every chunk of a document."""
+        with self._lock:
+            for slot in self._slots_by_document.pop(document_id, []):
+                if self._alive[slot]:
+                    self._alive[slot] = 0
+                    self._total_length -= self._doc_lengths[slot]
+                    self._live_count -= 1
+                    self._slot_by_chunk_id.pop(self._chunks[slot]["id"], None)
+                    self._chunks[slot] = None
+            if self._chunks and self._live_count < len(self._chunks) * 0.75:
+                self._compact()
+
+    def _compact(self):
+        live = [chunk for chunk in self._chunks if chunk is not None]
+        self._reset()
+        by_document: Dict[str, List[Dict]] = {}
+        for chunk in live:
+            by_document.setdefault(chunk["document_id"], []).append(chunk)
+        for document_id, chunks in by_document.items():
+            self.add_chunks(document_id, chunks)
+        logger.info(f"Compacted BM25 index to {self._live_count} chunks")
+
+    def search(self, query: str, limit: int = 5, filters: Optional[SearchFilters] = None) -> List[Dict]:
+        """Return the top chunks by BM25 score, formatted like Milvus search results."""
+        with self._lock:
+            if not self._live_count:
+                return []
+            n_slots = len(self._chunks)
+            doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.int32)
+            alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+            avg_length = self._total_length / self._live_count or 1.0
+            length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / avg_length)
+
+            scores = np.zeros(n_slots, dtype=np.float64)
+            for token in set(tokenize(query)):
+                posting = self._postings.get(token)
+                if posting is None:
+                    continue
+                slots = np.frombuffer(posting[0], dtype=np.int32)
+                tfs = np.frombuffer(posting[1], dtype=np.int32).astype(np.float64)
+                live_slots = alive[slots]
+                df = int(live_slots.sum())
+                if not df:
+                    continue
+                idf = math.log(1 + (self._live_count - df + 0.5) / (df + 0.5))
+                scores[slots] += live_slots * idf * tfs * (self.k1 + 1) / (tfs + length_norm[slots])
+
+            matched = np.flatnonzero(scores > 0)
+            if filters is not None and len(matched):
+                keep = np.fromiter(
+                    (filters.matches(self._chunks[slot]) for slot in matched),
+                    dtype=bool,
+                    count=len(matched)
+                )
+                matched = matched[keep]
+            if not len(matched):
+                return []
+            top = matched[np.argsort(-scores[matched], kind="stable")[:limit]]
+            return [
+                {**self._chunks[slot], "score": float(scores[slot])}
+                for slot in top
+            ]
+
+    def ensure_loaded(self, collection):
+        """Build the index from Milvus on first use."""
+        with self._lock:
+            if not self.is_loaded:
+                self.load_from_milvus(collection)
+
+    def load_from_milvus(self, collection, batch_size: int = 1000):
+        """Rebuild the index from every chunk stored in the Milvus collection."""
+        iterator = collection.query_iterator(
+            batch_size=batch_size,
+            expr="id >= 0",
+            output_fields=["id", "text", "document_id", "chunk_index", "person_name", "person_age"]
+        )
+        with self._lock:
+            self._reset()
+            try:
+                while True:
+                    batch = iterator.next()
+                    if not batch:
+                        break
+                    by_document: Dict[str, List[Dict]] = {}
+                    for row in batch:
+                        by_document.setdefault(row["document_id"], []).append(row)
+                    for document_id, chunks in by_document.items():
+                        self.add_chunks(document_id, chunks)
+            finally:
+                iterator.close()
+            self.is_loaded = True
+        logger.info(f"Built BM25 index over {self._live_count} chunks")
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict]], k: Optional[int] = None, limit: int = 5) -> List[Dict]:
+    """Merge ranked result lists by summing 1 / (k + rank) per chunk.
+
+    Ranks rather than raw scores are fused, so BM25 and inner-product scores
+    never need to be put on the same scale.
+    """
+    k = k or settings.RRF_K
+    fused: Dict = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, 1):
+            # Chunk position rather than the Milvus id identifies a chunk:
+            # ids change when an index migration copies the collection
+            key = (result["document_id"], result.get("chunk_index"))
+            if key[1] is None:
+                key = result.get("id") or (result["document_id"], None, result["text"][:64])
+            entry = fused.setdefault(key, {**result, "score": 0.0})
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda result: result["score"], reverse=True)[:limit]
+
+
+_bm25_index: Optional[BM25Index] = None
+
+
+def get_bm25_index() -> BM25Index:
+    """Get the process-wide BM25 index."""
+    global _bm25_index
+    if _bm25_index is None:
+        _bm25_index = BM25Index()
+    return _bm25_index
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import shutil
+import tarfile
+import uuid
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator, Dict, IO, Iterator, List, Optional, Tuple
+from src.core.config import settings
+from src.services.upload_spool import UploadTooLargeError, spool_upload
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_SUFFIXES = (".docx",)
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_document(filename: str) -> bool:
+    return filename.lower().endswith(DOCUMENT_SUFFIXES)
+
+
+def _archive_entries(archive_path: Path) -> Iterator[Tuple[str, int, IO[bytes]]]:
+    """Yield (name, size, stream) for every regular file in a zip or tar archive."""
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as stream:
+                        yield info.filename, info.file_size, stream
+        return
+    with tarfile.open(archive_path, "r:*") as archive:
+        for member in archive:
+            if member.isfile():
+                stream = archive.extractfile(member)
+                if stream is not None:
+                    with stream:
+                        yield member.name, member.size, stream
+
+
+class BulkStaging:
+    """Local staging directory for the documents of one bulk upload.
+
+    Archives are read entry by entry and each .docx is copied out in
+    chunks, so neither the archive nor its entries are held in memory.
+    Entries keep only their base name, so paths inside an archive cannot
+    escape the staging directory; duplicates and other files are skipped
+    and reported.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.dir = Path(settings.UPLOAD_SPOOL_DIR) / f"bulk_{uuid.uuid4().hex}"
+        self.dir.mkdir(parents=True)
+        self.max_bytes = settings.BULK_MAX_BYTES if max_bytes is None else max_bytes
+        self.documents: Dict[str, Path] = {}
+        self.skipped: List[Dict] = []
+        self.total_bytes = 0
+
+    def _reserve(self, name: str, size: int, source: str) -> bool:
+        if not is_document(name):
+            self.skipped.append({"name": name, "source": source, "reason": "not a .docx document"})
+            return False
+        if name in self.documents:
+            self.skipped.append({"name": name, "source": source, "reason": "duplicate file name"})
+            return False
+        if size > settings.UPLOAD_MAX_BYTES:
+            self.skipped.append({"name": name, "source": source, "reason": "file too large"})
+            return False
+        if self.total_bytes + size > self.max_bytes:
+            raise UploadTooLargeError(f"Bulk upload exceeds {self.max_bytes} bytes")
+        self.total_bytes += size
+        return True
+
+    def extract_archive(self, archive_path: Path, source: str):
+        """Copy the documents inside an archive into the staging directory."""
+        for entry_name, size, stream in _archive_entries(archive_path):
+            name = Path(entry_name).name
+            # Skip macOS resource forks and other hidden entries
+            if not name or name.startswith((".", "~$")):
+                continue
+            if not self._reserve(name, size, source):
+                continue
+            path = self.dir / name
+            with open(path, "wb") as output:
+                shutil.copyfileobj(stream, output, settings.UPLOAD_CHUNK_SIZE)
+            self.documents[name] = path
+
+    async def add_upload(self, chunks: AsyncIterator[bytes], filename: str):
+        """Spool one uploaded file and stage it, or the documents inside it if it is an archive."""
+        filename = Path(filename).name
+        archive = is_archive(filename)
+        if not archive and not self._reserve(filename, 0, filename):
+            # Unsupported files are skipped without being read
+            return
+        remaining = self.max_bytes - self.total_bytes
+        if remaining <= 0:
+            raise UploadTooLargeError(f"Bulk upload exceeds {self.max_bytes} bytes")
+        try:
+            upload = await spool_upload(
+                chunks,
+                filename,
+                max_bytes=remaining if archive else min(remaining, settings.UPLOAD_MAX_BYTES)
+            )
+        except UploadTooLargeError:
+            if archive or remaining <= settings.UPLOAD_MAX_BYTES:
+                raise
+            # Over the per-file limit only: skipped like an oversized archive entry
+            self.skipped.append({"name": filename, "source": filename, "reason": "file too large"})
+            return
+        try:
+            if archive:
+                try:
+                    await asyncio.to_thread(self.extract_archive, upload.path, filename)
+                except (zipfile.BadZipFile, tarfile.TarError) as e:
+                    self.skipped.append({"name": filename, "source": filename, "reason": f"unreadable archive: {e}"})
+                return
+            self.total_bytes += upload.size
+            path = self.dir / filename
+            shutil.move(str(upload.path), str(path))
+            self.documents[filename] = path
+        finally:
+            upload.cleanup()
+
+    def paths(self) -> List[Path]:
+        return list(self.documents.values())
+
+    def cleanup(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
@@ -0,0 +1,82 @@
+import logging
+from typing import Optional
+from src.db.job_registry import JobRegistry, get_job_registry
+from src.services.bm25_index import BM25Index, get_bm25_index
+from src.services.person_index import PersonNameIndex, get_person_index
+from src.services.semantic_cache import SemanticAnswerCache, get_semantic_cache
+
+logger = logging.getLogger(__name__)
+
+# Upper bound Milvus allows for one query; far above the chunks of any interview
+MAX_DOCUMENT_CHUNKS = 16384
+
+
+class CorpusSync:
+    """Keeps this worker's BM25 index and answer cache in step with ingestions in other workers.
+
+    Every worker logs the documents it adds or removes in the job
+    registry, and applies the changes logged by other workers: removals
+    are dropped from the index and cache, additions are read back from
+    Milvus into the index, register their interviewee in the person name
+    index and invalidate the cache.
+    """
+
+    def __init__(
+        self,
+        registry: Optional[JobRegistry] = None,
+        bm25_index: Optional[BM25Index] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        person_index: Optional[PersonNameIndex] = None
+    ):
+        # Empty indexes are falsy, so only a missing argument selects the shared instance
+        self.registry = get_job_registry() if registry is None else registry
+        self.bm25_index = get_bm25_index() if bm25_index is None else bm25_index
+        self.answer_cache = get_semantic_cache() if answer_cache is None else answer_cache
+        self.person_index = get_person_index() if person_index is None else person_index
+        # The index is built from Milvus after this point, so older changes are already in it
+        self.last_seq = self.registry.last_corpus_change()
+
+    def publish(self, document_id: str, action: str):
+        """Log a document this worker has just added ("add") or removed ("remove")."""
+        self.registry.publish_corpus_change(document_id, action)
+
+    def apply(self, collection) -> int:
+        """Apply the other workers' changes since the last call; returns how many were applied."""
+        applied = 0
+        for seq, document_id, action, worker_id in self.registry.corpus_changes(self.last_seq):
+            self.last_seq = seq
+            if worker_id == self.registry.owner:
+                continue
+            if action == "remove":
+                self.bm25_index.remove_document(document_id)
+                self.answer_cache.evict_documents([document_id])
+            elif action == "add":
+                # Indexes not loaded yet will pick the document up when they load
+                if self.bm25_index.is_loaded or self.person_index.is_loaded:
+                    # Strong consistency so rows the other worker has not flushed are visible
+                    chunks = collection.query(
+                        expr=f'document_id == "{document_id}"',
+                        output_fields=["id", "text", "document_id", "chunk_index", "person_name", "person_age"],
+                        limit=MAX_DOCUMENT_CHUNKS,
+                        consistency_level="Strong"
+                    )
+                    if self.bm25_index.is_loaded:
+                        self.bm25_index.add_chunks(document_id, chunks)
+                    for person_name in {chunk.get("person_name") for chunk in chunks}:
+                        self.person_index.add(person_name)
+                self.answer_cache.invalidate()
+            applied += 1
+        if applied:
+            logger.info(f"Applied {applied} corpus changes from other workers")
+        return applied
+
+
+_corpus_sync: Optional[CorpusSync] = None
+
+
+def get_corpus_sync() -> CorpusSync:
+    """Get the process-wide corpus sync."""
+    global _corpus_sync
+    if _corpus_sync is None:
+        _corpus_sync = CorpusSync()
+    return _corpus_sync
@@ -1,7 +1,9 @@
 from docx import Document
 from src.models.document import ProcessedChunk
 from src.core.config import settings
+from src.services.upload_spool import iter_upload, spool_upload
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+import asyncio
 import logging
 import re
 from typing import List, Dict, Any
@@ -29,19 +31,13 @@ class DocumentProcessor:
 
     async def process_file(self, file) -> List[ProcessedChunk]:
         try:
-            # Save uploaded file temporarily
-            temp_path = f"temp_{file.filename}"
-            with open(temp_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            # Process the document
-            chunks = self.process_document(temp_path)
-            
-            # Clean up
-            os.remove(temp_path)
-            
-            return chunks
+            # Stream the upload to its own spool file
+            upload = await spool_upload(iter_upload(file), file.filename)
+            try:
+                # Parsing large documents is CPU-bound; keep it off the event loop
+                return await asyncio.to_thread(self.process_document, str(upload.path))
+            finally:
+                upload.cleanup()
         except Exception as e:
             logger.error(f"Error processing file: {str(e)}")
             raise
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BatchEmbedder = Callable[[Sequence[str]], np.ndarray]
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into padded batches on one worker thread.
+
+    Callers enqueue a text and await a future. The worker takes the first
+    waiting request, keeps collecting for up to ``max_wait_ms`` or until
+    ``max_batch_size`` requests are waiting, runs one forward pass for all
+    of them and resolves every future on its own event loop. The model
+    therefore never runs on the event loop thread, and N concurrent queries
+    cost one batched pass instead of N sequential ones.
+    """
+
+    def __init__(
+        self,
+        embed_batch: BatchEmbedder,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        name: str = "embedding-batcher"
+    ):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.EMBEDDING_BATCH_MAX_WAIT_MS) / 1000
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopping = False
+
+        # Metrics; recent samples feed the percentiles
+        self.requests = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.max_batch_seen = 0
+        self._recent_batch_sizes: deque = deque(maxlen=1000)
+        self._recent_waits_ms: deque = deque(maxlen=1000)
+        self._recent_run_ms: deque = deque(maxlen=1000)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker after it finishes the requests already queued."""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text as part of the next batch."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((text, future, loop, time.perf_counter()))
+        self.requests += 1
+        return await future
+
+    def _collect(self, first) -> List:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop sentinel: finish this batch, then exit
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                if self._stopping:
+                    return
+                continue
+            batch = self._collect(first)
+            # Requests cancelled while waiting (e.g. client disconnects) are skipped
+            batch = [item for item in batch if not item[1].cancelled()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, _, enqueued in batch:
+                self._recent_waits_ms.append((started - enqueued) * 1000)
+            try:
+                embeddings = self.embed_batch([text for text, _, _, _ in batch])
+                error = None
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(batch)} failed: {str(e)}")
+                embeddings, error = None, e
+                self.failed_batches += 1
+            self._recent_run_ms.append((time.perf_counter() - started) * 1000)
+            self._recent_batch_sizes.append(len(batch))
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+            for i, (_, future, loop, _) in enumerate(batch):
+                result = embeddings[i] if error is None else None
+                loop.call_soon_threadsafe(self._resolve, future, result, error)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result, error: Optional[Exception]):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self) -> Dict:
+        def summary(samples: deque) -> Dict:
+            if not samples:
+                return {"mean": 0.0, "p50": 0.0, "p95": 0.0}
+            values = np.asarray(samples)
+            return {
+                "mean": float(values.mean()),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+            }
+
+        return {
+            "queue_depth": self._queue.qsize(),
+            "requests": self.requests,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "largest_batch": self.max_batch_seen,
+            "batch_size": summary(self._recent_batch_sizes),
+            "wait_ms": summary(self._recent_waits_ms),
+            "forward_ms": summary(self._recent_run_ms),
+        }
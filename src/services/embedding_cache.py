@@ -0,0 +1,208 @@
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# One record per matrix row: content hash of (model, text) and a last-used tick
+ROW_DTYPE = np.dtype([("key", "S32"), ("tick", "<u8")])
+
+
+def embedding_key(model_id: str, text: str) -> bytes:
+    """Stable content key: identical text embedded by the same model always maps here."""
+    return hashlib.sha256(f"{model_id}\0{text}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Bounded embedding cache backed by memory-mapped files.
+
+    Embeddings live in one contiguous float32 matrix with a key -> row index
+    and LRU eviction. The matrix and a sidecar of row keys are memory-mapped
+    from disk, so a restarted backend starts warm. One process owns the
+    files through an exclusive ``flock``; any other process sharing the
+    directory gets a read-only warm copy and keeps its additions in memory.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        dim: int,
+        capacity: Optional[int] = None,
+        directory: Optional[str] = None
+    ):
+        self.model_id = model_id
+        self.dim = dim
+        self.capacity = capacity or settings.EMBEDDING_CACHE_SIZE
+        self.directory = Path(directory or settings.EMBEDDING_CACHE_DIR)
+        self.is_owner = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._tick = 0
+
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id)
+        self._matrix_path = self.directory / f"{slug}.{dim}.f32"
+        self._rows_path = self.directory / f"{slug}.{dim}.rows"
+        self._open()
+
+        self._index: Dict[bytes, int] = {}
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        used = np.flatnonzero(self._rows["tick"] > 0)
+        for row in used[np.argsort(self._rows["tick"][used], kind="stable")]:
+            self._index[bytes(self._rows["key"][row])] = int(row)
+            self._lru[int(row)] = None
+        self._tick = int(self._rows["tick"].max()) if self.capacity else 0
+        self._free = sorted(set(range(self.capacity)) - set(self._lru), reverse=True)
+        logger.info(
+            f"Embedding cache for {model_id}: {len(self._index)} warm entries "
+            f"({'owner' if self.is_owner else 'read-only copy'})"
+        )
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _open(self):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._lock_file = open(self.directory / f"{self._matrix_path.name}.lock", "w")
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self.is_owner = True
+        except OSError:
+            if self._lock_file:
+                self._lock_file.close()
+                self._lock_file = None
+
+        if self.is_owner:
+            self._matrix = self._map(self._matrix_path, np.float32, (self.capacity, self.dim))
+            self._rows = self._map(self._rows_path, ROW_DTYPE, (self.capacity,))
+            return
+
+        # Another process owns the files: start from a private snapshot of them
+        self._matrix = np.zeros((self.capacity, self.dim), dtype=np.float32)
+        self._rows = np.zeros(self.capacity, dtype=ROW_DTYPE)
+        try:
+            matrix = np.fromfile(self._matrix_path, dtype=np.float32)
+            rows = np.fromfile(self._rows_path, dtype=ROW_DTYPE)
+            if matrix.size == self.capacity * self.dim and rows.size == self.capacity:
+                self._matrix[:] = matrix.reshape(self.capacity, self.dim)
+                self._rows[:] = rows
+        except OSError as e:
+            logger.warning(f"No warm embedding cache to copy: {str(e)}")
+
+    def _map(self, path: Path, dtype, shape) -> np.memmap:
+        expected = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if not path.exists() or path.stat().st_size != expected:
+            # New file, or one written with a different capacity: start cold
+            if path.exists():
+                logger.warning(f"Discarding embedding cache file with unexpected size: {path}")
+            with open(path, "wb") as f:
+                f.truncate(expected)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return cached embeddings for the texts, with None for misses."""
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for text in texts:
+                row = self._index.get(embedding_key(self.model_id, text))
+                if row is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                self._touch(row)
+                results.append(np.array(self._matrix[row]))
+        return results
+
+    def put_many(self, texts: Sequence[str], embeddings: np.ndarray):
+        """Store embeddings for the texts, evicting least recently used rows when full."""
+        if not self.capacity:
+            return
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                key = embedding_key(self.model_id, text)
+                row = self._index.get(key)
+                if row is None:
+                    row = self._allocate()
+                    self._index[key] = row
+                # Write the vector before publishing its key in the sidecar
+                self._matrix[row] = embedding
+                self._rows["key"][row] = key
+                self._touch(row)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        row, _ = self._lru.popitem(last=False)
+        self._index.pop(bytes(self._rows["key"][row]), None)
+        self._rows[row] = (b"", 0)
+        return row
+
+    def _touch(self, row: int):
+        self._tick += 1
+        self._rows["tick"][row] = self._tick
+        self._lru[row] = None
+        self._lru.move_to_end(row)
+
+    def flush(self):
+        """Write dirty pages of the memory-mapped files to disk."""
+        if self.is_owner:
+            with self._lock:
+                self._matrix.flush()
+                self._rows.flush()
+
+    def clear(self):
+        with self._lock:
+            self._rows[:] = np.zeros(self.capacity, dtype=ROW_DTYPE)
+            self._index.clear()
+            self._lru.clear()
+            self._free = list(range(self.capacity - 1, -1, -1))
+        self.flush()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "model_id": self.model_id,
+            "size": len(self),
+            "capacity": self.capacity,
+            "owner": self.is_owner,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self.flush()
+        if self._lock_file:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+
+_embedding_caches: Dict[str, EmbeddingCache] = {}
+_embedding_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_id: str, dim: int) -> EmbeddingCache:
+    """Get the process-wide embedding cache for a model."""
+    with _embedding_caches_lock:
+        key = f"{model_id}:{dim}"
+        if key not in _embedding_caches:
+            _embedding_caches[key] = EmbeddingCache(model_id, dim)
+        return _embedding_caches[key]
+
+
+def close_embedding_caches():
+    with _embedding_caches_lock:
+        for cache in _embedding_caches.values():
+            cache.close()
+        _embedding_caches.clear()
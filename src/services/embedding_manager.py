@@ -4,24 +4,55 @@ import torch.nn.functional as F
 import numpy as np
 from src.core.config import settings
 import logging
-from typing import List
+from typing import List, Optional
+from src.services.embedding_cache import get_embedding_cache
 
 logger = logging.getLogger(__name__)
 
+def plan_length_batches(lengths: List[int], token_budget: int, max_batch_size: int) -> List[List[int]]:
+    """Group indices by token length so each padded batch fits the token budget.
+
+    Indices are sorted longest first and a batch grows while
+    ``len(batch) * longest_in_batch`` (the padded tensor size) stays within
+    the budget, so short paragraphs share large batches and long ones are
+    never padded to by short neighbours. A single text always forms a batch.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    longest = 0
+    for i in order:
+        longest_after = max(longest, lengths[i])
+        if current and (len(current) >= max_batch_size or (len(current) + 1) * longest_after > token_budget):
+            batches.append(current)
+            current, longest_after = [], lengths[i]
+        current.append(i)
+        longest = longest_after
+    if current:
+        batches.append(current)
+    return batches
+
 class EmbeddingManager:
-    def __init__(self):
+    def __init__(self, model_name: Optional[str] = None, pooling: str = "mean"):
+        """``pooling="cls"`` gives the raw CLS vectors that embedding_script.py stores on Puhti."""
+        if pooling not in ("mean", "cls"):
+            raise ValueError(f"Unknown pooling: {pooling}")
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.pooling = pooling
         self.device = "cuda" if torch.cuda.is_available() and settings.USE_GPU else "cpu"
         self._initialize_model()
-        self.embedding_cache = {}
+        # Embeddings from different poolings must not share cache entries
+        cache_id = self.model_name if pooling == "mean" else f"{self.model_name}#{pooling}"
+        self.embedding_cache = get_embedding_cache(cache_id, settings.EMBEDDING_DIM)
 
     def _initialize_model(self):
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(
-                settings.EMBEDDING_MODEL,
+                self.model_name,
                 cache_dir=settings.CACHE_DIR
             )
             self.model = AutoModel.from_pretrained(
-                settings.EMBEDDING_MODEL,
+                self.model_name,
                 cache_dir=settings.CACHE_DIR
             ).to(self.device)
             
@@ -31,53 +62,27 @@ class EmbeddingManager:
             logger.error(f"Error initializing embedding model: {str(e)}")
             raise
 
-    def generate_embeddings(self, texts: List[str], batch_size: int = 8) -> np.ndarray:
+    def generate_embeddings(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Embed texts, reusing cached embeddings and length-bucketing the rest.
+
+        Uncached texts are tokenized once, sorted by token length and grouped
+        so each padded batch stays within EMBEDDING_TOKEN_BUDGET; results come
+        back in the original order. ``batch_size`` caps texts per batch.
+        """
         try:
-            all_embeddings = []
+            all_embeddings = self.embedding_cache.get_many(texts)
+            uncached_indices = [i for i, embedding in enumerate(all_embeddings) if embedding is None]
             
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i:i + batch_size]
-                
-                # Use cache when possible
-                batch_embeddings = []
-                uncached_texts = []
-                uncached_indices = []
-                
-                for j, text in enumerate(batch_texts):
-                    cache_key = hash(text)
-                    if cache_key in self.embedding_cache:
-                        batch_embeddings.append(self.embedding_cache[cache_key])
-                    else:
-                        uncached_texts.append(text)
-                        uncached_indices.append(j)
+            if uncached_indices:
+                uncached_texts = [texts[i] for i in uncached_indices]
+                embeddings_np = self.embed_texts(uncached_texts, max_batch_size=batch_size)
                 
-                if uncached_texts:
-                    with torch.no_grad():
-                        inputs = self.tokenizer(
-                            uncached_texts,
-                            padding=True,
-                            truncation=True,
-                            max_length=512,
-                            return_tensors='pt'
-                        ).to(self.device)
-                        
-                        outputs = self.model(**inputs)
-                        embeddings = self._mean_pooling(
-                            outputs,
-                            inputs['attention_mask']
-                        )
-                        embeddings = F.normalize(embeddings, p=2, dim=1)
-                        
-                        # Cache new embeddings
-                        embeddings_np = embeddings.cpu().numpy()
-                        for text, embedding in zip(uncached_texts, embeddings_np):
-                            self.embedding_cache[hash(text)] = embedding
-                            
-                        # Insert new embeddings into correct positions
-                        for idx, embedding in zip(uncached_indices, embeddings_np):
-                            batch_embeddings.insert(idx, embedding)
+                # Cache new embeddings
+                self.embedding_cache.put_many(uncached_texts, embeddings_np)
                 
-                all_embeddings.extend(batch_embeddings)
+                # Insert new embeddings into correct positions
+                for idx, embedding in zip(uncached_indices, embeddings_np):
+                    all_embeddings[idx] = embedding
             
             return np.vstack(all_embeddings)
             
@@ -85,6 +90,44 @@ class EmbeddingManager:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
 
+    def tokenize(self, texts: List[str]) -> List[List[int]]:
+        """Token ids per text, truncated but not padded."""
+        return self.tokenizer(list(texts), truncation=True, max_length=512)["input_ids"]
+
+    def embed_texts(
+        self,
+        texts: List[str],
+        token_budget: Optional[int] = None,
+        max_batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """Embed texts without the cache, in length-bucketed batches."""
+        input_ids = self.tokenize(texts)
+        batches = plan_length_batches(
+            [len(ids) for ids in input_ids],
+            token_budget or settings.EMBEDDING_TOKEN_BUDGET,
+            max_batch_size or settings.EMBEDDING_MAX_BATCH_SIZE
+        )
+        return self.embed_batches(input_ids, batches)
+
+    def embed_batches(self, input_ids: List[List[int]], batches: List[List[int]]) -> np.ndarray:
+        """Run one padded forward pass per batch of indices into ``input_ids``."""
+        embeddings = np.zeros((len(input_ids), self.model.config.hidden_size), dtype=np.float32)
+        with torch.no_grad():
+            for batch in batches:
+                inputs = self.tokenizer.pad(
+                    {"input_ids": [input_ids[i] for i in batch]},
+                    padding=True,
+                    return_tensors='pt'
+                ).to(self.device)
+                
+                outputs = self.model(**inputs)
+                if self.pooling == "cls":
+                    embeddings[batch] = outputs.last_hidden_state[:, 0, :].cpu().numpy()
+                else:
+                    pooled = self._mean_pooling(outputs, inputs['attention_mask'])
+                    embeddings[batch] = F.normalize(pooled, p=2, dim=1).cpu().numpy()
+        return embeddings
+
     def _mean_pooling(self, model_output, attention_mask):
         token_embeddings = model_output[0]
         input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from src.core.config import settings
+from src.services.puhti_transport import PuhtiTransport, get_puhti_transport
+
+logger = logging.getLogger(__name__)
+
+SLURM_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def read_docx_paragraphs(file_path: Path) -> List[str]:
+    """Non-empty paragraphs of a .docx, exactly as embedding_script.py reads them on Puhti."""
+    from docx import Document
+
+    return [paragraph.text for paragraph in Document(str(file_path)).paragraphs if paragraph.text.strip()]
+
+
+def _parse_slurm_time(value: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(value.strip(), SLURM_TIME_FORMAT)
+    except ValueError:
+        # "Unknown", "N/A" or "None" for jobs that have not started
+        return None
+
+
+class RouteDecision:
+    """Where one document is embedded, and how long each option was predicted to take."""
+
+    def __init__(
+        self,
+        target: str,
+        tokens: int,
+        local_seconds: float,
+        remote_seconds: Optional[float],
+        reason: str
+    ):
+        self.target = target
+        self.tokens = tokens
+        self.local_seconds = local_seconds
+        self.remote_seconds = remote_seconds
+        self.reason = reason
+        self.started = time.monotonic()
+        # Queue wait included in remote_seconds, so the remote overhead can be learned from the rest
+        self.remote_wait = 0.0
+
+    @property
+    def predicted_seconds(self) -> Optional[float]:
+        return self.local_seconds if self.target == "local" else self.remote_seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "target": self.target,
+            "tokens": self.tokens,
+            "predicted_local_seconds": round(self.local_seconds, 1),
+            "predicted_remote_seconds": None if self.remote_seconds is None else round(self.remote_seconds, 1),
+            "reason": self.reason,
+        }
+
+
+class EmbeddingRouter:
+    """Decides per document whether to embed locally or on Puhti, whichever finishes first.
+
+    The local estimate is tokens times a per-token CPU cost, plus the model
+    load if the local model is not loaded yet and any local work still
+    queued. The remote estimate is the expected gputest queue wait (from
+    pending jobs' ``squeue --start`` times and the median wait of recent
+    embedding jobs in ``sacct``) plus a fixed overhead and GPU time. Both
+    the per-token cost and the remote overhead are corrected from the
+    actual times recorded after each document.
+    """
+
+    def __init__(self, transport: Optional[PuhtiTransport] = None):
+        self.transport = transport or get_puhti_transport()
+        self.local_seconds_per_token = settings.LOCAL_EMBEDDING_SECONDS_PER_1K_TOKENS / 1000
+        self.remote_overhead = settings.REMOTE_EMBEDDING_OVERHEAD_SECONDS
+        self._local_manager = None
+        self._local_lock = threading.Lock()
+        self._local_backlog_tokens = 0
+        self._tokenizer = None
+        self._wait_estimate: Optional[float] = None
+        self._wait_estimated_at = 0.0
+        self._wait_lock = asyncio.Lock()
+
+    def count_tokens(self, texts: List[str]) -> int:
+        try:
+            if self._tokenizer is None:
+                from transformers import AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(settings.EMBEDDING_MODEL, cache_dir=settings.CACHE_DIR)
+            return sum(len(ids) for ids in self._tokenizer(texts, truncation=True, max_length=512)["input_ids"])
+        except Exception as e:
+            # Roughly four characters per token for Finnish text
+            logger.warning(f"Tokenizer unavailable, estimating token count: {str(e)}")
+            return sum(len(text) for text in texts) // 4
+
+    async def measure(self, file_path: Path) -> Tuple[List[str], int]:
+        """Paragraphs of a document and their total token count."""
+        def run():
+            texts = read_docx_paragraphs(file_path)
+            return texts, self.count_tokens(texts)
+
+        return await asyncio.to_thread(run)
+
+    def estimate_local(self, tokens: int) -> float:
+        load = 0.0 if self._local_manager is not None else settings.LOCAL_EMBEDDING_LOAD_SECONDS
+        return load + (self._local_backlog_tokens + tokens) * self.local_seconds_per_token
+
+    async def estimate_remote_wait(self) -> float:
+        """Expected gputest queue wait for a new embedding job, cached for REMOTE_WAIT_CACHE_SECONDS."""
+        async with self._wait_lock:
+            if self._wait_estimate is not None and time.time() - self._wait_estimated_at < settings.REMOTE_WAIT_CACHE_SECONDS:
+                return self._wait_estimate
+            try:
+                waits = await self._historical_waits()
+                estimate = statistics.median(waits) if waits else settings.REMOTE_EMBEDDING_DEFAULT_WAIT
+                pending = await self._pending_start_delay()
+                if pending is not None:
+                    # A new job queues behind our own pending ones
+                    estimate = max(estimate, pending)
+            except Exception as e:
+                logger.warning(f"Could not estimate Puhti queue wait: {str(e)}")
+                estimate = settings.REMOTE_EMBEDDING_DEFAULT_WAIT
+            self._wait_estimate, self._wait_estimated_at = estimate, time.time()
+            return estimate
+
+    async def _historical_waits(self) -> List[float]:
+        """Submit-to-start waits of recent embedding jobs, newest last."""
+        stdout, stderr, exit_status = await self.transport.exec(
+            f"sacct -u $USER -X -n -P -S now-{settings.REMOTE_WAIT_HISTORY_HOURS}hours "
+            f"-o JobName,Submit,Start"
+        )
+        if exit_status != 0:
+            raise Exception(f"sacct failed: {stderr}")
+        waits = []
+        for line in stdout.splitlines():
+            parts = line.split("|")
+            if len(parts) < 3 or not parts[0].startswith("embed"):
+                continue
+            submit, start = _parse_slurm_time(parts[1]), _parse_slurm_time(parts[2])
+            if submit and start:
+                waits.append(max(0.0, (start - submit).total_seconds()))
+        return waits[-settings.REMOTE_WAIT_SAMPLES:]
+
+    async def _pending_start_delay(self) -> Optional[float]:
+        """Seconds until the latest expected start among our pending embedding jobs."""
+        # squeue prints start times in the cluster's local time, so take "now" from the cluster too
+        stdout, stderr, exit_status = await self.transport.exec(
+            f'squeue -u $USER -h -t PENDING --start -o "%j|%S" && date +{SLURM_TIME_FORMAT}'
+        )
+        if exit_status != 0:
+            raise Exception(f"squeue failed: {stderr}")
+        *lines, clock = stdout.splitlines() or [""]
+        now = _parse_slurm_time(clock) or datetime.now()
+        delays = [
+            (start - now).total_seconds()
+            for name, _, value in (line.partition("|") for line in lines)
+            if name.startswith("embed") and (start := _parse_slurm_time(value)) is not None
+        ]
+        return max(0.0, max(delays)) if delays else None
+
+    async def decide(self, tokens: int) -> RouteDecision:
+        mode = settings.EMBEDDING_ROUTING.lower()
+        local_seconds = self.estimate_local(tokens)
+        if mode == "local":
+            return RouteDecision("local", tokens, local_seconds, None, "EMBEDDING_ROUTING=local")
+        if mode == "puhti" or tokens > settings.LOCAL_EMBEDDING_MAX_TOKENS:
+            reason = "EMBEDDING_ROUTING=puhti" if mode == "puhti" else "too large for local embedding"
+            return RouteDecision("puhti", tokens, local_seconds, None, reason)
+
+        wait = await self.estimate_remote_wait()
+        remote_seconds = wait + self.remote_overhead + tokens * settings.REMOTE_EMBEDDING_SECONDS_PER_1K_TOKENS / 1000
+        target = "local" if local_seconds <= remote_seconds else "puhti"
+        decision = RouteDecision(target, tokens, local_seconds, remote_seconds, f"queue wait ~{wait:.0f}s")
+        decision.remote_wait = wait
+        return decision
+
+    def _get_local_manager(self):
+        if self._local_manager is None:
+            from src.services.embedding_manager import EmbeddingManager
+            # CLS pooling without normalization, as embedding_script.py stores on Puhti
+            self._local_manager = EmbeddingManager(pooling="cls")
+        return self._local_manager
+
+    async def embed_locally(self, texts: List[str], decision: RouteDecision) -> np.ndarray:
+        """Embed a document's paragraphs on this machine, one document at a time."""
+        self._local_backlog_tokens += decision.tokens
+
+        def run():
+            with self._local_lock:
+                manager = self._get_local_manager()
+                start = time.monotonic()
+                embeddings = manager.embed_texts(texts)
+                if decision.tokens:
+                    # Learn the CPU cost from compute time alone, not model load or queueing
+                    observed = (time.monotonic() - start) / decision.tokens
+                    self.local_seconds_per_token += settings.EMBEDDING_ROUTING_LEARNING_RATE * (
+                        observed - self.local_seconds_per_token
+                    )
+                return embeddings
+
+        try:
+            return await asyncio.to_thread(run)
+        finally:
+            self._local_backlog_tokens -= decision.tokens
+
+    def record(self, decision: RouteDecision, label: str):
+        """Log predicted vs actual time and fold remote actuals back into the overhead estimate."""
+        actual = time.monotonic() - decision.started
+        predicted = "n/a" if decision.predicted_seconds is None else f"{decision.predicted_seconds:.1f}s"
+        logger.info(
+            f"Embedding route for {label}: {decision.target} ({decision.reason}), "
+            f"{decision.tokens} tokens, predicted {predicted}, actual {actual:.1f}s"
+        )
+        if decision.target == "puhti" and decision.remote_wait:
+            gpu_seconds = decision.tokens * settings.REMOTE_EMBEDDING_SECONDS_PER_1K_TOKENS / 1000
+            observed = max(0.0, actual - decision.remote_wait - gpu_seconds)
+            self.remote_overhead += settings.EMBEDDING_ROUTING_LEARNING_RATE * (observed - self.remote_overhead)
+
+_router: Optional[EmbeddingRouter] = None
+
+
+def get_embedding_router() -> EmbeddingRouter:
+    global _router
+    if _router is None:
+        _router = EmbeddingRouter()
+    return _router
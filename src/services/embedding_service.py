@@ -4,16 +4,19 @@ import numpy as np
 from pathlib import Path
 import logging
 import os
+from typing import Optional, Sequence
 from src.core.config import settings
+from src.services.embedding_batcher import EmbeddingBatcher
+from src.services.onnx_embedding import OnnxEmbeddingEngine
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingService:
-    def __init__(self):
+    def __init__(self, model_path: Optional[Path] = None):
         # Get the path to hugging_face_models in project root
         src_dir = Path(__file__).parent.parent
         project_root = src_dir.parent 
-        self.model_path = project_root / "hugging_face_models"
+        self.model_path = Path(model_path) if model_path else project_root / "hugging_face_models"
         
         logger.info(f"Model path set to: {self.model_path}")
         
@@ -21,11 +24,21 @@ class EmbeddingService:
             logger.error(f"Model path does not exist: {self.model_path}")
             raise FileNotFoundError(f"Model not found at {self.model_path}")
             
+        self.engine = settings.EMBEDDING_ENGINE.lower()
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.load_model()
+        # Concurrent queries share forward passes through a single worker thread
+        self.batcher = EmbeddingBatcher(self.embed_batch) if settings.EMBEDDING_BATCHING_ENABLED else None
 
     def load_model(self):
         """Load model and tokenizer from local path."""
+        if self.engine == "onnx":
+            self.device = "cpu"
+            self.onnx_engine = OnnxEmbeddingEngine(self.model_path)
+            self.tokenizer = self.onnx_engine.tokenizer
+            return
+        if self.engine != "torch":
+            raise ValueError(f"Unknown EMBEDDING_ENGINE: {settings.EMBEDDING_ENGINE}")
         try:
             logger.info(f"Loading model from: {self.model_path}")
             if not (self.model_path / "tokenizer_config.json").exists():
@@ -57,36 +70,50 @@ class EmbeddingService:
 
     async def generate_embedding(self, text: str) -> np.ndarray:
         """Generate embedding for text."""
+        if self.batcher is not None:
+            return await self.batcher.embed(text)
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed several texts in one padded forward pass; rows are L2-normalized."""
         try:
-            with torch.no_grad():
-                # Tokenize and move to device
-                inputs = self.tokenizer(
-                    text,
-                    padding=True,
-                    truncation=True,
-                    max_length=512,
-                    return_tensors="pt"
-                ).to(self.device)
+            if self.engine == "onnx":
+                pooled = self.onnx_engine.embed(texts)
+            else:
+                with torch.no_grad():
+                    # Tokenize and move to device
+                    inputs = self.tokenizer(
+                        list(texts),
+                        padding=True,
+                        truncation=True,
+                        max_length=512,
+                        return_tensors="pt"
+                    ).to(self.device)
 
-                outputs = self.model(**inputs)
+                    outputs = self.model(**inputs)
 
-                hidden_states = outputs.last_hidden_state
-                
+                    # Mean over real tokens only, so padding added for shorter
+                    # texts in the batch does not change their embedding
+                    mask = inputs["attention_mask"].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+                    pooled = (outputs.last_hidden_state * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                    pooled = pooled.float().cpu().numpy()
 
-                pooled = hidden_states.mean(dim=1)  # [batch_size, hidden_size]
+            if pooled.shape[-1] > settings.EMBEDDING_DIM:
+                pooled = pooled[:, :settings.EMBEDDING_DIM]
+            elif pooled.shape[-1] < settings.EMBEDDING_DIM:
+                pooled = np.pad(pooled, ((0, 0), (0, settings.EMBEDDING_DIM - pooled.shape[-1])))
 
-                if pooled.shape[-1] != settings.EMBEDDING_DIM:
-                    if pooled.shape[-1] > settings.EMBEDDING_DIM:
-                        pooled = pooled[:, :settings.EMBEDDING_DIM]
-                    else:
-                        padding = torch.zeros(1, settings.EMBEDDING_DIM - pooled.shape[-1], device=self.device)
-                        pooled = torch.cat([pooled, padding], dim=1)
-                
-                # Normalize
-                normalized = torch.nn.functional.normalize(pooled, p=2, dim=1)
-                
-                return normalized[0].cpu().numpy()
+            # Normalize
+            norms = np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            return (pooled / norms).astype(np.float32)
 
         except Exception as e:
             logger.error(f"Error generating embedding: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def batch_stats(self) -> Optional[dict]:
+        return self.batcher.stats() if self.batcher is not None else None
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.stop()
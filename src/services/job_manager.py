@@ -2,16 +2,55 @@ import asyncio
 import json
 import logging
 import re
+import shlex
+import tarfile
+import time
 from pathlib import Path
 import uuid
 from datetime import datetime
-from typing import Dict, Optional, Tuple
-import paramiko
+from typing import Dict, List, Optional, Set, Tuple
 import torch
 from src.core.config import settings
+from src.services.puhti_transport import PuhtiTransport, get_puhti_transport
+from src.core.workers import WorkerCoordinator, get_worker_coordinator
+from src.db.job_registry import JobRegistry, get_job_registry
+from src.services.slurm_poller import FAILED_STATES, SlurmStatusPoller, get_slurm_poller
 
 logger = logging.getLogger(__name__)
 
+
+def plan_embedding_batch(n_documents: int) -> Tuple[int, str, int]:
+    """Array size, partition and per-task time limit in seconds for embedding a batch.
+
+    A batch stays on gputest while a few tasks can finish within its 15
+    minute limit; larger backfills spread over more tasks on gpu, each
+    given enough time for its share of the manifest.
+    """
+    per_task = max(1, settings.EMBEDDING_BATCH_DOCUMENTS_PER_TASK)
+    tasks = max(1, -(-n_documents // per_task))
+
+    def seconds_for(task_count: int) -> int:
+        share = -(-n_documents // task_count)
+        return settings.EMBEDDING_BATCH_STARTUP_SECONDS + share * settings.EMBEDDING_BATCH_SECONDS_PER_DOCUMENT
+
+    test_tasks = min(tasks, settings.EMBEDDING_BATCH_TEST_MAX_ARRAY_TASKS)
+    if seconds_for(test_tasks) <= settings.EMBEDDING_BATCH_TEST_TIME_LIMIT:
+        return test_tasks, "gputest", settings.EMBEDDING_BATCH_TEST_TIME_LIMIT
+    tasks = min(tasks, settings.EMBEDDING_BATCH_MAX_ARRAY_TASKS)
+    # Whole minutes, never less than gputest would have given
+    seconds = max(settings.EMBEDDING_BATCH_TEST_TIME_LIMIT, -(-seconds_for(tasks) // 60) * 60)
+    return tasks, "gpu", seconds
+
+
+def slurm_time(seconds: int) -> str:
+    """Format seconds as a Slurm time limit (D-HH:MM:SS once it spans days)."""
+    days, seconds = divmod(int(seconds), 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    clock = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{days}-{clock}" if days else clock
+
+
 class DocumentMetadataExtractor:
     @staticmethod
     def extract_from_filename(filename: str) -> Dict:
@@ -43,109 +82,217 @@ class DocumentMetadataExtractor:
             }
 
 class PuhtiJobManager:
-    def __init__(self):
-        self.ssh_client = None
-        self.jobs: Dict[str, Dict] = {}
+    def __init__(
+        self,
+        transport: Optional[PuhtiTransport] = None,
+        poller: Optional[SlurmStatusPoller] = None,
+        registry: Optional[JobRegistry] = None,
+        coordinator: Optional[WorkerCoordinator] = None
+    ):
+        self.transport = transport or get_puhti_transport()
+        self.poller = poller or get_slurm_poller()
+        self.coordinator = coordinator or get_worker_coordinator()
+        # Durable and shared with every worker process; see recover_jobs
+        self.jobs = (registry or get_job_registry()).namespace("puhti")
         self.work_dir = Path("/scratch/project_2011638/input_documents")
         self.script_path = Path("/scratch/project_2011638/embedding_script.py")
         self.metadata_extractor = DocumentMetadataExtractor()
+        self._llm_worker_id: Optional[str] = None
+        self._llm_worker_lock = asyncio.Lock()
+        self._listing_lock = asyncio.Lock()
+        self._listing_cache: Dict[str, Tuple[float, Set[str]]] = {}
 
     async def connect(self):
-        """Establish SSH connection to Puhti."""
-        if not self.ssh_client:
-            try:
-                self.ssh_client = paramiko.SSHClient()
-                self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                self.ssh_client.connect(
-                    settings.PUHTI_HOST,
-                    username=settings.PUHTI_USERNAME,
-                    key_filename=settings.SSH_KEY_PATH,
-                )
-                logger.info("Connected to Puhti successfully")
-            except Exception as e:
-                logger.error(f"Failed to connect to Puhti: {str(e)}")
-                raise
+        """Ensure the shared SSH connection pool to Puhti is up."""
+        try:
+            await self.transport.connect()
+        except Exception as e:
+            logger.error(f"Failed to connect to Puhti: {str(e)}")
+            raise
+
     async def _cleanup_stalled_jobs(self):
         """Clean up stalled jobs before submitting new ones."""
         try:
-            await self.connect()
             # Cancel all jobs for current user
-            stdin, stdout, stderr = self.ssh_client.exec_command("scancel -u $USER")
+            await self.transport.exec("scancel -u $USER")
             await asyncio.sleep(2)  # Give time for jobs to be cancelled
             logger.info("Cleaned up stalled jobs")
         except Exception as e:
             logger.error(f"Error cleaning up stalled jobs: {str(e)}")
 
-    async def submit_embedding_job(self, file_path: Path) -> Tuple[str, Dict]:
-        """Submit document embedding job and return job ID and metadata."""
-        try:
-            await self.connect()
-            
-            # Extract metadata from filename
-            metadata = self.metadata_extractor.extract_from_filename(file_path.name)
-            job_id = str(uuid.uuid4())
-            
-            # Prepare remote paths
-            remote_filename = f"{metadata['document_id']}_{file_path.name}"
-            remote_file_path = self.input_path / remote_filename
-            
-            # Transfer document file
-            sftp = self.ssh_client.open_sftp()
-            await self._ensure_remote_dirs(sftp)
-            sftp.put(str(file_path), str(remote_file_path))
-            
-            # Generate and transfer batch script
-            batch_script = await self._generate_batch_script(
-                job_name=f"embed_{metadata['document_id']}", 
-                input_path=str(remote_file_path)
-            )
-            script_remote_path = self.input_path / f"job_{job_id}.sh"
-            sftp.put(str(batch_script), str(script_remote_path))
-            
-            # Submit batch job
-            stdin, stdout, stderr = self.ssh_client.exec_command(
-                f"cd {self.input_path} && sbatch {script_remote_path}"
+    async def recover_jobs(self, coordinator: Optional[WorkerCoordinator] = None) -> List[Dict]:
+        """Adopt jobs whose owning worker is gone and return the ones to monitor again.
+
+        After a restart that is every unfinished job; while running, the
+        leader calls this periodically for jobs of workers that died. The
+        adopted jobs' Slurm IDs are tracked again and refreshed with one
+        squeue and one sacct call. Nothing is resubmitted: embedding jobs
+        whose results were downloaded but not stored are rewound to collect
+        the outputs from Puhti again, local embeddings that were cut off are
+        marked failed, and LLM queries are only tracked since any worker
+        reads their status on demand.
+        """
+        coordinator = coordinator or self.coordinator
+        candidates = self.jobs.unfinished() + [
+            job for job in self.jobs.find(status="COMPLETED")
+            if job.get("kind") in ("embedding", "embedding_batch") and not self._fully_ingested(job)
+        ]
+        interrupted = [job for job in candidates if not coordinator.is_alive(job.get("owner"))]
+        resume = []
+        for job in interrupted:
+            kind = job.get("kind")
+            if kind == "embedding_local":
+                job.update({"status": "FAILED", "error": "Interrupted by a backend restart"})
+                continue
+            job["owner"] = coordinator.worker_id
+            if job.get("slurm_job_id"):
+                self.poller.track(job["slurm_job_id"])
+            if kind == "embedding":
+                if job["status"] == "COMPLETED":
+                    job["status"] = "RUNNING"
+                job["resumed"] = True
+                resume.append(job)
+            elif kind == "embedding_batch":
+                for document in job["documents"].values():
+                    if document["status"] == "COMPLETED" and not document.get("ingested"):
+                        document["status"] = "PENDING"
+                job.update({"status": "RUNNING", "resumed": True})
+                resume.append(job)
+        
+        slurm_job_ids = {job["slurm_job_id"] for job in interrupted if job.get("slurm_job_id")}
+        if slurm_job_ids:
+            await self.poller.refresh(slurm_job_ids)
+        if interrupted:
+            logger.info(f"Recovered {len(interrupted)} unfinished jobs, resuming {len(resume)} ingestions")
+        return resume
+
+    @staticmethod
+    def _fully_ingested(job: Dict) -> bool:
+        if job.get("kind") == "embedding_batch":
+            return all(
+                document.get("ingested") or document["status"] == "FAILED"
+                for document in job["documents"].values()
             )
-            slurm_job_id = stdout.read().decode().strip().split()[-1]
-            
-            # Store job information
-            self.jobs[job_id] = {
-                "slurm_job_id": slurm_job_id,
-                "status": "PENDING",
-                "input_file": str(remote_file_path),
-                "metadata": metadata,
-                "submitted_at": datetime.utcnow().isoformat(),
-            }
-            
-            return job_id, metadata
-            
-        except Exception as e:
-            logger.error(f"Failed to submit embedding job: {str(e)}")
-            raise
+        return bool(job.get("ingested"))
+
+    async def get_slurm_state(self, slurm_job_id: str) -> str:
+        """Get a job's Slurm state from the shared poller's status table.
+
+        Jobs the poller already tracks cost no SSH round-trip; unknown jobs
+        are registered and refreshed once.
+        """
+        status = self.poller.get_status(slurm_job_id)
+        if status is None:
+            self.poller.track(slurm_job_id)
+            await self.poller.refresh([slurm_job_id])
+            status = self.poller.get_status(slurm_job_id)
+        return status
+
+    async def wait_for_job(self, job_id: str, timeout: Optional[float] = None) -> str:
+        """Wait for the Slurm job behind a job ID to finish and return its final state."""
+        job_info = self.jobs.get(job_id)
+        if not job_info:
+            raise ValueError(f"No job found for ID {job_id}")
+        if not job_info.get("worker"):
+            return await self.poller.wait_for(job_info["slurm_job_id"], timeout=timeout)
+
+        # Queries answered by the persistent worker finish long before its Slurm job does
+        async def wait_for_worker_query():
+            while True:
+                state = await self.get_job_state(job_id)
+                if self.poller.is_terminal(state):
+                    return state
+                await asyncio.sleep(self.poller.next_interval())
+
+        return await asyncio.wait_for(wait_for_worker_query(), timeout=timeout)
+
+    async def get_job_state(self, job_id: str) -> str:
+        """Get a job's Slurm-style state (PENDING, RUNNING, COMPLETED or a failure state).
+
+        Per-query jobs map directly to their Slurm job. Queries routed to the
+        persistent LLM worker are followed through the queue and output
+        directories, since the worker's own Slurm job outlives them.
+        """
+        job_info = self.jobs.get(job_id)
+        if not job_info:
+            raise ValueError(f"No job found for ID {job_id}")
+        if job_info["status"] == "COMPLETED":
+            return "COMPLETED"
+        if not job_info.get("worker"):
+            return await self.get_slurm_state(job_info["slurm_job_id"])
+
+        input_path = Path(job_info["input_file"])
+        output_dir = Path(job_info["output_dir"])
+        worker_state = await self.get_slurm_state(job_info["slurm_job_id"])
+        worker_gone = self.poller.is_terminal(worker_state)
+
+        # Once the worker is gone, listings must be fresh to tell finished queries from lost ones
+        outputs = await self._list_remote_dir(output_dir, max_age=0 if worker_gone else None)
+        if f"response_{input_path.stem}.json" in outputs:
+            return "COMPLETED"
+        if not worker_gone:
+            return "RUNNING" if f"stream_{input_path.stem}.txt" in outputs else "PENDING"
 
-    async def submit_embedding_job(self, file_path: Path) -> Tuple[str, Dict]:
-        """Submit document embedding job and return job ID and metadata."""
+        queued = await self._list_remote_dir(input_path.parent, max_age=0)
+        if input_path.name in queued:
+            # The worker exited before reaching this query; hand it to a new one
+            job_info["slurm_job_id"] = await self._ensure_llm_worker(input_path.parent, output_dir)
+            return "PENDING"
+        return "FAILED"
+
+    async def _list_remote_dir(self, remote_dir: Path, max_age: Optional[float] = None) -> Set[str]:
+        """List a remote directory, sharing one listing between all callers within max_age seconds."""
+        max_age = settings.SLURM_POLL_MIN_INTERVAL if max_age is None else max_age
+        key = str(remote_dir)
+        async with self._listing_lock:
+            cached = self._listing_cache.get(key)
+            if cached and time.time() - cached[0] < max_age:
+                return cached[1]
+            names = set(await self.transport.listdir(key))
+            self._listing_cache[key] = (time.time(), names)
+            return names
+
+    def remote_document_path(self, metadata: Dict, filename: str) -> Path:
+        """Where a document's input file lives on Puhti."""
+        return self.work_dir / f"{metadata['document_id']}_{Path(filename).name}"
+
+    def register_local_job(self, metadata: Dict, input_file: Path, sha256: Optional[str] = None) -> str:
+        """Track a document that is embedded on this machine instead of on Puhti."""
+        job_id = str(uuid.uuid4())
+        self.jobs[job_id] = {
+            "kind": "embedding_local",
+            "slurm_job_id": None,
+            "status": "RUNNING",
+            "local": True,
+            "input_file": str(input_file),
+            "metadata": metadata,
+            "sha256": sha256,
+            "submitted_at": datetime.utcnow().isoformat(),
+        }
+        return job_id
+
+    async def submit_embedding_job(
+        self,
+        file_path: Path,
+        metadata: Optional[Dict] = None,
+        remote_file_path: Optional[Path] = None,
+        sha256: Optional[str] = None
+    ) -> Tuple[str, Dict]:
+        """Submit document embedding job and return job ID and metadata.
+
+        Pass ``remote_file_path`` when the file was already streamed to
+        Puhti (see spool_upload); otherwise it is uploaded from file_path.
+        """
         try:
-            await self.connect()
-            
             # Extract metadata from filename
-            metadata = self.metadata_extractor.extract_from_filename(file_path.name)
+            metadata = metadata or self.metadata_extractor.extract_from_filename(file_path.name)
             job_id = str(uuid.uuid4())
             
-            # Prepare remote paths
-            remote_filename = f"{metadata['document_id']}_{file_path.name}"
-            remote_file_path = self.work_dir / remote_filename
-            
-            # Transfer document file
-            sftp = self.ssh_client.open_sftp()
-            try:
-                # Ensure directory exists
-                sftp.stat(str(self.work_dir))
-            except FileNotFoundError:
-                sftp.mkdir(str(self.work_dir))
-                
-            # Transfer files
-            sftp.put(str(file_path), str(remote_file_path))
+            if remote_file_path is None:
+                # Transfer document file
+                remote_file_path = self.remote_document_path(metadata, file_path.name)
+                await self.transport.ensure_dirs(self.work_dir)
+                await self.transport.put(str(file_path), str(remote_file_path))
             
             # Generate and transfer batch script
             batch_script = await self._generate_batch_script(
@@ -153,22 +300,25 @@ class PuhtiJobManager:
                 input_path=str(remote_file_path)
             )
             script_remote_path = self.work_dir / f"job_{job_id}.sh"
-            sftp.put(str(batch_script), str(script_remote_path))
+            await self.transport.put(str(batch_script), str(script_remote_path))
             
             # Submit batch job
-            stdin, stdout, stderr = self.ssh_client.exec_command(
+            stdout, stderr, _ = await self.transport.exec(
                 f"cd {self.work_dir} && sbatch {script_remote_path}"
             )
-            slurm_job_id = stdout.read().decode().strip().split()[-1]
+            slurm_job_id = stdout.split()[-1]
             
             # Store job information
             self.jobs[job_id] = {
+                "kind": "embedding",
                 "slurm_job_id": slurm_job_id,
                 "status": "PENDING",
                 "input_file": str(remote_file_path),
                 "metadata": metadata,
+                "sha256": sha256,
                 "submitted_at": datetime.utcnow().isoformat(),
             }
+            self.poller.track(slurm_job_id)
             
             return job_id, metadata
             
@@ -182,33 +332,34 @@ class PuhtiJobManager:
             job_info = self.jobs.get(job_id)
             if not job_info:
                 raise ValueError(f"No job found for ID {job_id}")
-                
-            await self.connect()
+            if job_info["status"] in ("COMPLETED", "FAILED") or job_info.get("local"):
+                # Local jobs are updated by the task that embeds them
+                return job_info
             
             # Check job status
-            stdin, stdout, stderr = self.ssh_client.exec_command(
-                f'squeue -j {job_info["slurm_job_id"]} -h'
-            )
-            job_status = stdout.read().decode().strip()
+            slurm_state = await self.get_slurm_state(job_info["slurm_job_id"])
             
-            if not job_status:  # Job completed
-                sftp = self.ssh_client.open_sftp()
-                document_id = job_info["metadata"]["document_id"]
-                
-                # Check for output files in work directory
-                embedding_path = self.work_dir / f"embeddings_{document_id}_{job_info['metadata']['person_name']} {job_info['metadata']['person_age']}v {document_id}.pt"
-                texts_path = self.work_dir / f"texts_{document_id}_{job_info['metadata']['person_name']} {job_info['metadata']['person_age']}v {document_id}.json"
+            if slurm_state in FAILED_STATES:
+                self.jobs[job_id].update({
+                    "status": "FAILED",
+                    "error": f"Slurm job ended with state {slurm_state}"
+                })
+            elif self.poller.is_terminal(slurm_state):  # Job completed
+                # The script writes its outputs next to the input, named after its stem
+                input_path = Path(job_info["input_file"])
+                embedding_path = input_path.parent / f"embeddings_{input_path.stem}.pt"
+                texts_path = input_path.parent / f"texts_{input_path.stem}.json"
                 
                 try:
                     # Download results
                     local_embedding_path = Path(f"/tmp/embeddings_{job_id}.pt")
                     local_texts_path = Path(f"/tmp/texts_{job_id}.json")
                     
-                    sftp.get(str(embedding_path), str(local_embedding_path))
-                    sftp.get(str(texts_path), str(local_texts_path))
+                    await self.transport.get(str(embedding_path), str(local_embedding_path))
+                    await self.transport.get(str(texts_path), str(local_texts_path))
                     
                     # Load results
-                    embeddings = torch.load(str(local_embedding_path))
+                    embeddings = await asyncio.to_thread(torch.load, str(local_embedding_path))
                     with open(local_texts_path) as f:
                         texts = json.load(f)["texts"]
                     
@@ -238,14 +389,194 @@ class PuhtiJobManager:
             raise
 
 
-    async def _generate_batch_script(self, job_name: str, input_path: str) -> Path:
+    async def submit_embedding_batch(self, file_paths: List[Path]) -> Tuple[str, List[Dict]]:
+        """Stage several documents and embed them in one Slurm job (or a small job array).
+
+        Each array task loads the model once and embeds its share of the
+        manifest; documents are written out one by one with a done marker,
+        so check_embedding_batch can hand them over as they finish.
+        """
+        try:
+            job_id = str(uuid.uuid4())
+            batch_dir = self.work_dir / f"batch_{job_id}"
+            await self.transport.ensure_dirs(batch_dir)
+            
+            documents = []
+            for file_path in file_paths:
+                metadata = self.metadata_extractor.extract_from_filename(file_path.name)
+                name = f"{metadata['document_id']}_{file_path.stem}"
+                remote_file_path = batch_dir / f"{name}{file_path.suffix}"
+                documents.append({
+                    "name": name,
+                    "input": str(remote_file_path),
+                    "local_path": file_path,
+                    "metadata": metadata
+                })
+            await self._stage_files([(d["local_path"], Path(d["input"]).name) for d in documents], batch_dir)
+            
+            manifest = {
+                "output_dir": str(batch_dir),
+                "documents": [{"name": d["name"], "input": d["input"]} for d in documents]
+            }
+            manifest_path = batch_dir / "manifest.json"
+            await self.transport.write_text(str(manifest_path), json.dumps(manifest, ensure_ascii=False))
+            
+            tasks, partition, time_limit = plan_embedding_batch(len(documents))
+            batch_script = await self._generate_batch_script(
+                job_name=f"embed_batch_{job_id[:8]}",
+                input_path=str(manifest_path),
+                manifest=True,
+                array_tasks=tasks,
+                partition=partition,
+                time_limit=slurm_time(time_limit)
+            )
+            script_remote_path = batch_dir / "job.sh"
+            await self.transport.put(str(batch_script), str(script_remote_path))
+            
+            stdout, stderr, _ = await self.transport.exec(
+                f"cd {batch_dir} && sbatch {script_remote_path}"
+            )
+            slurm_job_id = stdout.split()[-1]
+            
+            self.jobs[job_id] = {
+                "kind": "embedding_batch",
+                "slurm_job_id": slurm_job_id,
+                "status": "PENDING",
+                "batch": True,
+                "batch_dir": str(batch_dir),
+                "array_tasks": tasks,
+                "documents": {
+                    d["name"]: {"status": "PENDING", "metadata": d["metadata"]} for d in documents
+                },
+                "submitted_at": datetime.utcnow().isoformat(),
+            }
+            self.poller.track(slurm_job_id)
+            logger.info(
+                f"Submitted {len(documents)} documents as batch {job_id} "
+                f"({tasks} tasks on {partition}, {slurm_time(time_limit)} each)"
+            )
+            
+            return job_id, [d["metadata"] for d in documents]
+            
+        except Exception as e:
+            logger.error(f"Failed to submit embedding batch: {str(e)}")
+            raise
+
+    async def _stage_files(self, files: List[Tuple[Path, str]], remote_dir: Path):
+        """Copy (local path, remote name) pairs into remote_dir.
+
+        Several files travel as one tar archive that is unpacked on Puhti,
+        so staging costs one transfer and one command instead of a round
+        trip per file.
+        """
+        if len(files) == 1:
+            local_path, remote_name = files[0]
+            await self.transport.put(str(local_path), str(remote_dir / remote_name))
+            return
+        
+        spool_dir = Path(settings.UPLOAD_SPOOL_DIR)
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        archive_path = spool_dir / f"stage_{uuid.uuid4().hex}.tar"
+        
+        def build_archive():
+            with tarfile.open(archive_path, "w") as archive:
+                for local_path, remote_name in files:
+                    archive.add(str(local_path), arcname=remote_name)
+        
+        remote_archive = remote_dir / "staged.tar"
+        try:
+            await asyncio.to_thread(build_archive)
+            await self.transport.put(str(archive_path), str(remote_archive))
+            stdout, stderr, exit_status = await self.transport.exec(
+                f"tar -xf {shlex.quote(str(remote_archive))} -C {shlex.quote(str(remote_dir))} "
+                f"&& rm -f {shlex.quote(str(remote_archive))}"
+            )
+            if exit_status != 0:
+                raise Exception(f"Unpacking staged files failed: {stderr}")
+            logger.info(f"Staged {len(files)} files in {remote_dir}")
+        finally:
+            archive_path.unlink(missing_ok=True)
+
+    async def check_embedding_batch(self, job_id: str) -> Tuple[Dict, List[Dict]]:
+        """Collect documents of a batch that finished since the last check.
+
+        Returns the job info and a list of newly finished documents, each with
+        metadata, embeddings and texts. The batch is COMPLETED once every
+        document has been collected or has failed.
+        """
+        job_info = self.jobs.get(job_id)
+        if not job_info or not job_info.get("batch"):
+            raise ValueError(f"No batch job found for ID {job_id}")
+        if job_info["status"] in ("COMPLETED", "FAILED"):
+            return job_info, []
+        
+        slurm_state = await self.get_slurm_state(job_info["slurm_job_id"])
+        job_finished = self.poller.is_terminal(slurm_state)
+        batch_dir = Path(job_info["batch_dir"])
+        # Once the job is gone, the listing must be fresh to tell finished documents from lost ones
+        names = await self._list_remote_dir(batch_dir, max_age=0 if job_finished else None)
+        
+        ready = []
+        for name, document in job_info["documents"].items():
+            if document["status"] in ("COMPLETED", "FAILED"):
+                continue
+            if f"{name}.done" in names:
+                local_embedding_path = Path(f"/tmp/embeddings_{job_id}_{name}.pt")
+                local_texts_path = Path(f"/tmp/texts_{job_id}_{name}.json")
+                try:
+                    await self.transport.get(str(batch_dir / f"embeddings_{name}.pt"), str(local_embedding_path))
+                    await self.transport.get(str(batch_dir / f"texts_{name}.json"), str(local_texts_path))
+                    embeddings = await asyncio.to_thread(torch.load, str(local_embedding_path))
+                    with open(local_texts_path) as f:
+                        texts = json.load(f)["texts"]
+                    document["status"] = "COMPLETED"
+                    ready.append({
+                        "name": name,
+                        "metadata": document["metadata"],
+                        "embeddings": embeddings.numpy(),
+                        "texts": texts
+                    })
+                except Exception as e:
+                    logger.error(f"Error collecting {name} from batch {job_id}: {str(e)}")
+                    document.update({"status": "FAILED", "error": str(e)})
+                finally:
+                    local_embedding_path.unlink(missing_ok=True)
+                    local_texts_path.unlink(missing_ok=True)
+            elif f"{name}.failed" in names:
+                error = await self.transport.read_text(str(batch_dir / f"{name}.failed"))
+                document.update({"status": "FAILED", "error": json.loads(error).get("error")})
+            elif job_finished:
+                document.update({"status": "FAILED", "error": f"Slurm job ended with state {slurm_state}"})
+            else:
+                document["status"] = "RUNNING" if slurm_state == "RUNNING" else "PENDING"
+        
+        statuses = [document["status"] for document in job_info["documents"].values()]
+        if all(status in ("COMPLETED", "FAILED") for status in statuses):
+            job_info["status"] = "COMPLETED" if "COMPLETED" in statuses else "FAILED"
+        else:
+            job_info["status"] = "RUNNING" if slurm_state == "RUNNING" else "PENDING"
+        # Persist the per-document changes made above
+        job_info.save()
+        return job_info, ready
+
+    async def _generate_batch_script(
+        self,
+        job_name: str,
+        input_path: str,
+        manifest: bool = False,
+        array_tasks: int = 1,
+        partition: str = "gputest",
+        time_limit: str = "00:15:00"
+    ) -> Path:
         """Generate a batch script for embedding generation."""
+        array_line = f"#SBATCH --array=0-{array_tasks - 1}\n" if array_tasks > 1 else ""
+        input_flag = "--manifest" if manifest else "--input"
         script_content = f"""#!/bin/bash
 #SBATCH --job-name={job_name}
 #SBATCH --account=project_2011638
-#SBATCH --partition=gputest
-#SBATCH --time=00:15:00
-#SBATCH --ntasks=1
+#SBATCH --partition={partition}
+#SBATCH --time={time_limit}
+{array_line}#SBATCH --ntasks=1
 #SBATCH --cpus-per-task=1
 #SBATCH --mem=4G
 #SBATCH --gres=gpu:v100:1
@@ -258,42 +589,30 @@ export HF_HOME=/scratch/project_2011638/safdarih/huggingface_cache
 export TRANSFORMERS_CACHE=$HF_HOME
 
 # Run embedding script
-python {self.script_path} --input '{input_path}'
+python {self.script_path} {input_flag} '{input_path}'
 """
         script_path = Path(f"/tmp/{job_name}.sh")
         script_path.write_text(script_content)
         return script_path
 
     def cleanup(self):
-        """Clean up SSH connection."""
-        if self.ssh_client:
-            try:
-                self.ssh_client.close()
-                logger.info("SSH connection closed")
-            except Exception as e:
-                logger.error(f"Error closing SSH connection: {str(e)}")
+        """Release per-manager resources; the shared SSH pool is closed on app shutdown."""
+        logger.info("Job manager cleaned up")
 
     async def check_job_slots(self) -> bool:
         """Check if we have available job slots for GPU partition."""
         try:
-            await self.connect()
-            
-            if not self.ssh_client:
-                logger.error("Failed to establish SSH connection")
-                return False
-
             # First get current GPU jobs
-            stdin, stdout, stderr = self.ssh_client.exec_command(
+            stdout, _, _ = await self.transport.exec(
                 "squeue -u $USER -p gpu -h | wc -l"
             )
-            current_jobs = int(stdout.read().decode().strip() or "0")
+            current_jobs = int(stdout or "0")
             logger.info(f"Current GPU jobs: {current_jobs}")
 
             # Get GPU partition limits
-            stdin, stdout, stderr = self.ssh_client.exec_command(
+            output, _, _ = await self.transport.exec(
                 "sacctmgr show assoc where user=$USER partition=gpu format=account,partition,maxjobs,maxsubmit -n -P"
             )
-            output = stdout.read().decode().strip()
             
             # Look for lowest limit as that's what's enforced
             lowest_limit = None
@@ -334,10 +653,10 @@ python {self.script_path} --input '{input_path}'
         max_retries: int = 3
     ) -> str:
         """Submit LLM generation job to Puhti with retries and organized directories."""
+        if settings.LLM_WORKER_ENABLED:
+            return await self._submit_to_llm_worker(input_data, input_dir, output_dir)
+
         try:
-            # First ensure we have a connection
-            await self.connect()
-            
             # Check for available slots
             if not await self.check_job_slots():
                 raise Exception("No available job slots")
@@ -362,18 +681,14 @@ python {self.script_path} --input '{input_path}'
                     logger.info(f"Input file path: {input_path}")
                     
                     # Ensure directories exist
-                    sftp = self.ssh_client.open_sftp()
-                    for dir_path in [input_dir, output_dir]:
-                        try:
-                            sftp.stat(str(dir_path))
-                        except FileNotFoundError:
-                            logger.info(f"Creating directory: {dir_path}")
-                            sftp.mkdir(str(dir_path))
+                    await self.transport.ensure_dirs(input_dir, output_dir)
                     
                     # Write input data to organized location
                     logger.info(f"Writing input data to {input_path}")
-                    with sftp.open(str(input_path), 'w') as f:
-                        json.dump(input_data, f, ensure_ascii=False, indent=2)
+                    await self.transport.write_text(
+                        str(input_path),
+                        json.dumps(input_data, ensure_ascii=False, indent=2)
+                    )
                     
                     # Generate batch script with updated paths
                     batch_script = await self._generate_llm_batch_script(
@@ -391,20 +706,18 @@ python {self.script_path} --input '{input_path}'
                     logger.info("-" * 80)
                     
                     # Transfer batch script
-                    sftp.put(str(batch_script), str(script_path))
+                    await self.transport.put(str(batch_script), str(script_path))
                     
                     # Check current jobs before submission
-                    stdin, stdout, stderr = self.ssh_client.exec_command("squeue -u $USER -h | wc -l")
-                    job_count = int(stdout.read().decode().strip() or "0")
+                    stdout, _, _ = await self.transport.exec("squeue -u $USER -h | wc -l")
+                    job_count = int(stdout or "0")
                     logger.info(f"Current job count: {job_count}")
                     
                     # Submit job from input directory
                     submit_command = f"cd {input_dir} && sbatch {script_path}"
                     logger.info(f"Submitting job with command: {submit_command}")
                     
-                    stdin, stdout, stderr = self.ssh_client.exec_command(submit_command)
-                    stdout_content = stdout.read().decode().strip()
-                    stderr_content = stderr.read().decode().strip()
+                    stdout_content, stderr_content, _ = await self.transport.exec(submit_command)
                     
                     logger.info(f"sbatch stdout: {stdout_content}")
                     
@@ -430,12 +743,14 @@ python {self.script_path} --input '{input_path}'
 
                     # Store job info with organized paths
                     self.jobs[job_id] = {
+                        "kind": "llm",
                         "slurm_job_id": slurm_job_id,
                         "status": "PENDING",
                         "input_file": str(input_path),
                         "output_dir": str(output_dir),
                         "submitted_at": datetime.utcnow().isoformat(),
                     }
+                    self.poller.track(slurm_job_id)
 
                     logger.info(f"Successfully submitted LLM job {job_id} (Slurm ID: {slurm_job_id})")
                     return job_id
@@ -459,24 +774,98 @@ python {self.script_path} --input '{input_path}'
             logger.error(f"Error in submit_llm_job: {str(e)}")
             raise
 
+    async def _submit_to_llm_worker(self, input_data: Dict, input_dir: Path, output_dir: Path) -> str:
+        """Queue a query for the persistent LLM worker, starting a worker only if none is alive."""
+        try:
+            job_id = str(uuid.uuid4())
+            input_path = input_dir / f"query_{job_id}.json"
+            await self.transport.ensure_dirs(input_dir, output_dir)
+
+            # Write under a name the worker ignores, then rename so it never claims a partial file
+            tmp_path = input_dir / f".query_{job_id}.json.tmp"
+            await self.transport.write_text(
+                str(tmp_path),
+                json.dumps(input_data, ensure_ascii=False, indent=2)
+            )
+            await self.transport.rename(str(tmp_path), str(input_path))
+
+            worker_job_id = await self._ensure_llm_worker(input_dir, output_dir)
+            self.jobs[job_id] = {
+                "kind": "llm",
+                "slurm_job_id": worker_job_id,
+                "status": "PENDING",
+                "worker": True,
+                "input_file": str(input_path),
+                "output_dir": str(output_dir),
+                "submitted_at": datetime.utcnow().isoformat(),
+            }
+            logger.info(f"Queued LLM query {job_id} for worker (Slurm ID: {worker_job_id})")
+            return job_id
+
+        except Exception as e:
+            logger.error(f"Error queueing query for LLM worker: {str(e)}")
+            raise
+
+    async def _ensure_llm_worker(self, input_dir: Path, output_dir: Path) -> str:
+        """Return the Slurm ID of a live LLM worker, submitting a new one only when none is alive.
+
+        The lookup and submission hold a lock shared by all uvicorn workers,
+        so two processes never both find no worker and start one each.
+        """
+        async with self._llm_worker_lock, self.coordinator.exclusive("llm_worker"):
+            if self._llm_worker_id:
+                state = await self.get_slurm_state(self._llm_worker_id)
+                if not self.poller.is_terminal(state):
+                    return self._llm_worker_id
+
+            # A worker may outlive a backend restart, so look it up by job name
+            stdout, _, _ = await self.transport.exec(
+                f'squeue -u $USER -h -n {settings.LLM_WORKER_JOB_NAME} -o "%i|%T"'
+            )
+            for line in stdout.splitlines():
+                worker_job_id, _, state = line.strip().partition("|")
+                if worker_job_id:
+                    self._llm_worker_id = worker_job_id
+                    self.poller.track(worker_job_id, state or "PENDING")
+                    logger.info(f"Found running LLM worker (Slurm ID: {worker_job_id})")
+                    return worker_job_id
+
+            batch_script = await self._generate_llm_worker_batch_script(
+                input_dir=str(input_dir),
+                output_dir=str(output_dir)
+            )
+            script_path = input_dir / "job_llm_worker.sh"
+            await self.transport.put(str(batch_script), str(script_path))
+
+            stdout, stderr, _ = await self.transport.exec(f"cd {input_dir} && sbatch {script_path}")
+            if not stdout:
+                raise Exception(f"sbatch error: {stderr}")
+            worker_job_id = stdout.split()[-1]
+            if not worker_job_id.isdigit():
+                raise Exception(f"Failed to parse job ID from output: {stdout}")
+
+            self._llm_worker_id = worker_job_id
+            self.poller.track(worker_job_id)
+            logger.info(f"Submitted LLM worker (Slurm ID: {worker_job_id})")
+            return worker_job_id
+
     async def check_llm_job(self, job_id: str) -> Dict:
         """Check status of LLM job."""
         try:
             job_info = self.jobs.get(job_id)
             if not job_info:
                 raise ValueError(f"No job found for ID {job_id}")
-                
-            await self.connect()
+            if job_info["status"] == "COMPLETED":
+                return {
+                    "status": "COMPLETED",
+                    "response": job_info["response"],
+                    "message": "Job completed successfully"
+                }
             
             # Check job status
-            stdin, stdout, stderr = self.ssh_client.exec_command(
-                f'squeue -j {job_info["slurm_job_id"]} -h'
-            )
-            job_status = stdout.read().decode().strip()
+            slurm_state = await self.get_job_state(job_id)
             
-            if not job_status:  # Job completed
-                sftp = self.ssh_client.open_sftp()
-                
+            if self.poller.is_terminal(slurm_state):  # Job completed
                 # Try different possible filename patterns
                 possible_filenames = [
                     f"response_query_{job_id}.json",  # New pattern
@@ -492,16 +881,10 @@ python {self.script_path} --input '{input_path}'
                         response_path = Path(job_info.get('output_dir', self.work_dir)) / filename
                         logger.info(f"Checking for response file: {response_path}")
                         
-                        # Download results
-                        local_response_path = Path(f"/tmp/response_{job_id}.json")
-                        sftp.get(str(response_path), str(local_response_path))
-                        
-                        # Load results
-                        with open(local_response_path) as f:
-                            response_data = json.load(f)
-                        
-                        # Clean up
-                        local_response_path.unlink()
+                        # Read results straight from the pooled SFTP session
+                        response_data = json.loads(
+                            await self.transport.read_text(str(response_path))
+                        )
                         used_filepath = response_path
                         break
                         
@@ -523,13 +906,10 @@ python {self.script_path} --input '{input_path}'
                 
                 try:
                     # Clean up remote files if successfully processed
-                    sftp.remove(str(used_filepath))
+                    await self.transport.remove(str(used_filepath))
                     input_file = job_info.get("input_file")
                     if input_file:
-                        try:
-                            sftp.remove(input_file)
-                        except FileNotFoundError:
-                            pass
+                        await self.transport.remove(input_file)
                 except Exception as e:
                     logger.warning(f"Error cleaning up remote files: {str(e)}")
                 
@@ -592,12 +972,40 @@ python {self.script_path} --input '{input_path}'
         return script_path
     
 
+    async def _generate_llm_worker_batch_script(self, input_dir: str, output_dir: str) -> Path:
+        """Generate batch script for a persistent LLM worker that loads the model once."""
+        script_content = f"""#!/bin/bash
+#SBATCH --job-name={settings.LLM_WORKER_JOB_NAME}
+#SBATCH --account=project_2011638
+#SBATCH --partition=gpu
+#SBATCH --time={settings.LLM_WORKER_TIME_LIMIT}
+#SBATCH --ntasks=1
+#SBATCH --cpus-per-task=4
+#SBATCH --mem=16G
+#SBATCH --gres=gpu:v100:1
+#SBATCH --signal=B:USR1@300
+
+# Activate environment
+export PATH="/scratch/project_2011638/ml_env/bin:$PATH"
+
+# Set cache directory for HuggingFace
+export HF_HOME=/scratch/project_2011638/safdarih/huggingface_cache
+export TRANSFORMERS_CACHE=$HF_HOME
+
+# exec so the worker itself receives USR1 before the time limit and drains
+exec python /scratch/project_2011638/llm_script.py --worker \\
+    --queue-dir '{input_dir}' \\
+    --output-dir '{output_dir}' \\
+    --idle-timeout {settings.LLM_WORKER_IDLE_TIMEOUT}
+"""
+        script_path = Path("/tmp/llm_worker.sh")
+        script_path.write_text(script_content)
+        return script_path
+
     ## test job submission
     async def test_llm_job_with_context(self):
         """Test LLM job submission with hardcoded Annikki context."""
         try:
-            await self.connect()
-            
             # Create test input data
             test_input = {
                 "query": "Kuinka vanha on Annikki?",
@@ -622,10 +1030,11 @@ python {self.script_path} --input '{input_path}'
             test_id = str(uuid.uuid4())
             
             # Create input file
-            sftp = self.ssh_client.open_sftp()
             input_path = self.work_dir / f"test_input_{test_id}.json"
-            with sftp.open(str(input_path), 'w') as f:
-                json.dump(test_input, f, ensure_ascii=False, indent=2)
+            await self.transport.write_text(
+                str(input_path),
+                json.dumps(test_input, ensure_ascii=False, indent=2)
+            )
             
             # Create batch script
             batch_script = f"""#!/bin/bash
@@ -660,15 +1069,11 @@ python {self.script_path} --input '{input_path}'
     """
             # Write batch script
             batch_script_path = self.work_dir / f"test_job_{test_id}.sh"
-            with sftp.open(str(batch_script_path), 'w') as f:
-                f.write(batch_script)
+            await self.transport.write_text(str(batch_script_path), batch_script)
                 
             # Submit job
             submit_command = f"cd {self.work_dir} && sbatch {batch_script_path}"
-            stdin, stdout, stderr = self.ssh_client.exec_command(submit_command)
-            
-            stdout_content = stdout.read().decode().strip()
-            stderr_content = stderr.read().decode().strip()
+            stdout_content, stderr_content, _ = await self.transport.exec(submit_command)
             
             logger.info(f"Test job submission stdout: {stdout_content}")
             if stderr_content:
@@ -682,17 +1087,16 @@ python {self.script_path} --input '{input_path}'
                     # Wait for job completion
                     while True:
                         await asyncio.sleep(5)
-                        stdin, stdout, stderr = self.ssh_client.exec_command(
+                        queue_status, _, _ = await self.transport.exec(
                             f'squeue -j {slurm_job_id} -h'
                         )
-                        if not stdout.read().decode().strip():
+                        if not queue_status:
                             break
                     
                     # Check output
                     response_path = self.work_dir / f"response_test_input_{test_id}.json"
                     try:
-                        with sftp.open(str(response_path), 'r') as f:
-                            response = json.load(f)
+                        response = json.loads(await self.transport.read_text(str(response_path)))
                         logger.info(f"Test job response: {response}")
                         return True
                     except Exception as e:
@@ -705,4 +1109,15 @@ python {self.script_path} --input '{input_path}'
             
         except Exception as e:
             logger.error(f"Test job submission failed: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+
+_job_manager: Optional[PuhtiJobManager] = None
+
+
+def get_job_manager() -> PuhtiJobManager:
+    """Get the process-wide job manager; its jobs live in the shared job registry."""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = PuhtiJobManager()
+    return _job_manager
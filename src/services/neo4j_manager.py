@@ -6,6 +6,7 @@ from src.core.config import settings
 import logging
 import hashlib
 from typing import List, Optional
+from src.services.embedding_cache import get_embedding_cache
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +18,8 @@ class EnhancedEmbeddingManager:
         self.model_name = model_name
         self.cache_dir = cache_dir
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.embedding_cache = {}
         self._initialize_model()
+        self.embedding_cache = get_embedding_cache(self.model_name, self.embedding_dim)
 
     def _initialize_model(self):
         """Initialize model with proper error handling."""
@@ -57,17 +58,9 @@ class EnhancedEmbeddingManager:
                 batch_texts = texts[i:i + batch_size]
                 
                 # Check cache first
-                batch_embeddings = []
-                uncached_texts = []
-                uncached_indices = []
-                
-                for j, text in enumerate(batch_texts):
-                    cache_key = hash(text)
-                    if cache_key in self.embedding_cache:
-                        batch_embeddings.append(self.embedding_cache[cache_key])
-                    else:
-                        uncached_texts.append(text)
-                        uncached_indices.append(j)
+                batch_embeddings = self.embedding_cache.get_many(batch_texts)
+                uncached_indices = [j for j, embedding in enumerate(batch_embeddings) if embedding is None]
+                uncached_texts = [batch_texts[j] for j in uncached_indices]
                 
                 if uncached_texts:
                     # Generate new embeddings
@@ -92,12 +85,11 @@ class EnhancedEmbeddingManager:
                         embeddings_np = sentence_embeddings.cpu().numpy()
                         
                         # Cache new embeddings
-                        for text, embedding in zip(uncached_texts, embeddings_np):
-                            self.embedding_cache[hash(text)] = embedding
+                        self.embedding_cache.put_many(uncached_texts, embeddings_np)
                             
                         # Insert new embeddings into correct positions
                         for idx, embedding in zip(uncached_indices, embeddings_np):
-                            batch_embeddings.insert(idx, embedding)
+                            batch_embeddings[idx] = embedding
                 
                 all_embeddings.extend(batch_embeddings)
             
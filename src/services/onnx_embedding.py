@@ -0,0 +1,129 @@
+import inspect
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+import numpy as np
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FP32_FILENAME = "model.onnx"
+INT8_FILENAME = "model.int8.onnx"
+
+
+def export_onnx_model(model_path: Path, output_dir: Optional[Path] = None, quantize: bool = True) -> Path:
+    """Export the sbert encoder to ONNX and optionally apply dynamic int8 quantization.
+
+    Only the encoder is exported (last_hidden_state with dynamic batch and
+    sequence axes); pooling stays in NumPy so both engines share it.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    model_path = Path(model_path)
+    output_dir = Path(output_dir or model_path / "onnx")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = output_dir / FP32_FILENAME
+
+    tokenizer = AutoTokenizer.from_pretrained(str(model_path), local_files_only=True)
+    model = AutoModel.from_pretrained(str(model_path), local_files_only=True).eval()
+    input_names = [name for name in tokenizer.model_input_names if name in ("input_ids", "attention_mask", "token_type_ids")]
+    sample = tokenizer(["Esimerkkilause vientiä varten."], return_tensors="pt")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # The TorchScript exporter handles dynamic_axes for BERT-style encoders
+        export_kwargs["dynamo"] = False
+
+    class Encoder(torch.nn.Module):
+        # Pass inputs by name: positional order of forward() differs across transformers versions
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    with torch.no_grad():
+        torch.onnx.export(
+            Encoder().eval(),
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            do_constant_folding=True,
+            **export_kwargs
+        )
+    logger.info(f"Exported ONNX encoder to {fp32_path}")
+    if not quantize:
+        return fp32_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    int8_path = output_dir / INT8_FILENAME
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    logger.info(
+        f"Quantized ONNX encoder to int8: {int8_path} "
+        f"({fp32_path.stat().st_size / 2**20:.0f} MB -> {int8_path.stat().st_size / 2**20:.0f} MB)"
+    )
+    return int8_path
+
+
+def mean_pool(hidden_states: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average token states over real (unpadded) tokens."""
+    mask = attention_mask[..., None].astype(hidden_states.dtype)
+    return (hidden_states * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+
+class OnnxEmbeddingEngine:
+    """CPU sentence embeddings from an ONNX (by default int8-quantized) export of the sbert model.
+
+    The export is created on first use if it does not exist yet. ONNX Runtime
+    runs with full graph optimizations and a configurable intra-op thread count.
+    """
+
+    def __init__(self, model_path: Path, onnx_path: Optional[Path] = None, threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("EMBEDDING_ENGINE=onnx requires the onnxruntime package") from e
+        from transformers import AutoTokenizer
+
+        self.model_path = Path(model_path)
+        self.onnx_path = Path(onnx_path or settings.ONNX_MODEL_PATH or self.model_path / "onnx" / INT8_FILENAME)
+        if not self.onnx_path.exists():
+            logger.info(f"No ONNX export at {self.onnx_path}, exporting now")
+            exported = export_onnx_model(
+                self.model_path,
+                self.onnx_path.parent,
+                quantize=self.onnx_path.name != FP32_FILENAME
+            )
+            if exported != self.onnx_path:
+                os.replace(exported, self.onnx_path)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_path), local_files_only=True)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = threads if threads is not None else settings.EMBEDDING_THREADS
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(self.onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+        logger.info(f"Loaded ONNX embedding engine from {self.onnx_path}")
+
+    def embed(self, texts: Sequence[str], max_length: int = 512) -> np.ndarray:
+        """Return mean-pooled, unnormalized embeddings for the texts."""
+        inputs = self.tokenizer(
+            list(texts),
+            padding=True,
+            truncation=True,
+            max_length=max_length,
+            return_tensors="np"
+        )
+        feeds = {name: inputs[name].astype(np.int64) for name in self.input_names}
+        hidden_states = self.session.run(["last_hidden_state"], feeds)[0]
+        return mean_pool(hidden_states, inputs["attention_mask"])
@@ -0,0 +1,179 @@
+import logging
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Case endings that keep the strong grade of the stem (Annikki -> Annikkia, Annikkina)
+STRONG_GRADE_ENDINGS = ["a", "na"]
+# Case endings that close the final syllable and trigger consonant gradation
+# (Annikki -> Annikin, Annikille, Annikista)
+WEAK_GRADE_ENDINGS = ["n", "lle", "lla", "lta", "ssa", "sta", "ksi", "tta"]
+CLITICS = ["kin", "kaan"]
+
+# Qualitative gradation of the final consonant cluster, strong -> weak
+GRADATION = [
+    ("kk", "k"), ("pp", "p"), ("tt", "t"),
+    ("nk", "ng"), ("mp", "mm"), ("nt", "nn"), ("lt", "ll"), ("rt", "rr"),
+]
+
+VOWELS = set("aeiouyäöå")
+FRONT_VOWELS = set("äöy")
+BACK_TO_FRONT = str.maketrans("aou", "äöy")
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "-"
+
+
+def _harmonize(ending: str, front: bool) -> str:
+    return ending.translate(BACK_TO_FRONT) if front else ending
+
+
+def _weak_grade(word: str) -> str:
+    """Apply consonant gradation to the last syllable of a vowel-final word."""
+    body, vowel = word[:-1], word[-1]
+    for strong, weak in GRADATION:
+        if body.endswith(strong) and len(body) > len(strong):
+            return body[:-len(strong)] + weak + vowel
+    return word
+
+
+def inflected_forms(name: str) -> Set[str]:
+    """Generate the lowercased base and common Finnish case forms of a name.
+
+    Only the last word of a multi-word name is inflected
+    (Annikki Virtanen -> annikki virtasen is not handled, but
+    Annikki -> annikin, annikille, annikkina is).
+    """
+    base = " ".join(name.lower().split())
+    if not base:
+        return set()
+
+    prefix, _, word = base.rpartition(" ")
+    prefix = f"{prefix} " if prefix else ""
+    front = any(ch in FRONT_VOWELS for ch in word)
+
+    if word[-1] in VOWELS:
+        strong_stem, weak_stem = word, _weak_grade(word)
+        # Illative lengthens the final vowel (Eila -> Eilaan)
+        stems = {word + word[-1] + "n"}
+    else:
+        # Consonant-final names take a connecting -i- (Mikael -> Mikaelin)
+        strong_stem = weak_stem = word + "i"
+        stems = {word + "iin"}
+
+    stems.update(strong_stem + _harmonize(ending, front) for ending in STRONG_GRADE_ENDINGS)
+    stems.update(weak_stem + _harmonize(ending, front) for ending in WEAK_GRADE_ENDINGS)
+    stems.add(word)
+
+    forms = set(stems)
+    for stem in stems:
+        forms.update(stem + _harmonize(clitic, front) for clitic in CLITICS)
+    return {prefix + form for form in forms}
+
+
+class PersonNameIndex:
+    """Aho-Corasick automaton over person names and their inflected forms.
+
+    Matching is a single pass over the query text regardless of how many
+    people are in the graph, and needs no database round-trip.
+    """
+
+    def __init__(self):
+        self.names: Set[str] = set()
+        self.is_loaded = False
+        self._lock = threading.Lock()
+        # goto transitions, failure links and (name, form length) outputs per state
+        self._automaton: Tuple[List[Dict[str, int]], List[int], List[List[Tuple[str, int]]]] = (
+            [{}], [0], [[]]
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def load(self, names: Iterable[str]):
+        """Replace the indexed names and rebuild the automaton."""
+        with self._lock:
+            self.names = {name for name in names if name}
+            self._automaton = self._build(self.names)
+            self.is_loaded = True
+        logger.info(f"Built person name index with {len(self.names)} names")
+
+    def add(self, name: str):
+        """Add a newly ingested person without going back to the database."""
+        if not name or name in self.names:
+            return
+        with self._lock:
+            self.names = self.names | {name}
+            self._automaton = self._build(self.names)
+
+    @staticmethod
+    def _build(names: Set[str]):
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[Tuple[str, int]]] = [[]]
+        for name in sorted(names):
+            for form in inflected_forms(name):
+                state = 0
+                for ch in form:
+                    next_state = goto[state].get(ch)
+                    if next_state is None:
+                        next_state = len(goto)
+                        goto[state][ch] = next_state
+                        goto.append({})
+                        output.append([])
+                    state = next_state
+                output[state].append((name, len(form)))
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(ch, 0)
+                # Inherit matches that end at the same position via the failure link
+                output[child] = output[child] + output[fail[child]]
+        return goto, fail, output
+
+    def find(self, text: str) -> List[str]:
+        """Return the indexed names mentioned in the text, in order of first mention."""
+        goto, fail, output = self._automaton
+        text = text.lower()
+        mentioned: List[str] = []
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+
+            # Whole words only: "Eila" must not match inside "Eilan" or "Veila"
+            if end + 1 < len(text) and _is_word_char(text[end + 1]):
+                continue
+            for name, length in output[state]:
+                start = end - length + 1
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if name not in mentioned:
+                    mentioned.append(name)
+        return mentioned
+
+
+_person_index: Optional[PersonNameIndex] = None
+
+
+def get_person_index() -> PersonNameIndex:
+    """Get the process-wide person name index."""
+    global _person_index
+    if _person_index is None:
+        _person_index = PersonNameIndex()
+    return _person_index
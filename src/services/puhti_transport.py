@@ -0,0 +1,365 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional, Tuple, TypeVar
+import paramiko
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Commands that must not run twice if the channel drops after they reached Puhti
+NON_IDEMPOTENT_COMMAND = re.compile(r"\b(sbatch|scancel)\b")
+
+
+class PuhtiConnection:
+    """A single persistent SSH connection with a lazily opened, reusable SFTP session."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.ssh_client: Optional[paramiko.SSHClient] = None
+        self._sftp: Optional[paramiko.SFTPClient] = None
+        # Set when a worker thread may still be blocked on this connection
+        self.abandoned = False
+
+    @property
+    def is_alive(self) -> bool:
+        if not self.ssh_client:
+            return False
+        transport = self.ssh_client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def connect(self):
+        """Open the SSH connection, retrying with exponential backoff and jitter."""
+        self.close()
+        attempts = settings.PUHTI_SSH_CONNECT_RETRIES
+        for attempt in range(attempts):
+            try:
+                client = paramiko.SSHClient()
+                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                client.connect(
+                    settings.PUHTI_HOST,
+                    username=settings.PUHTI_USERNAME,
+                    key_filename=settings.SSH_KEY_PATH,
+                    timeout=settings.PUHTI_SSH_CONNECT_TIMEOUT,
+                    banner_timeout=settings.PUHTI_SSH_CONNECT_TIMEOUT,
+                    auth_timeout=settings.PUHTI_SSH_CONNECT_TIMEOUT,
+                )
+                client.get_transport().set_keepalive(settings.PUHTI_SSH_KEEPALIVE)
+                self.ssh_client = client
+                logger.info(f"Connected to Puhti successfully (pool slot {self.index})")
+                return
+            except Exception as e:
+                if attempt == attempts - 1:
+                    logger.error(f"Failed to connect to Puhti: {str(e)}")
+                    raise
+                delay = min(30.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(
+                    f"Puhti connection attempt {attempt + 1}/{attempts} failed: {str(e)}, "
+                    f"retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+    def ensure_connected(self):
+        if not self.is_alive:
+            self.connect()
+
+    @property
+    def sftp(self) -> paramiko.SFTPClient:
+        """Get the SFTP session for this connection, reopening it if its channel died."""
+        self.ensure_connected()
+        if self._sftp is None or self._sftp.get_channel().closed:
+            self._sftp = self.ssh_client.open_sftp()
+            self._sftp.get_channel().settimeout(settings.PUHTI_SSH_OPERATION_TIMEOUT)
+        return self._sftp
+
+    def close(self):
+        if self._sftp is not None:
+            try:
+                self._sftp.close()
+            except Exception:
+                pass
+            self._sftp = None
+        if self.ssh_client is not None:
+            try:
+                self.ssh_client.close()
+            except Exception:
+                pass
+            self.ssh_client = None
+
+
+class PuhtiTransport:
+    """Bounded pool of persistent SSH/SFTP connections to Puhti.
+
+    All paramiko calls are blocking, so every operation runs on a dedicated
+    thread pool and never on the event loop. A connection whose operation
+    timed out is replaced rather than reused, and the thread pool is twice
+    the connection pool so threads still stuck on replaced connections do
+    not starve the new ones.
+    """
+
+    def __init__(self, pool_size: Optional[int] = None):
+        self.pool_size = pool_size or settings.PUHTI_SSH_POOL_SIZE
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.pool_size * 2,
+            thread_name_prefix="puhti-ssh"
+        )
+        self._connections = [PuhtiConnection(i) for i in range(self.pool_size)]
+        self._idle: Optional[asyncio.Queue] = None
+
+    def _get_idle_queue(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for connection in self._connections:
+                self._idle.put_nowait(connection)
+        return self._idle
+
+    @asynccontextmanager
+    async def connection(self):
+        """Check out a connection from the pool for the duration of the block."""
+        idle = self._get_idle_queue()
+        connection = await idle.get()
+        try:
+            yield connection
+        finally:
+            if connection.abandoned:
+                connection = self._replace(connection)
+            idle.put_nowait(connection)
+
+    def _replace(self, connection: PuhtiConnection) -> PuhtiConnection:
+        """Swap an abandoned connection for a fresh one in the same pool slot."""
+        # Closing the socket unblocks the worker thread stuck on it; the old
+        # object is never handed out again, so that thread cannot touch a live session
+        connection.close()
+        replacement = PuhtiConnection(connection.index)
+        self._connections[connection.index] = replacement
+        logger.warning(f"Replaced Puhti connection in pool slot {connection.index}")
+        return replacement
+
+    async def run(
+        self,
+        func: Callable[[PuhtiConnection], T],
+        timeout: Optional[float] = None,
+        retries: int = 1
+    ) -> T:
+        """Run a blocking function against a pooled connection in the thread pool.
+
+        Connection-level failures drop the connection and retry ``retries``
+        times on a fresh one; pass ``retries=0`` for operations that must not
+        run twice. Timeouts replace the connection so a hung channel is not reused.
+        """
+        timeout = timeout or settings.PUHTI_SSH_OPERATION_TIMEOUT
+        loop = asyncio.get_running_loop()
+        for attempt in range(retries + 1):
+            async with self.connection() as connection:
+                def call():
+                    connection.ensure_connected()
+                    return func(connection)
+                try:
+                    return await asyncio.wait_for(
+                        loop.run_in_executor(self._executor, call),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.error(f"Puhti operation timed out after {timeout}s")
+                    connection.abandoned = True
+                    raise
+                except (paramiko.SSHException, EOFError, OSError) as e:
+                    # Plain SFTP errors on a healthy connection are the caller's problem
+                    if isinstance(e, OSError) and connection.is_alive:
+                        raise
+                    connection.close()
+                    if attempt == retries:
+                        raise
+                    logger.warning(f"Puhti connection error, reconnecting: {str(e)}")
+                    await asyncio.sleep(random.uniform(0.1, 1.0))
+
+    async def connect(self):
+        """Warm up at least one connection so the first request does not pay for the handshake."""
+        await self.run(lambda connection: None)
+
+    async def exec(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None
+    ) -> Tuple[str, str, int]:
+        """Run a remote command and return (stdout, stderr, exit_status).
+
+        Commands are retried after a dropped connection only if idempotent;
+        by default everything except sbatch and scancel is, since a
+        submission may have reached Slurm before the channel died.
+        """
+        timeout = timeout or settings.PUHTI_SSH_OPERATION_TIMEOUT
+        if idempotent is None:
+            idempotent = NON_IDEMPOTENT_COMMAND.search(command) is None
+
+        def _exec(connection: PuhtiConnection):
+            stdin, stdout, stderr = connection.ssh_client.exec_command(command, timeout=timeout)
+            out = stdout.read().decode()
+            err = stderr.read().decode()
+            return out.strip(), err.strip(), stdout.channel.recv_exit_status()
+
+        return await self.run(_exec, timeout=timeout, retries=1 if idempotent else 0)
+
+    async def put(self, local_path: str, remote_path: str, timeout: Optional[float] = None):
+        """Upload a local file."""
+        await self.run(
+            lambda connection: connection.sftp.put(str(local_path), str(remote_path)),
+            timeout=timeout or settings.PUHTI_SSH_TRANSFER_TIMEOUT
+        )
+
+    async def put_stream(self, chunks: AsyncIterator[bytes], remote_path: str, timeout: Optional[float] = None) -> int:
+        """Write chunks to a remote file as they arrive and return the bytes written.
+
+        The data goes to ``<remote_path>.part`` over one pooled connection and
+        is renamed into place when the stream ends. A stream cannot be
+        replayed, so unlike run() there is no reconnect-and-retry; callers
+        keep their own copy to fall back on. ``timeout`` bounds each write.
+        """
+        timeout = timeout or settings.PUHTI_SSH_OPERATION_TIMEOUT
+        loop = asyncio.get_running_loop()
+        partial_path = f"{remote_path}.part"
+        written = 0
+
+        async with self.connection() as connection:
+            async def call(func):
+                return await asyncio.wait_for(loop.run_in_executor(self._executor, func), timeout=timeout)
+
+            def _open():
+                connection.ensure_connected()
+                remote_file = connection.sftp.open(partial_path, "wb")
+                # Do not wait for a server ack after every write
+                remote_file.set_pipelined(True)
+                return remote_file
+
+            remote_file = await call(_open)
+            try:
+                async for chunk in chunks:
+                    await call(lambda: remote_file.write(chunk))
+                    written += len(chunk)
+                await call(remote_file.close)
+                await call(lambda: connection.sftp.posix_rename(partial_path, str(remote_path)))
+                return written
+            except BaseException:
+                # A worker thread may still be stuck on a hung channel
+                connection.abandoned = True
+                raise
+
+    async def get(self, remote_path: str, local_path: str, timeout: Optional[float] = None):
+        """Download a remote file; the local path only appears once the download is complete."""
+        partial_path = f"{local_path}.part"
+
+        def _get(connection: PuhtiConnection):
+            try:
+                connection.sftp.get(str(remote_path), partial_path)
+                os.replace(partial_path, str(local_path))
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+        await self.run(_get, timeout=timeout or settings.PUHTI_SSH_TRANSFER_TIMEOUT)
+
+    async def read_text(self, remote_path: str, timeout: Optional[float] = None) -> str:
+        """Read a remote text file without a local round-trip through /tmp."""
+        def _read(connection: PuhtiConnection):
+            with connection.sftp.open(str(remote_path), "r") as f:
+                return f.read().decode("utf-8")
+
+        return await self.run(_read, timeout=timeout)
+
+    async def read_from(self, remote_path: str, offset: int = 0, timeout: Optional[float] = None) -> bytes:
+        """Read a remote file from a byte offset, for tailing files that are still being appended to."""
+        def _read(connection: PuhtiConnection):
+            with connection.sftp.open(str(remote_path), "r") as f:
+                f.seek(offset)
+                return f.read()
+
+        return await self.run(_read, timeout=timeout)
+
+    async def write_text(self, remote_path: str, content: str, timeout: Optional[float] = None):
+        """Write a remote text file."""
+        def _write(connection: PuhtiConnection):
+            with connection.sftp.open(str(remote_path), "w") as f:
+                f.write(content.encode("utf-8"))
+
+        await self.run(_write, timeout=timeout)
+
+    async def listdir(self, remote_dir: str, timeout: Optional[float] = None) -> List[str]:
+        """List file names in a remote directory."""
+        return await self.run(lambda connection: connection.sftp.listdir(str(remote_dir)), timeout=timeout)
+
+    async def exists(self, remote_path: str) -> bool:
+        def _stat(connection: PuhtiConnection):
+            try:
+                connection.sftp.stat(str(remote_path))
+                return True
+            except FileNotFoundError:
+                return False
+
+        return await self.run(_stat)
+
+    async def ensure_dirs(self, *remote_dirs):
+        """Create remote directories (and their parents) if they do not exist."""
+        def _ensure(connection: PuhtiConnection):
+            sftp = connection.sftp
+            for remote_dir in remote_dirs:
+                path = ""
+                for part in str(remote_dir).strip("/").split("/"):
+                    path = f"{path}/{part}"
+                    try:
+                        sftp.stat(path)
+                    except FileNotFoundError:
+                        logger.info(f"Creating directory: {path}")
+                        sftp.mkdir(path)
+
+        await self.run(_ensure)
+
+    async def rename(self, remote_path: str, new_path: str):
+        """Atomically rename a remote file, replacing any existing target."""
+        await self.run(lambda connection: connection.sftp.posix_rename(str(remote_path), str(new_path)))
+
+    async def remove(self, remote_path: str, missing_ok: bool = True):
+        def _remove(connection: PuhtiConnection):
+            try:
+                connection.sftp.remove(str(remote_path))
+            except FileNotFoundError:
+                if not missing_ok:
+                    raise
+
+        await self.run(_remove)
+
+    def close(self):
+        """Close all pooled connections."""
+        for connection in self._connections:
+            connection.close()
+        self._executor.shutdown(wait=False)
+        logger.info("Puhti connection pool closed")
+
+
+_transport: Optional[PuhtiTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_puhti_transport() -> PuhtiTransport:
+    """Get the process-wide Puhti transport shared by all services and routes."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = PuhtiTransport()
+        return _transport
+
+
+def close_puhti_transport():
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+            _transport = None
@@ -1,57 +1,64 @@
-from typing import Dict, List, Optional
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import codecs
 import logging
 from pathlib import Path
 import json
+import uuid
 import aiofiles
-from .job_manager import PuhtiJobManager
+from .job_manager import PuhtiJobManager, get_job_manager
+from .puhti_transport import PuhtiTransport, get_puhti_transport
+from .semantic_cache import SemanticAnswerCache, get_semantic_cache
+from .bm25_index import get_bm25_index, reciprocal_rank_fusion
+from src.core.config import settings
+from ..db.job_registry import JobRegistry, get_job_registry
 from ..db.milvus import MilvusClient
 from ..db.neo4j import Neo4jClient
 from .embedding_service import EmbeddingService
-from src.models.query import CompletedQueryResponse, PersonContext, QueryResponse, QuerySource, InitialQueryResponse
+from src.models.query import CompletedQueryResponse, PersonContext, QueryResponse, QuerySource, InitialQueryResponse, SearchFilters
 
 logger = logging.getLogger(__name__)
 
+StageCallback = Callable[[str, Dict], Awaitable[None]]
+
 class QueryService:
-    def __init__(self):
-        self.embedding_service = EmbeddingService()
-        self.puhti_job_manager = PuhtiJobManager()
+    def __init__(
+        self,
+        embedding_service: Optional[EmbeddingService] = None,
+        transport: Optional[PuhtiTransport] = None,
+        job_manager: Optional[PuhtiJobManager] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        local_results_path: Optional[Path] = None,
+        registry: Optional[JobRegistry] = None
+    ):
+        # Every dependency can be injected, e.g. with in-process fakes for benchmarks
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.transport = transport or get_puhti_transport()
+        self.puhti_job_manager = job_manager or get_job_manager()
         self.query_path = Path("/scratch/project_2011638/rag_queries")
-        self.local_results_path = Path("./results")
+        self.local_results_path = Path(local_results_path or "./results")
         self.local_results_path.mkdir(exist_ok=True)
-        self.jobs = {}
-        self._init_ssh()
-    async def _init_ssh(self):
-        """Initialize SSH connection to Puhti."""
-        if not hasattr(self.puhti_job_manager, 'ssh_client') or \
-           self.puhti_job_manager.ssh_client is None:
-            await self.puhti_job_manager.connect()
+        # Query state is in the shared job registry so any worker can answer status polls
+        self.jobs = (registry or get_job_registry()).namespace("query")
+        self.answer_cache = answer_cache if answer_cache is not None else get_semantic_cache()
+        self._query_dirs_ready = False
+
     async def _ensure_query_dirs(self):
         """Ensure query directories exist on both Puhti and locally."""
+        if self._query_dirs_ready:
+            return
         try:
-            # Create Puhti directories through SSH
-            await self.puhti_job_manager.connect()
-            sftp = self.puhti_job_manager.ssh_client.open_sftp()
-            
-            # Create base directory first
-            try:
-                sftp.stat(str(self.query_path))
-            except FileNotFoundError:
-                logger.info(f"Creating base directory: {self.query_path}")
-                sftp.mkdir(str(self.query_path))
-            
-            # Create subdirectories
-            for subdir in ['inputs', 'outputs']:
-                dir_path = self.query_path / subdir
-                try:
-                    sftp.stat(str(dir_path))
-                except FileNotFoundError:
-                    logger.info(f"Creating subdirectory: {dir_path}")
-                    sftp.mkdir(str(dir_path))
+            # Create Puhti directories through the shared SSH pool
+            await self.transport.ensure_dirs(
+                self.query_path / "inputs",
+                self.query_path / "outputs"
+            )
             
             # Create local results directory
             self.local_results_path.mkdir(parents=True, exist_ok=True)
             (self.local_results_path / "cache").mkdir(exist_ok=True)
             
+            self._query_dirs_ready = True
             logger.info("All required directories created successfully")
             
         except Exception as e:
@@ -61,13 +68,12 @@ class QueryService:
     async def _retrieve_answer(self, job_id: str) -> Optional[CompletedQueryResponse]:
         """Retrieve and parse answer from Puhti."""
         try:
-            sftp = self.puhti_job_manager.ssh_client.open_sftp()
             remote_path = self.query_path / "outputs" / f"response_{job_id}.json"
-            local_cache_path = self.local_results_path / "cache" / f"{job_id}.json"
+            local_cache_path = self.local_results_path / "cache" / f"{job_id}.{uuid.uuid4().hex}.json"
 
             try:
                 # Download result
-                sftp.get(str(remote_path), str(local_cache_path))
+                await self.transport.get(str(remote_path), str(local_cache_path))
                 
                 # Parse result
                 async with aiofiles.open(local_cache_path, 'r') as f:
@@ -103,18 +109,17 @@ class QueryService:
                 )
                 
                 # Clean up remote files
-                sftp.remove(str(remote_path))
+                await self.transport.remove(str(remote_path))
                 input_path = self.query_path / "inputs" / f"query_{job_id}.json"
-                try:
-                    sftp.remove(str(input_path))
-                except FileNotFoundError:
-                    pass
+                await self.transport.remove(str(input_path))
                 
                 return result
                 
             except FileNotFoundError:
                 logger.warning(f"Results not yet available for job {job_id}")
                 return None
+            finally:
+                local_cache_path.unlink(missing_ok=True)
                 
         except Exception as e:
             logger.error(f"Error retrieving answer: {str(e)}")
@@ -125,12 +130,27 @@ class QueryService:
         query: str,
         milvus_client: MilvusClient,
         neo4j_client: Neo4jClient,
-        max_tokens: int = 300
+        max_tokens: int = 300,
+        on_stage: Optional[StageCallback] = None,
+        filters: Optional[SearchFilters] = None
     ) -> QueryResponse:
-        """Process a query through the RAG pipeline."""
+        """Process a query through the RAG pipeline.
+
+        ``on_stage`` is awaited with a stage name and details as each step
+        finishes, so callers can stream progress to the client. ``filters``
+        restrict retrieval; without person filters, retrieval is scoped to
+        the persons the query mentions.
+        """
         milvus_results = []
         person_contexts = []
         mentioned_persons = []
+
+        async def emit(stage: str, **details):
+            if on_stage:
+                try:
+                    await on_stage(stage, details)
+                except Exception as e:
+                    logger.warning(f"Stage callback failed for {stage}: {str(e)}")
         
         try:
             # Ensure query directories exist
@@ -141,6 +161,7 @@ class QueryService:
             try:
                 query_embedding = await self.embedding_service.generate_embedding(query)
                 logger.info("Generated query embedding")
+                await emit("embedding_done")
             except Exception as e:
                 logger.error(f"Embedding generation failed: {str(e)}")
                 return InitialQueryResponse(
@@ -149,13 +170,46 @@ class QueryService:
                     error=str(e)
                 )
             
-            # 2. Search Milvus
+            # 1b. Serve semantically equivalent questions from the answer cache;
+            # explicitly filtered queries may differ in scope, so they bypass it
+            if filters is not None and filters.is_empty():
+                filters = None
+            if settings.SEMANTIC_CACHE_ENABLED and filters is None:
+                cached = self.answer_cache.lookup(query_embedding, max_tokens=max_tokens)
+                if cached:
+                    job_id = str(uuid.uuid4())
+                    self.jobs[job_id] = {
+                        "kind": "query",
+                        "status": "COMPLETED",
+                        "cached": True,
+                        "result": cached.model_dump()
+                    }
+                    return InitialQueryResponse(
+                        status="completed",
+                        message="Answer served from cache",
+                        job_id=job_id,
+                        data={
+                            "milvus_hits": len(cached.sources),
+                            "person_contexts": len(cached.person_contexts),
+                            "mentioned_persons": [ctx.name for ctx in cached.person_contexts],
+                            "context_length": 0,
+                            "cached": True
+                        }
+                    )
+            corpus_version = self.answer_cache.corpus_version
+            
+            # 2. Resolve mentioned persons from the in-memory name index so
+            # retrieval can be scoped to their interviews
+            mentioned_persons = await neo4j_client.find_mentioned_persons(query)
+            search_filters = self._scope_filters(filters, mentioned_persons)
+            
+            # 3. Search Milvus, fused with BM25 keyword search when enabled
             try:
-                milvus_results = await milvus_client.search(
-                    query_embedding=query_embedding,
-                    limit=5
-                )
-                logger.info(f"Found {len(milvus_results)} relevant passages in Milvus")
+                milvus_results = await self._retrieve(query, query_embedding, milvus_client, search_filters)
+                if not milvus_results and search_filters is not filters:
+                    # Mentioned persons without stored chunks: fall back to the requested scope
+                    milvus_results = await self._retrieve(query, query_embedding, milvus_client, filters)
+                await emit("retrieval_done", milvus_hits=len(milvus_results))
             except Exception as e:
                 logger.error(f"Milvus search failed: {str(e)}")
                 return InitialQueryResponse(
@@ -170,9 +224,8 @@ class QueryService:
                     }
                 )
             
-            # 3. Get Neo4j context
+            # 4. Get Neo4j context
             try:
-                mentioned_persons = await neo4j_client.find_mentioned_persons(query)
                 if mentioned_persons:
                     for person in mentioned_persons:
                         context = await neo4j_client.get_person_context(person)
@@ -183,7 +236,7 @@ class QueryService:
                 logger.warning(f"Neo4j context retrieval failed: {str(e)}")
                 # Continue without Neo4j context
                 
-            # 4. Prepare context for LLM
+            # 5. Prepare context for LLM
             try:
                 context = self._prepare_context(milvus_results, person_contexts)
                 logger.info(f"Prepared context with {len(context.split())} words")
@@ -201,7 +254,7 @@ class QueryService:
                     }
                 )
             
-            # 5. Submit LLM job to Puhti
+            # 6. Submit LLM job to Puhti
             try:
                 # Prepare input data with sources for later reference
                 input_data = {
@@ -251,6 +304,17 @@ class QueryService:
                     )
                 
                 logger.info(f"Submitted LLM job: {job_id}")
+                await emit("job_queued", job_id=job_id)
+                self.jobs[job_id] = {
+                    "kind": "query",
+                    "status": "PENDING",
+                    "embedding": query_embedding,
+                    "max_tokens": max_tokens,
+                    "chunk_ids": [result.get("id") for result in milvus_results],
+                    "document_ids": [result["document_id"] for result in milvus_results],
+                    "corpus_version": corpus_version,
+                    "cacheable": filters is None
+                }
                 
                 # Return initial response
                 return InitialQueryResponse(
@@ -293,6 +357,182 @@ class QueryService:
                 }
             )
 
+    async def stream_query(
+        self,
+        query: str,
+        milvus_client: MilvusClient,
+        neo4j_client: Neo4jClient,
+        max_tokens: int = 300,
+        filters: Optional[SearchFilters] = None
+    ) -> AsyncGenerator[Dict, None]:
+        """Run a query and yield stage events, generated tokens and the final result."""
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def on_stage(stage: str, details: Dict):
+            await events.put({"event": "stage", "stage": stage, **details})
+
+        task = asyncio.create_task(self.process_query(
+            query=query,
+            milvus_client=milvus_client,
+            neo4j_client=neo4j_client,
+            max_tokens=max_tokens,
+            on_stage=on_stage,
+            filters=filters
+        ))
+        try:
+            while not task.done() or not events.empty():
+                getter = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                else:
+                    getter.cancel()
+        finally:
+            if not task.done():
+                task.cancel()
+
+        response = task.result()
+        if response.status == "error":
+            yield {"event": "error", "message": response.message, "error": response.error}
+            return
+
+        async for event in self.stream_job(response.job_id):
+            yield event
+
+    async def stream_job(self, job_id: str) -> AsyncGenerator[Dict, None]:
+        """Follow a submitted query job, yielding state changes and tokens until it finishes.
+
+        Tokens come from the append-only stream file the LLM script writes next
+        to its response, tailed over the pooled SFTP sessions.
+        """
+        stream_path = self.query_path / "outputs" / f"stream_query_{job_id}.txt"
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        offset = 0
+        # process_query already announced the queued job
+        last_state = "PENDING"
+        job_manager = self.puhti_job_manager
+
+        async def read_tokens():
+            nonlocal offset
+            try:
+                data = await self.transport.read_from(str(stream_path), offset)
+            except FileNotFoundError:
+                return ""
+            offset += len(data)
+            return decoder.decode(data)
+
+        while True:
+            local_job = self.jobs.get(job_id, {})
+            job_info = job_manager.jobs.get(job_id)
+            if local_job.get("result") or not job_info:
+                break
+
+            state = await job_manager.get_job_state(job_id)
+            if state != last_state:
+                last_state = state
+                stage = "job_running" if state == "RUNNING" else "job_queued"
+                if not job_manager.poller.is_terminal(state):
+                    yield {"event": "stage", "stage": stage, "job_id": job_id, "slurm_state": state}
+
+            if state == "RUNNING" or job_manager.poller.is_terminal(state):
+                text = await read_tokens()
+                if text:
+                    yield {"event": "token", "text": text}
+            if job_manager.poller.is_terminal(state):
+                break
+            await asyncio.sleep(settings.STREAM_POLL_INTERVAL)
+
+        result = await self.check_query_status(job_id)
+        if result["status"] == "COMPLETED":
+            yield {"event": "completed", "job_id": job_id, "result": result["result"]}
+        else:
+            yield {
+                "event": "error",
+                "job_id": job_id,
+                "message": result.get("message", "Query processing failed"),
+                "error": result.get("error")
+            }
+
+    def _remember_answer(self, job_id: str, result: Dict):
+        """Keep a finished answer for status polls and add it to the semantic cache."""
+        local_job = self.jobs.get(job_id)
+        if not local_job:
+            return
+        local_job.update({"status": "COMPLETED", "result": result})
+        if not settings.SEMANTIC_CACHE_ENABLED or not local_job.get("cacheable"):
+            return
+        try:
+            self.answer_cache.store(
+                local_job["embedding"],
+                CompletedQueryResponse(**result),
+                max_tokens=local_job["max_tokens"],
+                chunk_ids=local_job["chunk_ids"],
+                document_ids=local_job["document_ids"],
+                corpus_version=local_job["corpus_version"]
+            )
+        except Exception as e:
+            logger.warning(f"Could not cache answer for job {job_id}: {str(e)}")
+
+    @staticmethod
+    def _scope_filters(filters: Optional[SearchFilters], mentioned_persons: List[str]) -> Optional[SearchFilters]:
+        """Restrict retrieval to mentioned persons unless the caller already chose persons."""
+        if not settings.PERSON_SCOPED_SEARCH or not mentioned_persons:
+            return filters
+        if filters is not None and filters.person_names is not None:
+            return filters
+        scoped = filters.model_copy() if filters is not None else SearchFilters()
+        scoped.person_names = list(mentioned_persons)
+        logger.info(f"Scoping retrieval to mentioned persons: {mentioned_persons}")
+        return scoped
+
+    async def _retrieve(
+        self,
+        query: str,
+        query_embedding,
+        milvus_client: MilvusClient,
+        filters: Optional[SearchFilters]
+    ) -> List[Dict]:
+        """Vector search, fused with BM25 keyword search when enabled."""
+        if settings.HYBRID_SEARCH_ENABLED:
+            vector_results, keyword_results = await asyncio.gather(
+                milvus_client.search(
+                    query_embedding=query_embedding,
+                    limit=settings.HYBRID_CANDIDATES,
+                    filters=filters
+                ),
+                self._keyword_search(query, milvus_client, settings.HYBRID_CANDIDATES, filters)
+            )
+            results = reciprocal_rank_fusion([vector_results, keyword_results], limit=5)
+            logger.info(
+                f"Fused {len(vector_results)} vector and {len(keyword_results)} "
+                f"keyword hits into {len(results)} passages"
+            )
+            return results
+        results = await milvus_client.search(
+            query_embedding=query_embedding,
+            limit=5,
+            filters=filters
+        )
+        logger.info(f"Found {len(results)} relevant passages in Milvus")
+        return results
+
+    async def _keyword_search(
+        self,
+        query: str,
+        milvus_client: MilvusClient,
+        limit: int,
+        filters: Optional[SearchFilters] = None
+    ) -> List[Dict]:
+        """BM25 search over chunk texts; failures only cost the keyword signal."""
+        try:
+            bm25_index = get_bm25_index()
+            if not bm25_index.is_loaded:
+                await asyncio.to_thread(bm25_index.ensure_loaded, milvus_client.collection)
+            return await asyncio.to_thread(bm25_index.search, query, limit, filters)
+        except Exception as e:
+            logger.warning(f"BM25 search failed: {str(e)}")
+            return []
+
     def _prepare_context(self, milvus_results: List[Dict], person_contexts: List[Dict]) -> str:
         """Prepare context for LLM."""
         try:
@@ -368,26 +608,46 @@ class QueryService:
     async def check_query_status(self, job_id: str) -> Dict:
         """Check status and retrieve results if complete."""
         try:
-            # Ensure SSH connection is open and active
-            await self._init_ssh()
-            if not self.puhti_job_manager.ssh_client:
-                raise Exception("Failed to establish SSH connection")
-            
-            sftp = self.puhti_job_manager.ssh_client.open_sftp()
+            local_job = self.jobs.get(job_id, {})
+            if local_job.get("result"):
+                return {
+                    "status": "COMPLETED",
+                    "result": local_job["result"],
+                    "message": "Query completed successfully"
+                }
+
             remote_path = self.query_path / "outputs" / f"response_query_{job_id}.json"
-            local_cache_path = self.local_results_path / "cache" / f"{job_id}.json"
+            # Finished answers are kept in the job registry; the download gets
+            # a private name so workers polling the same job never share a file
+            local_cache_path = self.local_results_path / "cache" / f"{job_id}.{uuid.uuid4().hex}.json"
+
+            # While the Slurm job is still queued or running, answer from the
+            # shared poller's status table instead of probing Puhti over SFTP
+            job_info = self.puhti_job_manager.jobs.get(job_id)
+            if job_info:
+                slurm_state = await self.puhti_job_manager.get_job_state(job_id)
+                if not self.puhti_job_manager.poller.is_terminal(slurm_state):
+                    return {
+                        "status": "RUNNING",
+                        "message": "Job is still processing",
+                        "slurm_state": slurm_state
+                    }
 
             try:
-                
-                
-                # Download result
-                sftp.get(str(remote_path), str(local_cache_path))
+                await self.transport.get(str(remote_path), str(local_cache_path))
                 
                 # Parse result
                 async with aiofiles.open(local_cache_path, 'r') as f:
                     content = await f.read()
                     data = json.loads(content)
                 
+                if data.get("status") == "failed":
+                    return {
+                        "status": "FAILED",
+                        "message": "Answer generation failed",
+                        "error": data.get("error")
+                    }
+                
                 # Convert to CompletedQueryResponse format
                 sources = [
                     QuerySource(
@@ -413,12 +673,14 @@ class QueryService:
                     "result": {
                         "query": data["query"],
                         "answer": data["response"],
-                        "sources": sources,
-                        "person_contexts": person_contexts,
+                        # Plain dicts, so the answer can be stored in the job registry
+                        "sources": [source.model_dump() for source in sources],
+                        "person_contexts": [ctx.model_dump() for ctx in person_contexts],
                         "confidence": data.get("confidence", 0.0)
                     },
                     "message": "Query completed successfully"
                 }
+                self._remember_answer(job_id, result["result"])
                 
                 # Clean up remote files if needed uncomment this
                 #sftp.remove(str(remote_path))
@@ -440,7 +702,7 @@ class QueryService:
                     "error": job_status.get("error")
                 }
             finally:
-                sftp.close()
+                local_cache_path.unlink(missing_ok=True)
                     
         except Exception as e:
             logger.error(f"Error retrieving answer: {str(e)}")
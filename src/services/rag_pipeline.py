@@ -1,6 +1,5 @@
 from typing import Dict, List, Any
-from src.db.milvus import MilvusClient
-from src.db.neo4j import Neo4jClient
+from src.db.pool import get_milvus_client, get_neo4j_client
 from src.services.embedding_manager import EmbeddingManager
 from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
 from src.core.config import settings
@@ -19,8 +18,8 @@ class RAGPipeline:
     def _initialize_components(self):
         try:
             # Initialize database clients
-            self.milvus_client = MilvusClient()
-            self.neo4j_client = Neo4jClient()
+            self.milvus_client = get_milvus_client()
+            self.neo4j_client = get_neo4j_client()
             self.embedding_manager = EmbeddingManager()
 
             # Initialize LLM components
@@ -0,0 +1,168 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from src.core.config import settings
+from src.models.query import CompletedQueryResponse
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """Cache of completed answers keyed by query embedding.
+
+    Embeddings live in one preallocated float32 matrix so a lookup is a single
+    matrix-vector product over all cached queries. Entries are evicted LRU
+    when full and expire after a TTL. Any change to the corpus bumps
+    ``corpus_version`` and drops entries that could now be stale.
+    """
+
+    def __init__(
+        self,
+        dim: int = None,
+        capacity: int = None,
+        threshold: float = None,
+        ttl: float = None
+    ):
+        self.dim = dim or settings.EMBEDDING_DIM
+        self.capacity = capacity or settings.SEMANTIC_CACHE_SIZE
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = ttl if ttl is not None else settings.SEMANTIC_CACHE_TTL
+        self.corpus_version = 0
+
+        self._embeddings = np.zeros((self.capacity, self.dim), dtype=np.float32)
+        self._valid = np.zeros(self.capacity, dtype=bool)
+        self._created_at = np.zeros(self.capacity, dtype=np.float64)
+        self._max_tokens = np.zeros(self.capacity, dtype=np.int64)
+        self._entries: List[Optional[Dict]] = [None] * self.capacity
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._free = list(range(self.capacity - 1, -1, -1))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, embedding, max_tokens: int) -> Optional[CompletedQueryResponse]:
+        """Return a cached answer for a semantically equivalent query, if any."""
+        if not self._lru:
+            self.misses += 1
+            return None
+
+        self._expire()
+        query = self._normalize(embedding)
+        similarities = self._embeddings @ query
+        candidates = self._valid & (self._max_tokens == max_tokens)
+        similarities = np.where(candidates, similarities, -np.inf)
+
+        row = int(np.argmax(similarities))
+        score = float(similarities[row])
+        if score < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._lru.move_to_end(row)
+        entry = self._entries[row]
+        logger.info(f"Semantic cache hit (similarity {score:.3f}) for query: {entry['query']}")
+        return entry["response"]
+
+    def store(
+        self,
+        embedding,
+        response: CompletedQueryResponse,
+        max_tokens: int,
+        chunk_ids: Iterable = (),
+        document_ids: Iterable[str] = (),
+        corpus_version: Optional[int] = None
+    ):
+        """Cache a completed answer unless the corpus changed since its retrieval ran."""
+        if corpus_version is not None and corpus_version != self.corpus_version:
+            logger.info("Not caching answer retrieved against an older corpus version")
+            return
+
+        if not self._free:
+            oldest, _ = self._lru.popitem(last=False)
+            self._release(oldest)
+            self.evictions += 1
+        row = self._free.pop()
+
+        self._embeddings[row] = self._normalize(embedding)
+        self._valid[row] = True
+        self._created_at[row] = time.time()
+        self._max_tokens[row] = max_tokens
+        self._entries[row] = {
+            "query": response.query,
+            "response": response,
+            "chunk_ids": list(chunk_ids),
+            "document_ids": set(document_ids),
+        }
+        self._lru[row] = None
+
+    def _release(self, row: int):
+        self._valid[row] = False
+        self._entries[row] = None
+        self._lru.pop(row, None)
+        self._free.append(row)
+
+    def _expire(self):
+        if self.ttl <= 0:
+            return
+        expired = np.flatnonzero(self._valid & (self._created_at < time.time() - self.ttl))
+        for row in expired:
+            self._release(int(row))
+        self.expirations += len(expired)
+
+    def invalidate(self):
+        """Drop every entry after the corpus grew, since any retrieval may now differ."""
+        for row in list(self._lru):
+            self._release(row)
+        self.corpus_version += 1
+        logger.info(f"Semantic cache invalidated (corpus version {self.corpus_version})")
+
+    def evict_documents(self, document_ids: Iterable[str]):
+        """Drop entries whose answers were grounded in any of the given documents.
+
+        Removing a document cannot change the top-k of queries that never
+        retrieved it, so only the affected entries are evicted.
+        """
+        document_ids = set(document_ids)
+        for row in list(self._lru):
+            if self._entries[row]["document_ids"] & document_ids:
+                self._release(row)
+        self.corpus_version += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "corpus_version": self.corpus_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+
+
+def get_semantic_cache() -> SemanticAnswerCache:
+    """Get the process-wide semantic answer cache."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache()
+    return _answer_cache
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Set
+from src.core.config import settings
+from src.core.workers import WorkerCoordinator, get_worker_coordinator
+from src.db.job_registry import JobRegistry, get_job_registry
+from src.services.puhti_transport import PuhtiTransport, get_puhti_transport
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = {
+    "COMPLETED", "FAILED", "CANCELLED", "TIMEOUT", "OUT_OF_MEMORY",
+    "NODE_FAIL", "PREEMPTED", "BOOT_FAIL", "DEADLINE",
+}
+FAILED_STATES = TERMINAL_STATES - {"COMPLETED"}
+
+
+def _array_rank(state: str) -> int:
+    """Precedence when merging array task states: running, queued, failed, completed."""
+    if state == "RUNNING":
+        return 3
+    if state not in TERMINAL_STATES:
+        return 2
+    return 1 if state in FAILED_STATES else 0
+
+
+class SlurmStatusPoller:
+    """Single background scheduler that tracks the Slurm state of all in-flight jobs.
+
+    Each tick issues one ``squeue`` for the whole user queue plus one ``sacct``
+    for jobs that have left it, so SSH round-trips scale with ticks rather
+    than with the number of jobs or clients asking about them.
+
+    With a job registry and worker coordinator, only the leader worker
+    talks to Slurm: it polls every job any worker has tracked and publishes
+    the states to the registry, and the other workers read them from there.
+    """
+
+    def __init__(
+        self,
+        transport: Optional[PuhtiTransport] = None,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        registry: Optional[JobRegistry] = None,
+        coordinator: Optional[WorkerCoordinator] = None
+    ):
+        self.transport = transport or get_puhti_transport()
+        self.registry = registry
+        self.coordinator = coordinator
+        self.min_interval = min_interval or settings.SLURM_POLL_MIN_INTERVAL
+        self.max_interval = max_interval or settings.SLURM_POLL_MAX_INTERVAL
+        self.statuses: Dict[str, str] = {}
+        self.last_tick: Optional[float] = None
+        self._active: Set[str] = set()
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._unchanged_ticks = 0
+
+    @property
+    def owns_polling(self) -> bool:
+        """Whether this process queries Slurm itself rather than reading the leader's states."""
+        return self.registry is None or self.coordinator is None or self.coordinator.is_leader
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _get_wakeup(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def start(self):
+        """Start the polling loop on the running event loop."""
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Slurm status poller started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Slurm status poller stopped")
+
+    def track(self, slurm_job_id: str, status: str = "PENDING"):
+        """Start tracking a Slurm job and poll soon."""
+        slurm_job_id = str(slurm_job_id)
+        self.statuses.setdefault(slurm_job_id, status)
+        if self.statuses[slurm_job_id] not in TERMINAL_STATES:
+            if self.registry is not None:
+                self.registry.track_slurm_jobs([slurm_job_id], status)
+            self._active.add(slurm_job_id)
+            self._unchanged_ticks = 0
+            self._get_wakeup().set()
+            self.start()
+
+    def get_status(self, slurm_job_id: str) -> Optional[str]:
+        return self.statuses.get(str(slurm_job_id))
+
+    @staticmethod
+    def is_terminal(status: Optional[str]) -> bool:
+        return status in TERMINAL_STATES
+
+    async def wait_for(self, slurm_job_id: str, timeout: Optional[float] = None) -> str:
+        """Wait until a tracked job reaches a terminal state and return that state."""
+        slurm_job_id = str(slurm_job_id)
+        status = self.get_status(slurm_job_id)
+        if self.is_terminal(status):
+            return status
+        if slurm_job_id not in self._active:
+            self.track(slurm_job_id)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(slurm_job_id, []).append(future)
+        return await asyncio.wait_for(future, timeout=timeout)
+
+    def _pending_jobs(self) -> Set[str]:
+        if self.registry is not None and self.owns_polling:
+            # The leader also polls for jobs tracked by the other workers
+            return self._active | self.registry.active_slurm_jobs()
+        return set(self._active)
+
+    async def refresh(self, slurm_job_ids: Optional[Iterable[str]] = None):
+        """Poll Slurm once for the given jobs (defaults to all active jobs)."""
+        job_ids = {str(job_id) for job_id in slurm_job_ids} if slurm_job_ids else self._pending_jobs()
+        if not job_ids:
+            return
+        changed = False
+        try:
+            if self.owns_polling:
+                queued = await self._squeue_states()
+                finished = job_ids - queued.keys()
+                accounted = await self._sacct_states(finished) if finished else {}
+                # Jobs gone from squeue without an sacct record yet are treated
+                # as finished; result files decide whether they succeeded.
+                states = {
+                    job_id: queued.get(job_id) or accounted.get(job_id) or "COMPLETED"
+                    for job_id in job_ids
+                }
+                if self.registry is not None:
+                    self.registry.publish_slurm_states(states, TERMINAL_STATES)
+            else:
+                # Jobs the leader has not polled yet keep their current state
+                states = self.registry.slurm_states(job_ids)
+
+            for job_id, status in states.items():
+                if self.statuses.get(job_id) != status:
+                    changed = True
+                    logger.info(f"Slurm job {job_id}: {self.statuses.get(job_id)} -> {status}")
+                self._set_status(job_id, status)
+        except Exception as e:
+            logger.error(f"Error polling Slurm status: {str(e)}")
+        finally:
+            self.last_tick = time.time()
+            self._unchanged_ticks = 0 if changed else self._unchanged_ticks + 1
+
+    async def _squeue_states(self) -> Dict[str, str]:
+        stdout, stderr, exit_status = await self.transport.exec('squeue -u $USER -h -o "%i|%T"')
+        if exit_status != 0:
+            raise Exception(f"squeue failed: {stderr}")
+        return self._parse_states(stdout)
+
+    async def _sacct_states(self, job_ids: Set[str]) -> Dict[str, str]:
+        stdout, stderr, exit_status = await self.transport.exec(
+            f"sacct -n -P -X -o JobID,State -j {','.join(sorted(job_ids))}"
+        )
+        if exit_status != 0:
+            logger.warning(f"sacct failed: {stderr}")
+            return {}
+        return self._parse_states(stdout)
+
+    @staticmethod
+    def _parse_states(output: str) -> Dict[str, str]:
+        states = {}
+        for line in output.splitlines():
+            parts = line.strip().split("|")
+            if len(parts) < 2 or not parts[0]:
+                continue
+            # "CANCELLED by 123" -> "CANCELLED"
+            state = parts[1].split()[0] if parts[1].strip() else "PENDING"
+            states[parts[0]] = state
+            if "_" in parts[0]:
+                # Array tasks ("123_4", "123_[5-7]") also roll up into the array job's ID
+                array_id = parts[0].split("_")[0]
+                current = states.get(array_id)
+                if current is None or _array_rank(state) > _array_rank(current):
+                    states[array_id] = state
+        return states
+
+    def _set_status(self, slurm_job_id: str, status: str):
+        self.statuses[slurm_job_id] = status
+        if status in TERMINAL_STATES:
+            self._active.discard(slurm_job_id)
+            for future in self._waiters.pop(slurm_job_id, []):
+                if not future.done():
+                    future.set_result(status)
+
+    def next_interval(self) -> float:
+        """Poll faster when many jobs are in flight or states are changing, slower when idle."""
+        base = max(self.min_interval, self.max_interval / (1 + len(self._active)))
+        return min(self.max_interval, base * (1.25 ** self._unchanged_ticks))
+
+    async def _run(self):
+        wakeup = self._get_wakeup()
+        while True:
+            try:
+                wakeup.clear()
+                if not self._pending_jobs():
+                    # A leader also wakes up to look for jobs tracked by other workers
+                    idle = self.min_interval if self.registry is not None else None
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), timeout=idle)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self.refresh()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=self.next_interval())
+                    # Let jobs submitted in the same burst share the next tick
+                    await asyncio.sleep(self.min_interval)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Slurm poller error: {str(e)}")
+                await asyncio.sleep(self.min_interval)
+
+
+_poller: Optional[SlurmStatusPoller] = None
+
+
+def get_slurm_poller() -> SlurmStatusPoller:
+    """Get the process-wide Slurm status poller."""
+    global _poller
+    if _poller is None:
+        _poller = SlurmStatusPoller(registry=get_job_registry(), coordinator=get_worker_coordinator())
+    return _poller
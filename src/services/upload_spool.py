@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import logging
+import shutil
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from src.core.config import settings
+from src.services.puhti_transport import PuhtiTransport
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(ValueError):
+    """The upload exceeded UPLOAD_MAX_BYTES."""
+
+
+class SpooledUpload:
+    """An upload written to its own spool directory, with its size and SHA-256."""
+
+    def __init__(self, path: Path, size: int, sha256: str):
+        self.path = path
+        self.filename = path.name
+        self.size = size
+        self.sha256 = sha256
+
+    def cleanup(self):
+        shutil.rmtree(self.path.parent, ignore_errors=True)
+
+
+async def iter_upload(file, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Read an UploadFile (or anything with an async read(n)) in fixed-size chunks."""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def spool_upload(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    transport: Optional[PuhtiTransport] = None,
+    remote_path: Optional[Path] = None,
+    max_bytes: Optional[int] = None
+) -> SpooledUpload:
+    """Stream an upload to a local spool file, hashing it on the fly.
+
+    The spool file keeps the original file name inside a directory unique
+    to this upload, so concurrent uploads of the same name never collide.
+    With a transport and remote path, every chunk is also forwarded to
+    Puhti while the upload is still arriving. If that transfer fails, the
+    complete spool file is uploaded again afterwards. Only a bounded number
+    of chunks is in memory at any time.
+    """
+    if max_bytes is None:
+        max_bytes = settings.UPLOAD_MAX_BYTES
+    spool_dir = Path(settings.UPLOAD_SPOOL_DIR) / uuid.uuid4().hex
+    spool_dir.mkdir(parents=True)
+    path = spool_dir / Path(filename).name
+    hasher = hashlib.sha256()
+    size = 0
+
+    sender = None
+    if transport is not None and remote_path is not None:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.UPLOAD_PIPELINE_DEPTH)
+
+        async def queued_chunks():
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+
+        async def send() -> Optional[Exception]:
+            try:
+                await transport.put_stream(queued_chunks(), str(remote_path))
+                return None
+            except Exception as e:
+                # Keep draining so the spooling side never blocks on a dead consumer
+                while await queue.get() is not None:
+                    pass
+                return e
+
+        sender = asyncio.create_task(send())
+
+    try:
+        with open(path, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                hasher.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+                if sender is not None:
+                    await queue.put(chunk)
+
+        if sender is not None:
+            await queue.put(None)
+            error = await sender
+            if error is not None:
+                logger.warning(f"Streaming {filename} to Puhti failed, re-sending spool file: {str(error)}")
+                await transport.put(str(path), str(remote_path))
+
+        logger.info(f"Spooled {filename}: {size} bytes, sha256 {hasher.hexdigest()[:12]}")
+        return SpooledUpload(path, size, hasher.hexdigest())
+
+    except BaseException:
+        if sender is not None:
+            sender.cancel()
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        raise
@@ -0,0 +1,31 @@
+import os
+import sys
+from pathlib import Path
+
+# Settings() validates on import; give the required values harmless defaults
+# so the pure-logic modules can be imported without a deployment .env
+REQUIRED_SETTINGS = {
+    "HOST": "0.0.0.0",
+    "PORT": "8000",
+    "MILVUS_HOST": "localhost",
+    "MILVUS_PORT": "19530",
+    "NEO4J_HOST": "localhost",
+    "NEO4J_PORT": "7687",
+    "NEO4J_AUTH": "neo4j/test",
+    "NEO4J_URI": "bolt://localhost:7687",
+    "CUDA_VISIBLE_DEVICES": "",
+    "MINIO_ACCESS_KEY": "test",
+    "MINIO_SECRET_KEY": "test",
+    "ETCD_ENDPOINTS": "localhost:2379",
+    "MINIO_ADDRESS": "localhost:9000",
+    "JINA_AI_API_KEY": "test",
+    "SECRET_KEY": "test",
+    "FASTAPI_PORT": "8000",
+    "STREAMLIT_PORT": "8501",
+    "BACKEND_URL": "http://localhost:8000",
+    "ENVIRONMENT": "test",
+}
+for name, value in REQUIRED_SETTINGS.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,74 @@
+import pytest
+from src.models.query import SearchFilters
+from src.services.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def chunk(chunk_id, text, index=0, person="Annikki", age=80):
+    return {"id": chunk_id, "text": text, "chunk_index": index, "person_name": person, "person_age": age}
+
+
+@pytest.fixture
+def index():
+    index = BM25Index(k1=1.2, b=0.75)
+    index.add_chunks("A", [
+        chunk(1, "Annikki muutti Ouluun vuonna 1952.", 0),
+        chunk(2, "Sota-aikana Annikille lähetettiin paketteja.", 1),
+    ])
+    index.add_chunks("B", [
+        chunk(3, "Eino kalasti järvellä joka kesä.", 0, person="Eino", age=90),
+        chunk(4, "Kesällä Eino kävi saunassa.", 1, person="Eino", age=90),
+    ])
+    return index
+
+
+def test_tokenize_drops_stopwords_and_stems_inflections():
+    assert tokenize("Annikille ja Annikin", stem_length=5) == ["annik", "annik"]
+    assert tokenize("vuonna 1952", stem_length=3) == ["vuo", "1952"]
+
+
+def test_search_ranks_matching_chunks(index):
+    results = index.search("Eino kalasti", limit=5)
+    assert [result["id"] for result in results] == [3, 4]
+    assert all(result["document_id"] == "B" for result in results)
+    assert results[0]["score"] >= results[-1]["score"] > 0
+
+
+def test_search_applies_filters(index):
+    assert index.search("Annikki Eino", filters=SearchFilters(person_names=["Eino"]))[0]["person_name"] == "Eino"
+    assert index.search("Eino", filters=SearchFilters(max_age=85)) == []
+
+
+def test_removed_documents_are_tombstoned_and_compacted(index):
+    index.add_chunks("A", [chunk(1, "Annikki muutti Ouluun vuonna 1952.", 0)])
+    assert len(index) == 4
+
+    index.remove_document("B")
+    assert len(index) == 2
+    assert index.search("Eino") == []
+    # Half the slots are dead, so the index was rebuilt without them
+    assert len(index._chunks) == 2
+    assert index.search("Ouluun")[0]["id"] == 1
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    vector = [
+        {"id": 10, "document_id": "A", "chunk_index": 0, "text": "a", "score": 0.9},
+        {"id": 11, "document_id": "A", "chunk_index": 1, "text": "b", "score": 0.8},
+    ]
+    keyword = [
+        {"id": 11, "document_id": "A", "chunk_index": 1, "text": "b", "score": 12.0},
+        {"id": 12, "document_id": "B", "chunk_index": 0, "text": "c", "score": 3.0},
+    ]
+    fused = reciprocal_rank_fusion([vector, keyword], k=60, limit=3)
+    assert [result["id"] for result in fused] == [11, 10, 12]
+    assert fused[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert reciprocal_rank_fusion([vector, keyword], k=60, limit=1)[0]["id"] == 11
+
+
+def test_reciprocal_rank_fusion_matches_chunks_by_position_not_id():
+    # The same chunk under a new Milvus id after an index migration
+    fused = reciprocal_rank_fusion([
+        [{"id": 1, "document_id": "A", "chunk_index": 4, "text": "x"}],
+        [{"id": 99, "document_id": "A", "chunk_index": 4, "text": "x"}],
+    ], k=60)
+    assert len(fused) == 1
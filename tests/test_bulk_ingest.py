@@ -0,0 +1,92 @@
+import asyncio
+import io
+import zipfile
+import pytest
+from src.core.config import settings
+from src.services.bulk_ingest import BulkStaging
+from src.services.upload_spool import UploadTooLargeError
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_SPOOL_DIR", str(tmp_path / "spool"))
+
+
+async def chunks(data: bytes, size: int = 4):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def zip_bytes(entries) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_archive_entries_are_staged_by_base_name():
+    staging = BulkStaging(max_bytes=1000)
+    archive = zip_bytes({
+        "../../etc/Matti 75v M7-54.docx": b"a" * 10,
+        "nested/Liisa 80v L8-1.docx": b"b" * 10,
+        "notes.txt": b"c",
+        "__MACOSX/._Matti 75v M7-54.docx": b"d",
+    })
+    try:
+        asyncio.run(staging.add_upload(chunks(archive), "interviews.zip"))
+        assert sorted(staging.documents) == ["Liisa 80v L8-1.docx", "Matti 75v M7-54.docx"]
+        assert all(path.parent == staging.dir for path in staging.paths())
+        assert [entry["name"] for entry in staging.skipped] == ["notes.txt"]
+    finally:
+        staging.cleanup()
+
+
+def test_duplicate_names_are_skipped():
+    staging = BulkStaging(max_bytes=1000)
+    try:
+        asyncio.run(staging.add_upload(chunks(b"first"), "Matti 75v M7-54.docx"))
+        asyncio.run(staging.add_upload(chunks(zip_bytes({"Matti 75v M7-54.docx": b"second"})), "more.zip"))
+        assert len(staging.documents) == 1
+        assert staging.skipped[0]["reason"] == "duplicate file name"
+    finally:
+        staging.cleanup()
+
+
+def test_total_size_is_enforced_across_uploads():
+    staging = BulkStaging(max_bytes=10)
+    try:
+        asyncio.run(staging.add_upload(chunks(b"x" * 10), "Matti 75v M7-54.docx"))
+        # The budget is exactly used up; nothing more may be spooled
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(staging.add_upload(chunks(b"y"), "Liisa 80v L8-1.docx"))
+    finally:
+        staging.cleanup()
+
+
+def test_single_upload_over_the_budget_is_rejected():
+    staging = BulkStaging(max_bytes=8)
+    try:
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(staging.add_upload(chunks(b"x" * 9), "Matti 75v M7-54.docx"))
+        assert staging.documents == {}
+    finally:
+        staging.cleanup()
+
+
+def test_loose_file_over_the_per_file_limit_is_skipped(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 8)
+    staging = BulkStaging(max_bytes=1000)
+    try:
+        asyncio.run(staging.add_upload(chunks(b"x" * 9), "Matti 75v M7-54.docx"))
+        asyncio.run(staging.add_upload(chunks(b"y" * 8), "Liisa 80v L8-1.docx"))
+        # Same outcome as an oversized entry inside an archive
+        asyncio.run(staging.add_upload(chunks(zip_bytes({"Eino 90v E9-1.docx": b"z" * 9})), "more.zip"))
+        assert list(staging.documents) == ["Liisa 80v L8-1.docx"]
+        assert [(entry["name"], entry["reason"]) for entry in staging.skipped] == [
+            ("Matti 75v M7-54.docx", "file too large"),
+            ("Eino 90v E9-1.docx", "file too large"),
+        ]
+        assert staging.total_bytes == 8
+    finally:
+        staging.cleanup()
@@ -0,0 +1,73 @@
+from src.db.job_registry import JobRegistry
+from src.services.bm25_index import BM25Index
+from src.services.corpus_sync import CorpusSync
+from src.services.person_index import PersonNameIndex
+from src.services.semantic_cache import SemanticAnswerCache
+
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def query(self, expr, **kwargs):
+        self.queries.append(expr)
+        return [row for row in self.rows if expr == f'document_id == "{row["document_id"]}"']
+
+
+ROWS = [
+    {"id": 1, "text": "Eino kalasti järvellä.", "document_id": "E-1", "chunk_index": 0,
+     "person_name": "Eino", "person_age": 90},
+    {"id": 2, "text": "Kesällä Eino saunoi.", "document_id": "E-1", "chunk_index": 1,
+     "person_name": "Eino", "person_age": 90},
+]
+
+
+def make_sync(path, owner, bm25_loaded=True):
+    bm25_index = BM25Index()
+    if bm25_loaded:
+        bm25_index.is_loaded = True
+    person_index = PersonNameIndex()
+    person_index.load(["Annikki"])
+    return CorpusSync(
+        registry=JobRegistry(path, owner=owner),
+        bm25_index=bm25_index,
+        answer_cache=SemanticAnswerCache(dim=4, capacity=4),
+        person_index=person_index,
+    )
+
+
+def test_additions_from_other_workers_reach_every_index(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    ingesting, other = make_sync(path, "worker-a"), make_sync(path, "worker-b")
+    ingesting.publish("E-1", "add")
+
+    assert other.apply(FakeCollection(ROWS)) == 1
+    assert len(other.bm25_index) == 2
+    assert other.person_index.find("Einolle soitettiin") == ["Eino"]
+    assert other.answer_cache.corpus_version == 1
+    # A worker skips its own changes
+    assert ingesting.apply(FakeCollection(ROWS)) == 0
+
+
+def test_new_person_is_learned_before_bm25_is_loaded(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    ingesting, other = make_sync(path, "worker-a"), make_sync(path, "worker-b", bm25_loaded=False)
+    ingesting.publish("E-1", "add")
+
+    other.apply(FakeCollection(ROWS))
+    assert len(other.bm25_index) == 0
+    assert "Eino" in other.person_index
+
+
+def test_removals_are_dropped_from_bm25(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    ingesting, other = make_sync(path, "worker-a"), make_sync(path, "worker-b")
+    ingesting.publish("E-1", "add")
+    other.apply(FakeCollection(ROWS))
+    ingesting.publish("E-1", "remove")
+
+    collection = FakeCollection(ROWS)
+    assert other.apply(collection) == 1
+    assert collection.queries == []
+    assert len(other.bm25_index) == 0
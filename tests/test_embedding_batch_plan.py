@@ -0,0 +1,29 @@
+from src.core.config import settings
+from src.services.job_manager import plan_embedding_batch, slurm_time
+
+
+def test_small_batches_stay_on_gputest():
+    assert plan_embedding_batch(1) == (1, "gputest", 900)
+    assert plan_embedding_batch(12) == (1, "gputest", 900)
+    assert plan_embedding_batch(40) == (4, "gputest", 900)
+
+
+def test_large_backfills_move_to_gpu_with_time_for_every_document():
+    tasks, partition, seconds = plan_embedding_batch(500)
+    assert partition == "gpu"
+    assert tasks == settings.EMBEDDING_BATCH_MAX_ARRAY_TASKS
+    share = -(-500 // tasks)
+    assert seconds >= settings.EMBEDDING_BATCH_STARTUP_SECONDS + share * settings.EMBEDDING_BATCH_SECONDS_PER_DOCUMENT
+    assert seconds % 60 == 0
+
+
+def test_time_limit_grows_once_the_array_is_full():
+    _, _, small = plan_embedding_batch(500)
+    _, _, large = plan_embedding_batch(2000)
+    assert large > small
+
+
+def test_slurm_time_format():
+    assert slurm_time(900) == "00:15:00"
+    assert slurm_time(3015) == "00:50:15"
+    assert slurm_time(90000) == "1-01:00:00"
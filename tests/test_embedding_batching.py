@@ -0,0 +1,24 @@
+from src.services.embedding_manager import plan_length_batches
+
+
+def test_batches_fit_the_token_budget_when_padded():
+    lengths = [5, 120, 30, 8, 64, 64, 7, 200]
+    batches = plan_length_batches(lengths, token_budget=256, max_batch_size=64)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) == 1 or len(batch) * max(lengths[i] for i in batch) <= 256
+
+
+def test_longest_texts_come_first_and_short_ones_share_batches():
+    lengths = [10, 10, 10, 10, 100]
+    assert plan_length_batches(lengths, token_budget=100, max_batch_size=64) == [[4], [0, 1, 2, 3]]
+
+
+def test_batch_size_is_capped():
+    batches = plan_length_batches([1] * 10, token_budget=10_000, max_batch_size=4)
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def test_text_longer_than_the_budget_gets_its_own_batch():
+    assert plan_length_batches([600, 5], token_budget=512, max_batch_size=8) == [[0], [1]]
+    assert plan_length_batches([], token_budget=512, max_batch_size=8) == []
@@ -0,0 +1,42 @@
+import asyncio
+import time
+from src.core.config import settings
+from src.core.health import HealthMonitor
+
+
+def failing_check(client):
+    raise ConnectionError("no route to host")
+
+
+def test_client_is_reset_only_after_consecutive_failures():
+    monitor = HealthMonitor(probe_timeout=1)
+    resets = []
+
+    async def probe(check):
+        return await monitor._probe("milvus", check, lambda: "client", lambda: resets.append(True))
+
+    async def scenario():
+        for _ in range(settings.HEALTH_RESET_AFTER_FAILURES - 1):
+            await probe(failing_check)
+        # A healthy probe in between starts the count again
+        await probe(lambda client: True)
+        for _ in range(settings.HEALTH_RESET_AFTER_FAILURES - 1):
+            await probe(failing_check)
+        assert resets == []
+        await probe(failing_check)
+
+    asyncio.run(scenario())
+    assert resets == [True]
+    assert monitor.results["milvus"]["healthy"] is False
+
+
+def test_slow_reconnect_does_not_count_against_the_probe_timeout():
+    monitor = HealthMonitor(probe_timeout=0.05)
+
+    def slow_connect():
+        time.sleep(0.2)
+        return "client"
+
+    healthy = asyncio.run(monitor._probe("neo4j", lambda client: client == "client", slow_connect))
+    assert healthy
+    assert monitor.results["neo4j"]["latency_ms"] < 200
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from src.db.job_registry import JobRegistry
+from src.models.query import CompletedQueryResponse, PersonContext, QuerySource
+
+
+@pytest.fixture
+def registry_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+def test_job_round_trips_through_another_registry(registry_path):
+    writer = JobRegistry(registry_path, owner="worker-a")
+    writer.namespace("puhti")["job-1"] = {
+        "kind": "embedding",
+        "status": "PENDING",
+        "slurm_job_id": "123",
+        "metadata": {"person_name": "Matti", "person_age": 75, "document_id": "M7-54"},
+        "vector": np.arange(6, dtype=np.float32).reshape(2, 3),
+        "count": np.int64(4),
+        "tags": ("a", "b"),
+    }
+
+    record = JobRegistry(registry_path).namespace("puhti")["job-1"]
+    assert record["owner"] == "worker-a"
+    assert record["metadata"]["person_age"] == 75
+    assert record["vector"].dtype == np.float32
+    np.testing.assert_array_equal(record["vector"], np.arange(6).reshape(2, 3))
+    assert record["count"] == 4
+    assert record["tags"] == ["a", "b"]
+
+
+def test_finished_query_result_validates_after_reload(registry_path):
+    answer = CompletedQueryResponse(
+        query="Missä Matti asui?",
+        answer="Oulussa.",
+        sources=[QuerySource(text="Asuin Oulussa.", document_id="M7-54", score=0.5)],
+        person_contexts=[PersonContext(name="Matti", age=75, relationships=[], document_count=1)],
+        confidence=0.8,
+    )
+    writer = JobRegistry(registry_path).namespace("query")
+    writer["job-1"] = {"kind": "query", "status": "PENDING"}
+    writer["job-1"].update({"status": "COMPLETED", "result": answer.model_dump()})
+
+    record = JobRegistry(registry_path).namespace("query")["job-1"]
+    assert CompletedQueryResponse(**record["result"]) == answer
+
+
+def test_unknown_types_are_rejected(registry_path):
+    jobs = JobRegistry(registry_path).namespace("query")
+    with pytest.raises(TypeError):
+        jobs["job-1"] = {"status": "PENDING", "source": QuerySource(text="x", document_id="d", score=0.0)}
+
+
+def test_transient_fields_stay_in_memory(registry_path):
+    registry = JobRegistry(registry_path)
+    registry.namespace("puhti")["job-1"] = {"status": "RUNNING"}
+    registry.namespace("puhti")["job-1"].update({"status": "COMPLETED", "embeddings": np.ones((2, 3)), "texts": ["a", "b"]})
+
+    assert "texts" in registry.namespace("puhti")["job-1"]
+    reloaded = JobRegistry(registry_path).namespace("puhti")["job-1"]
+    assert reloaded["status"] == "COMPLETED"
+    assert "embeddings" not in reloaded and "texts" not in reloaded
+
+
+def test_other_process_writes_refresh_live_record(registry_path):
+    first = JobRegistry(registry_path).namespace("puhti")
+    second = JobRegistry(registry_path).namespace("puhti")
+    first["job-1"] = {"status": "PENDING", "slurm_job_id": "7"}
+    live = first["job-1"]
+
+    second["job-1"]["status"] = "RUNNING"
+
+    assert first["job-1"] is live
+    assert live["status"] == "RUNNING"
+
+
+def test_lookups_by_slurm_id_and_status(registry_path):
+    jobs = JobRegistry(registry_path).namespace("puhti")
+    jobs["a"] = {"status": "PENDING", "slurm_job_id": "1"}
+    jobs["b"] = {"status": "COMPLETED", "slurm_job_id": "2"}
+    jobs["c"] = {"status": "RUNNING", "slurm_job_id": "3"}
+
+    assert [job.job_id for job in jobs.find(slurm_job_id="2")] == ["b"]
+    assert [job.job_id for job in jobs.unfinished()] == ["a", "c"]
+    assert "b" in jobs and "z" not in jobs
+
+
+def test_prune_removes_only_finished_jobs(registry_path):
+    registry = JobRegistry(registry_path)
+    jobs = registry.namespace("puhti")
+    jobs["done"] = {"status": "COMPLETED"}
+    jobs["running"] = {"status": "RUNNING"}
+
+    assert registry.prune(older_than_days=-1) == 1
+    assert "done" not in jobs and "running" in jobs
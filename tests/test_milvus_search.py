@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from pymilvus import MilvusException
+from src.db.milvus import MilvusClient
+
+
+class SlowCollection:
+    def __init__(self, delay=0.2, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.threads = []
+
+    def search(self, **kwargs):
+        self.threads.append(threading.get_ident())
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise MilvusException(message="index changed")
+        hit = SimpleNamespace(id=1, score=0.9, entity={"text": "t", "document_id": "A", "chunk_index": 0})
+        return [[hit]]
+
+
+def make_client(collection):
+    client = MilvusClient.__new__(MilvusClient)
+    client._collection = collection
+    client._index_type = "HNSW"
+    client._last_reload_time = time.time()
+    client.reload_interval = 3600
+    return client
+
+
+def test_search_leaves_the_event_loop_free():
+    client = make_client(SlowCollection(delay=0.2))
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        results = await client.search([0.0] * 4, limit=1)
+        task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    assert results[0]["document_id"] == "A"
+    assert ticks >= 5
+    assert threading.get_ident() not in client._collection.threads
+
+
+def test_searches_overlap():
+    client = make_client(SlowCollection(delay=0.2))
+
+    async def scenario():
+        started = time.monotonic()
+        await asyncio.gather(*(client.search([0.0] * 4, limit=1) for _ in range(3)))
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_retry_after_reload_also_runs_off_the_loop(monkeypatch):
+    collection = SlowCollection(delay=0, failures=1)
+    client = make_client(collection)
+    reloads = []
+    monkeypatch.setattr(client, "_reload_collection", lambda: reloads.append(threading.get_ident()))
+
+    results = asyncio.run(client.search([0.0] * 4, limit=1))
+
+    assert len(results) == 1
+    assert len(collection.threads) == 2
+    assert threading.get_ident() not in collection.threads + reloads
@@ -0,0 +1,91 @@
+import pytest
+from src.db.neo4j import Neo4jClient, legacy_document_id
+
+
+class FakeResult(list):
+    def single(self):
+        return self[0] if self else None
+
+
+class BaselineGraph:
+    """Just enough of Neo4j to run ensure_schema against a graph written by create_document_chunk."""
+
+    def __init__(self):
+        self.person = {"name": "Annikki", "age": 84}
+        # create_document_chunk only ever set id, content and chunk_index
+        self.chunks = [
+            {"id": "M7_54_0", "chunk_index": 0},
+            {"id": "M7_54_1", "chunk_index": 1},
+            {"id": "M7_54_10", "chunk_index": 10},
+            {"id": "haastattelu_0", "chunk_index": 0},
+        ]
+        self.catalog = {}
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **kwargs):
+        parameters = {**(parameters or {}), **kwargs}
+        if "d.document_id IS NULL" in query:
+            return FakeResult(
+                {"id": chunk["id"], "chunk_index": chunk["chunk_index"]}
+                for chunk in self.chunks if chunk.get("document_id") is None
+            )
+        if "SET d.document_id = chunk.document_id" in query:
+            by_id = {chunk["id"]: chunk for chunk in self.chunks}
+            for row in parameters["chunks"]:
+                by_id[row["id"]]["document_id"] = row["document_id"]
+            return FakeResult()
+        if "MERGE (s:SourceDocument" in query:
+            added = 0
+            for chunk in self.chunks:
+                document_id = chunk.get("document_id")
+                if document_id is None or document_id in self.catalog:
+                    continue
+                members = [c for c in self.chunks if c.get("document_id") == document_id]
+                created = [c["created_at"] for c in members if c.get("created_at")]
+                self.catalog[document_id] = {
+                    "person_name": self.person["name"],
+                    "person_age": self.person["age"],
+                    "chunk_count": len(members),
+                    "created_at": min(created) if created else parameters["now"],
+                }
+                added += 1
+            return FakeResult([{"backfilled": added}])
+        return FakeResult()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Neo4jClient, "_schema_ready", False)
+    client = Neo4jClient.__new__(Neo4jClient)
+    client.driver = BaselineGraph()
+    return client
+
+
+def test_legacy_document_id_strips_the_chunk_suffix():
+    assert legacy_document_id("M7_54_10", 10) == "M7_54"
+    assert legacy_document_id("doc_3", None) == "doc"
+
+
+def test_ensure_schema_catalogs_documents_from_before_the_catalog(client):
+    client.ensure_schema()
+
+    graph = client.driver
+    assert [chunk["document_id"] for chunk in graph.chunks] == ["M7_54", "M7_54", "M7_54", "haastattelu"]
+    assert set(graph.catalog) == {"M7_54", "haastattelu"}
+    assert graph.catalog["M7_54"]["chunk_count"] == 3
+    assert graph.catalog["M7_54"]["person_name"] == "Annikki"
+    assert graph.catalog["M7_54"]["created_at"]
+
+
+def test_ensure_schema_leaves_current_chunks_alone(client):
+    client.driver.chunks = [{"id": "X_0", "chunk_index": 0, "document_id": "X", "created_at": "2026-01-01"}]
+    client.ensure_schema()
+    assert client.driver.catalog["X"]["created_at"] == "2026-01-01"
@@ -0,0 +1,33 @@
+import pytest
+from src.services.person_index import PersonNameIndex, inflected_forms
+
+
+@pytest.fixture
+def index():
+    index = PersonNameIndex()
+    index.load(["Annikki", "Eila", "Mikael", "Väinö"])
+    return index
+
+
+def test_inflected_forms_apply_gradation_and_harmony():
+    assert {"annikki", "annikin", "annikille", "annikkia", "annikkina", "annikkikin"} <= inflected_forms("Annikki")
+    assert {"mikaelin", "mikaeliin"} <= inflected_forms("Mikael")
+    assert {"väinöllä", "väinöä", "väinökään"} <= inflected_forms("Väinö")
+    assert inflected_forms("  ") == set()
+
+
+def test_find_matches_inflected_mentions_in_order(index):
+    text = "Mikaelin isä kertoi, että Annikille tuli kirje Eilalta."
+    assert index.find(text) == ["Mikael", "Annikki", "Eila"]
+
+
+def test_find_matches_whole_words_only(index):
+    assert index.find("Veila ja Eilanen") == []
+    assert index.find("Kysyin Eilalta.") == ["Eila"]
+
+
+def test_added_names_are_found_without_reloading(index):
+    assert index.find("Einolle soitettiin") == []
+    index.add("Eino")
+    assert "Eino" in index
+    assert index.find("Einolle soitettiin") == ["Eino"]
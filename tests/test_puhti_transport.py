@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import paramiko
+import pytest
+from src.services.puhti_transport import PuhtiConnection, PuhtiTransport
+
+
+class DroppingClient:
+    """exec_command fails like a channel that died mid-command."""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def exec_command(self, command, timeout=None):
+        self.calls.append(command)
+        raise paramiko.SSHException("channel closed")
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    # No real SSH: connections count as connected once a fake client is attached
+    monkeypatch.setattr(PuhtiConnection, "ensure_connected", lambda self: None)
+    monkeypatch.setattr(PuhtiConnection, "is_alive", property(lambda self: False))
+
+
+def test_timed_out_connection_is_replaced():
+    transport = PuhtiTransport(pool_size=1)
+    release = threading.Event()
+    seen = []
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await transport.run(lambda connection: seen.append(connection) or release.wait(), timeout=0.05)
+        # The stuck thread still holds the old connection; the pool must not hand it out
+        return await transport.run(lambda connection: connection, timeout=1)
+
+    try:
+        fresh = asyncio.run(scenario())
+    finally:
+        release.set()
+        transport.close()
+    assert fresh is not seen[0]
+    assert transport._connections == [fresh]
+
+
+def test_sbatch_is_not_retried_after_a_dropped_channel():
+    transport = PuhtiTransport(pool_size=1)
+    calls = []
+    for connection in transport._connections:
+        connection.ssh_client = DroppingClient(calls)
+
+    async def scenario():
+        with pytest.raises(paramiko.SSHException):
+            await transport.exec("cd /scratch && sbatch job.sh")
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        transport.close()
+    assert len(calls) == 1
+
+
+def test_queries_are_retried_on_a_fresh_connection(monkeypatch):
+    transport = PuhtiTransport(pool_size=1)
+    calls = []
+    # Every reconnect gets a client that drops again
+    monkeypatch.setattr(PuhtiConnection, "ensure_connected", lambda self: setattr(self, "ssh_client", DroppingClient(calls)))
+
+    async def scenario():
+        with pytest.raises(paramiko.SSHException):
+            await transport.exec('squeue -u $USER -h -o "%i|%T"')
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        transport.close()
+    assert len(calls) == 2
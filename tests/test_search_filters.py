@@ -0,0 +1,36 @@
+from src.db.milvus import filter_expression
+from src.models.query import SearchFilters
+
+
+def test_no_filters_compile_to_none():
+    assert filter_expression(None) is None
+    assert filter_expression(SearchFilters()) is None
+
+
+def test_every_condition_is_joined_with_and():
+    filters = SearchFilters(
+        person_names=["Annikki", "Eino"],
+        min_age=70,
+        max_age=90,
+        document_ids=["M7-54"],
+        min_chunk_index=2,
+        max_chunk_index=10,
+    )
+    assert filter_expression(filters) == (
+        'person_name in ["Annikki", "Eino"] and document_id in ["M7-54"] and '
+        "person_age >= 70 and person_age <= 90 and chunk_index >= 2 and chunk_index <= 10"
+    )
+
+
+def test_string_literals_are_escaped():
+    expression = filter_expression(SearchFilters(person_names=['Väinö "Wäiski"', "back\\slash"]))
+    assert expression == 'person_name in ["Väinö \\"Wäiski\\"", "back\\\\slash"]'
+
+
+def test_python_matching_agrees_with_the_expression():
+    filters = SearchFilters(person_names=["Eila"], min_age=80, max_chunk_index=3)
+    assert filters.matches({"person_name": "Eila", "person_age": 85, "chunk_index": 3})
+    assert not filters.matches({"person_name": "Eila", "person_age": 79, "chunk_index": 0})
+    assert not filters.matches({"person_name": "Eino", "person_age": 85, "chunk_index": 0})
+    # Missing metadata never satisfies a range condition
+    assert not filters.matches({"person_name": "Eila", "chunk_index": 0})
@@ -0,0 +1,75 @@
+import asyncio
+from src.services.slurm_poller import SlurmStatusPoller
+
+
+class FakeTransport:
+    def __init__(self, squeue="", sacct=""):
+        self.squeue = squeue
+        self.sacct = sacct
+        self.commands = []
+
+    async def exec(self, command, timeout=None, idempotent=None):
+        self.commands.append(command)
+        return (self.squeue if command.startswith("squeue") else self.sacct), "", 0
+
+
+def test_parse_states_reads_job_and_state_columns():
+    states = SlurmStatusPoller._parse_states("101|RUNNING\n102|CANCELLED by 4242\n103|\n\n|PENDING\n")
+    assert states == {"101": "RUNNING", "102": "CANCELLED", "103": "PENDING"}
+
+
+def test_array_tasks_roll_up_into_the_array_job():
+    running = SlurmStatusPoller._parse_states("200_0|COMPLETED\n200_1|RUNNING\n200_[2-3]|PENDING\n")
+    assert running["200"] == "RUNNING"
+    assert running["200_0"] == "COMPLETED"
+
+    queued = SlurmStatusPoller._parse_states("201_0|COMPLETED\n201_[1-3]|PENDING\n")
+    assert queued["201"] == "PENDING"
+
+    failed = SlurmStatusPoller._parse_states("202_0|COMPLETED\n202_1|FAILED\n")
+    assert failed["202"] == "FAILED"
+
+    done = SlurmStatusPoller._parse_states("203_0|COMPLETED\n203_1|COMPLETED\n")
+    assert done["203"] == "COMPLETED"
+
+
+def test_refresh_uses_one_squeue_and_one_sacct_for_all_jobs():
+    transport = FakeTransport(squeue="1|RUNNING\n2|PENDING", sacct="3|TIMEOUT")
+    poller = SlurmStatusPoller(transport=transport, min_interval=1, max_interval=60)
+    poller._active.update({"1", "2", "3", "4"})
+
+    asyncio.run(poller.refresh())
+
+    assert len(transport.commands) == 2
+    assert transport.commands[1].endswith("-j 3,4")
+    assert poller.statuses == {"1": "RUNNING", "2": "PENDING", "3": "TIMEOUT", "4": "COMPLETED"}
+    # Jobs left without an accounting record count as finished
+    assert poller._active == {"1", "2"}
+
+
+def test_waiters_are_woken_when_their_job_finishes():
+    transport = FakeTransport(squeue="7|RUNNING")
+    poller = SlurmStatusPoller(transport=transport, min_interval=1, max_interval=60)
+
+    async def scenario():
+        poller.statuses["7"] = "RUNNING"
+        poller._active.add("7")
+        waiter = asyncio.ensure_future(poller.wait_for("7"))
+        await asyncio.sleep(0)
+        await poller.refresh()
+        assert not waiter.done()
+        transport.squeue, transport.sacct = "", "7|COMPLETED"
+        await poller.refresh()
+        return await asyncio.wait_for(waiter, timeout=1)
+
+    assert asyncio.run(scenario()) == "COMPLETED"
+
+
+def test_interval_shrinks_with_load_and_backs_off_when_idle():
+    poller = SlurmStatusPoller(transport=FakeTransport(), min_interval=5, max_interval=60)
+    assert poller.next_interval() == 60
+    poller._active.update(str(i) for i in range(20))
+    busy = poller.next_interval()
+    assert busy == 5
+    poller._unchanged_ticks = 3
+    assert busy < poller.next_interval() <= 60
@@ -0,0 +1,70 @@
+import asyncio
+from pathlib import Path
+from src.core.workers import WorkerCoordinator
+from src.db.job_registry import JobRegistry
+from src.services.job_manager import PuhtiJobManager
+
+
+class FakeSlurm:
+    """Just enough of PuhtiTransport for submitting the LLM worker."""
+
+    def __init__(self):
+        self.queue = {}
+        self.submissions = 0
+
+    async def exec(self, command, timeout=None, idempotent=None):
+        if command.startswith("squeue"):
+            listing = "\n".join(f"{job_id}|{state}" for job_id, state in self.queue.items())
+            # The answer is in flight while the other process runs its own lookup
+            await asyncio.sleep(0.01)
+            return listing, "", 0
+        if "sbatch" in command:
+            await asyncio.sleep(0.01)
+            self.submissions += 1
+            job_id = str(100 + self.submissions)
+            self.queue[job_id] = "PENDING"
+            return f"Submitted batch job {job_id}", "", 0
+        raise AssertionError(command)
+
+    async def put(self, local_path, remote_path):
+        pass
+
+
+class FakePoller:
+    def track(self, slurm_job_id, status="PENDING"):
+        pass
+
+
+def test_one_leader_at_a_time(tmp_path):
+    first, second = WorkerCoordinator(str(tmp_path)), WorkerCoordinator(str(tmp_path))
+    assert first.try_lead() and not second.try_lead()
+    assert second.is_alive(first.worker_id)
+
+    first.close()
+    assert not second.is_alive(first.worker_id)
+    assert second.try_lead()
+    second.close()
+
+
+def test_concurrent_workers_submit_one_llm_worker(tmp_path):
+    slurm = FakeSlurm()
+    registry = JobRegistry(str(tmp_path / "jobs.sqlite3"))
+    # Separate coordinators and managers, as in two uvicorn worker processes
+    managers = [
+        PuhtiJobManager(
+            transport=slurm,
+            poller=FakePoller(),
+            registry=registry,
+            coordinator=WorkerCoordinator(str(tmp_path / "workers"))
+        )
+        for _ in range(2)
+    ]
+
+    async def scenario():
+        return await asyncio.gather(*(
+            manager._ensure_llm_worker(Path("/scratch/in"), Path("/scratch/out")) for manager in managers
+        ))
+
+    worker_ids = asyncio.run(scenario())
+    assert slurm.submissions == 1
+    assert worker_ids[0] == worker_ids[1]